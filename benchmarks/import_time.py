@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+#
+# Measures "import gcpcvs" time in fresh interpreters. Exits non-zero if it regressed:
+# - a module which should only be imported on demand was imported, or
+# - the median import time exceeds the budget
+#
+# python3 benchmarks/import_time.py [--runs 7] [--budget 0.35]
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Slow to import, only needed by some code paths. "import gcpcvs" must not import them
+LAZY_MODULES = [
+    "aiohttp",
+    "google.auth",
+    "google.oauth2",
+    "google.cloud.iam_credentials_v1",
+    "googleapiclient",
+    "grpc",
+    "http.server",
+    "sqlite3",
+]
+
+MEASURE = """
+import sys, time
+start = time.perf_counter()
+import gcpcvs
+seconds = time.perf_counter() - start
+print(repr((seconds, sorted(m for m in {modules!r} if m in sys.modules))))
+"""
+
+def measure(python: str) -> tuple:
+    """ Returns (seconds, lazy modules imported) of one "import gcpcvs" in a fresh interpreter """
+    code = MEASURE.format(modules=set(LAZY_MODULES))
+    out = subprocess.run([python, "-c", code], check=True, capture_output=True, text=True).stdout
+    return eval(out)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark 'import gcpcvs' time")
+    parser.add_argument("--runs", type=int, default=7, help="Number of interpreters to start, default = 7")
+    parser.add_argument("--budget", type=float, default=0.35, help="Maximum median import time in seconds, default = 0.35")
+    parser.add_argument("--python", default=sys.executable, help="Python interpreter to use, default = this one")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    measure(args.python)        # Warm up file system caches and .pyc files
+    runs = [measure(args.python) for _ in range(args.runs)]
+    times = [seconds for seconds, _ in runs]
+    imported = sorted(set(m for _, modules in runs for m in modules))
+    median = statistics.median(times)
+
+    errors = []
+    if imported:
+        errors.append(f"modules imported eagerly: {', '.join(imported)}")
+    if median > args.budget:
+        errors.append(f"median import time {median:.3f}s exceeds budget of {args.budget:.3f}s")
+
+    if args.json:
+        print(json.dumps({"median_seconds": median, "min_seconds": min(times), "max_seconds": max(times),
+                          "runs": len(times), "budget_seconds": args.budget, "eager_modules": imported,
+                          "errors": errors}, indent=4))
+    else:
+        print(f"import gcpcvs: median {median:.3f}s, min {min(times):.3f}s, max {max(times):.3f}s ({len(times)} runs)")
+        for error in errors:
+            print(f"FAIL: {error}")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
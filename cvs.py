@@ -5,6 +5,7 @@ import gcpcvs
 import logging
 import typer
 import json
+import sys
 from tabulate import tabulate
 
 app = typer.Typer(no_args_is_help=True)
@@ -20,6 +21,8 @@ replication_app = typer.Typer(no_args_is_help=True)
 app.add_typer(replication_app, name="replication")
 kms_app = typer.Typer(no_args_is_help=True)
 app.add_typer(kms_app, name="kms")
+inventory_app = typer.Typer(no_args_is_help=True, help="Query a local inventory, refreshed from the API")
+app.add_typer(inventory_app, name="inventory")
 
 cvs: gcpcvs
 
@@ -72,9 +75,81 @@ def list(format: str = typer.Option("text", help="Specify output format: text/js
 
     print_results(result.json(), ['uuid', 'keyRingLocation', 'keyRing', 'keyName', 'region', 'network'], format)
     return
-    
+
+# inventory subcommands. Object types and the fields printed for them
+INVENTORY_TYPES = {
+    "volumes": ("Volumes", ['volumeId', 'name', 'region', 'lifeCycleState', 'quotaInBytes', 'usedBytes', 'serviceLevel', 'network']),
+    "pools": ("Pools", ['poolId', 'name', 'region', 'state', 'sizeInBytes', 'allocatedBytes', 'serviceLevel', 'network']),
+    "snapshots": ("Snapshots", ['ownerId', 'name', 'region', 'usedBytes']),
+    "backups": ("Backups", ['backupId', 'name', 'region', 'lifeCycleState', 'bytesTransferred']),
+    "replications": ("VolumeReplications", ['relationshipId', 'name', 'region', 'remoteRegion', 'mirrorState']),
+    "kms": ("Storage/KmsConfig", ['uuid', 'keyRingLocation', 'keyRing', 'keyName', 'region', 'network']),
+    "activedirectory": ("Storage/ActiveDirectory", ['UUID', 'domain', 'netBIOS', 'region', 'DNS', 'username']),
+}
+
+def open_inventory(resource: str, max_age: float = None) -> "Inventory":
+    from os import getenv
+    from gcpcvs.Inventory import Inventory
+    inventory = Inventory(cvs, getenv('GCPCVS_INVENTORY', None))
+    age = inventory.freshness()[resource]
+    if max_age != None and (age == None or age > max_age):
+        inventory.refresh([resource])
+        age = inventory.freshness()[resource]
+    # Freshness indicator on stderr, so JSON output stays parsable
+    if age == None:
+        print(f"Inventory has no {resource}. Run 'inventory refresh' or use --max-age", file=sys.stderr)
+    else:
+        print(f"Inventory data from {int(age // 60)}m{int(age % 60)}s ago ({inventory.path})", file=sys.stderr)
+    return inventory
+
+def inventory_type(type: str) -> tuple:
+    if type not in INVENTORY_TYPES:
+        raise typer.BadParameter(f"Use one of: {', '.join(INVENTORY_TYPES)}")
+    return INVENTORY_TYPES[type]
+
+@inventory_app.command()
+def refresh():
+    """ Updates the inventory from the API. Only changed objects are written """
+    from os import getenv
+    from gcpcvs.Inventory import Inventory, INVENTORY_RESOURCES
+    with Inventory(cvs, getenv('GCPCVS_INVENTORY', None)) as inventory:
+        changes = inventory.refresh()
+        for resource in INVENTORY_RESOURCES:
+            if resource in changes:
+                print(f"{resource}: {changes[resource]} changes")
+            else:
+                print(f"{resource}: failed: {changes.errors[resource]}", file=sys.stderr)
+    if not changes.complete:
+        sys.exit(1)
+
+@inventory_app.command()
+def query(type: str = typer.Argument(..., help=f"Object type: {'/'.join(INVENTORY_TYPES)}"),
+          region: str = typer.Option(None), name: str = typer.Option(None), pool: str = typer.Option(None, help="Pool name or ID"),
+          network: str = typer.Option(None), service_level: str = typer.Option(None), state: str = typer.Option(None),
+          min_used_percent: float = typer.Option(None, help="Only objects at least this full"),
+          limit: int = typer.Option(None), max_age: float = typer.Option(None, help="Refresh first if data is older (seconds)"),
+          format: str = typer.Option("text", help="Specify output format: text/json")):
+    """ Lists objects from the inventory, e.g. query volumes --pool pool-1 --min-used-percent 80 """
+    resource, fields = inventory_type(type)
+    with open_inventory(resource, max_age) as inventory:
+        entries = inventory.query(resource, min_used_percent=min_used_percent, limit=limit, region=region, name=name, pool=pool,
+                                  network=network, service_level=service_level, state=state)
+    print_results(entries, fields, format)
+
+@inventory_app.command()
+def summary(type: str = typer.Argument(..., help=f"Object type: {'/'.join(INVENTORY_TYPES)}"),
+            group_by: str = typer.Option("region", help="region/pool/network/service_level/state"),
+            region: str = typer.Option(None), pool: str = typer.Option(None, help="Pool name or ID"),
+            min_used_percent: float = typer.Option(None, help="Only objects at least this full"),
+            max_age: float = typer.Option(None, help="Refresh first if data is older (seconds)"),
+            format: str = typer.Option("text", help="Specify output format: text/json")):
+    """ Counts objects and sums used and size bytes per group from the inventory """
+    resource, _ = inventory_type(type)
+    with open_inventory(resource, max_age) as inventory:
+        entries = inventory.aggregate(resource, group_by, min_used_percent=min_used_percent, region=region, pool=pool)
+    print_results(entries, [group_by, 'count', 'used_bytes', 'size_bytes'], format)
+
 if __name__ == "__main__":
-    import sys
     from os import getenv
 
     logging.basicConfig(level=logging.ERROR)
@@ -83,5 +158,10 @@ if __name__ == "__main__":
         logging.error('Missing service account credentials. Please set SERVICE_ACCOUNT_CREDENTIAL.')
         sys.exit(2)
 
-    cvs = gcpcvs.gcpcvs(credentials)
+    # Optional on-disk cache for tokens and project numbers. Speeds up consecutive calls
+    cache_dir = getenv('GCPCVS_CACHE_DIR', None)
+    disk_cache = gcpcvs.DiskCache(cache_dir) if cache_dir else None
+
+    # Token and project number are fetched with the first API call. Inventory queries don't need them
+    cvs = gcpcvs.gcpcvs(credentials, disk_cache=disk_cache, lazy_init=True)
     app()
@@ -0,0 +1,688 @@
+# -*- coding: utf-8 -*-
+#
+# asyncio version of the gcpcvs class. Requires aiohttp (pip3 install aiohttp)
+
+from .BearerAuth import BearerAuth
+from .DiskCache import DiskCache
+from .GoogleHelpers import getGoogleProjectNumber
+from .gcpcvs import gcpcvs, Volume
+from .Retry import RetryPolicy
+from .RateLimiter import RateLimiter
+from .Metrics import Metrics, timed_init_step
+import asyncio
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import time
+
+# aiohttp takes long to import. AsyncGcpcvs.__init__ imports it, so "import gcpcvs" doesn't pay for it
+aiohttp = None
+
+def _import_aiohttp():
+    global aiohttp
+    if aiohttp is None:
+        try:
+            import aiohttp as module
+        except ImportError:
+            raise ImportError("AsyncGcpcvs requires aiohttp. Install it with 'pip3 install aiohttp'") from None
+        aiohttp = module
+
+class AsyncResponse():
+    """ Minimal response object returned by AsyncGcpcvs internal API methods
+
+    Mimics the parts of requests.Response used by gcpcvs, with the body already read.
+    """
+
+    def __init__(self, method: str, url: str, status_code: int, reason: str, headers: dict, text: str, request_info = None):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.text = text
+        self.request_info = request_info
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            raise aiohttp.ClientResponseError(self.request_info, (), status=self.status_code, message=f"{self.reason} for url: {self.url}", headers=self.headers)
+
+class AsyncGcpcvs():
+    """ asyncio based class used to manage Cloud Volumes Services on GCP
+
+    Offers the same methods as gcpcvs, but all methods doing API calls are coroutines.
+    All waits for long running jobs are done with asyncio.sleep, so one event loop can
+    drive many concurrent operations. Token refreshes run in the default executor
+    and don't block the event loop.
+
+    Use as async context manager or call close() when done:
+
+        async with AsyncGcpcvs("cvs-api-admin@my-project.iam.gserviceaccount.com") as cvs:
+            vols = await cvs.getVolumesByRegion("-")
+    """
+
+    project: str = None
+    projectId: str = None
+    service_account: str = None
+    token: BearerAuth = None
+    baseurl: str = None
+    headers: dict = gcpcvs.headers
+    read_retry_policy: RetryPolicy = gcpcvs.read_retry_policy
+    rate_limiter: RateLimiter = None
+    metrics: Metrics = None
+    # Region probing is synchronous, is_type_cvs* use CVS_SW_REGIONS and CVS_HW_REGIONS
+    probe_regions: bool = False
+    _own_token: bool = False
+
+    def __init__(self, service_account: str, project: str = None, pool_size: int = 100, timeout: tuple = (10, 120),
+                 rate_limiter: RateLimiter = None, endpoint: str = 'https://cloudvolumesgcp-api.netapp.com', metrics: Metrics = None,
+                 refresh_token_ahead: bool = False, disk_cache: DiskCache = None):
+        """
+        Args:
+            service_account (str): service account key with cloudvolumes.admin permissions
+                Can be specified in multiple ways:
+                1. Absolute file path to an JSON key file
+                2. JSON key as base64-encoded string
+                3. Service Account principal name when using service account impersonation
+                4. BearerAuth object, e.g. BearerAuth.from_token() for test servers
+            project (str): Google project_number or project_id or None
+                If "None", project_id is fetched from service_account
+                If using project_id, resourcemanager.projects.get permissions are required
+            pool_size (int): Maximum number of concurrent HTTP connections to the CVS API, default = 100
+            timeout (tuple): (connect, read) timeout in seconds for each API call, default = (10, 120)
+            rate_limiter (RateLimiter): Limits API calls per second, see gcpcvs. Default None = no client side limit
+            endpoint (str): URL of the CVS API, default = https://cloudvolumesgcp-api.netapp.com
+            metrics (Metrics): Records latency, status codes, retries and waits of all API calls, see gcpcvs.
+                Default None = new Metrics object
+            refresh_token_ahead (bool): Renew the token in a background thread before it expires, so API calls
+                don't wait for token refreshes. Default False = calls refresh expired tokens themselves
+            disk_cache (DiskCache): Keep tokens and project numbers on disk for later processes. Default None = no disk cache
+
+        Initialization does blocking calls (initial token, projectID resolution), which run in parallel.
+        Create the object before starting the event loop or run it in an executor.
+        """
+
+        _import_aiohttp()
+
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics if metrics != None else Metrics()
+        self._session = None
+        self._token_lock = None
+
+        self.service_account = service_account
+        self._own_token = not isinstance(service_account, BearerAuth)
+        if self._own_token:
+            # Only parses the key. Will raise ValueError if key provided is invalid
+            self.token = BearerAuth(service_account, cache=disk_cache, lazy=True)
+        else:
+            self.token = service_account
+
+        if project == None:
+            # Fetch projectID from JSON key file
+            project = self.token.getProjectID()
+
+        # Initialize projectID. Its is now either a valid projectId, or at least the project number
+        self.projectId = project
+        # Fetch token and resolve projectID to projectNumber in parallel
+        start = time()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="gcpcvs-init") as executor:
+            token = executor.submit(timed_init_step, self.metrics, "token", self.token.credentials.get_token)
+            if re.match(r"[a-zA-z][a-zA-Z0-9-]+", project):
+                project = timed_init_step(self.metrics, "project", getGoogleProjectNumber, project, disk_cache)
+                if project == None:
+                    raise ValueError("Cannot resolve projectId to project number. Please specify project number.")
+            token.result()
+        if refresh_token_ahead:
+            self.token.start_refresh_ahead()
+        self.project = project
+        self.metrics.observe_init("total", time() - start)
+
+        self.baseurl = endpoint.rstrip('/') + '/v2/projects/' + str(self.project)
+
+    # print some infos on the class
+    def __str__(self) -> str:
+        return f"CVS: Project: {self.project}\nService Account: {self.service_account}\n"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """ Closes all pooled connections to the CVS API """
+        if self._own_token:
+            self.token.close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def getProjectNumber(self) -> int:
+        return self.project
+
+    def getProjectID(self) -> str:
+        return self.projectId
+
+    # Methods without API calls are shared with the synchronous class
+    is_type_cvs = gcpcvs.is_type_cvs
+    is_type_cvs_performance = gcpcvs.is_type_cvs_performance
+    translateServiceLevelAPI2UI = gcpcvs.translateServiceLevelAPI2UI
+    translateServiceLevelUI2API = gcpcvs.translateServiceLevelUI2API
+    _error_message = gcpcvs._error_message
+    _mutation_retry_policy = gcpcvs._mutation_retry_policy
+
+    def _get_session(self):
+        # aiohttp sessions need to be created inside the running event loop
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1])
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers)
+        return self._session
+
+    async def _get_token(self) -> str:
+        # Fast path: token still valid, no need to leave the event loop
+        token = self.token.get_cached_token()
+        if token is not None:
+            return token
+        # Refresh is a blocking call. Run it in executor, only one refresh at a time
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            token = self.token.get_cached_token()
+            if token is None:
+                start = time()
+                try:
+                    token = await asyncio.get_running_loop().run_in_executor(None, self.token.credentials.get_token)
+                except Exception:
+                    if self.metrics != None:
+                        self.metrics.observe_token_refresh(time() - start, failed=True)
+                    raise
+                if self.metrics != None:
+                    self.metrics.observe_token_refresh(time() - start)
+        return token
+
+    # Single entry point for all HTTP calls to the CVS API
+    # Repeats calls according to retry policy, see gcpcvs._request
+    async def _request(self, method: str, url: str, payload: dict = None, retry: RetryPolicy = None) -> AsyncResponse:
+        policy = retry or self.read_retry_policy
+
+        start = time()
+        attempt = 0
+        waited = 0.0
+        while True:
+            if self.rate_limiter != None:
+                wait = self.rate_limiter.reserve(method)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    if self.metrics != None:
+                        self.metrics.observe_rate_limit_wait(wait)
+            headers = {"authorization": "Bearer " + await self._get_token()}
+            call_start = time()
+            try:
+                async with self._get_session().request(method, url, json=payload, headers=headers) as resp:
+                    body = await resp.read()
+                    r = AsyncResponse(method, url, resp.status, resp.reason, resp.headers, body.decode(resp.get_encoding()),
+                                      resp.request_info)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if self.metrics != None:
+                    self.metrics.observe_request(method, url, type(e).__name__, time() - call_start)
+                # A failed connect means the request never reached the API
+                sent = not isinstance(e, aiohttp.ClientConnectorError)
+                delay = policy.get_delay(method, attempt, time() - start, sent=sent)
+                if delay == None:
+                    raise
+                logging.warning(f"API {method} {url}: {e!r}. Retry {attempt + 1} in {delay:.1f}s")
+            else:
+                if self.metrics != None:
+                    self.metrics.observe_request(method, url, r.status_code, time() - call_start, len(body))
+                self._log_response(r)
+                if self.rate_limiter != None:
+                    self.rate_limiter.on_response(method, r.status_code)
+                if 200 <= r.status_code < 400:
+                    delay = None
+                else:
+                    delay = policy.get_delay(method, attempt, time() - start, r.status_code, self._error_message(r), r.headers.get('Retry-After'))
+                if delay == None:
+                    r.retries = attempt
+                    r.retry_wait = waited
+                    return r
+                logging.warning(f"API {method} {url}: HTTP {r.status_code}. Retry {attempt + 1} in {delay:.1f}s")
+            if self.metrics != None:
+                self.metrics.observe_retry(method, url, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+            waited += delay
+
+    # CVS API returns error details in response body. Give users a chance to get see that messages
+    def _log_response(self, resp: AsyncResponse):
+        if resp.status_code not in [200, 202]:
+            logging.warning(f"{resp.url} returned: {resp.text}")
+
+    # generic GET function for internal use.
+    # Adds error logging for HTTP errors and throws expections
+    async def _do_api_get(self, url: str) -> AsyncResponse:
+        r = await self._request("GET", url)
+        r.raise_for_status()
+        return r
+
+    # generic GET function for internal use. Specify region and Suffix part of API paths to read any kind of object
+    async def _API_getAll(self, region: str, path: str) -> AsyncResponse:
+        return await self._do_api_get(f"{self.baseurl}/locations/{region}/{path}")
+
+    # generic POST function for internal use.
+    # Implements waiting for job slots, see gcpcvs._do_api_post
+    # use timeout_seconds == 0 for no error handling
+    async def _do_api_post(self, url: str, payload: dict, timeout_seconds: int = 600, retry: RetryPolicy = None) -> AsyncResponse:
+        logging.info(f"API POST {url}")
+        r = await self._request("POST", url, payload, retry or self._mutation_retry_policy(timeout_seconds))
+        if r.status_code >= 400:
+            logging.error(f"API POST: {r.text}")
+        r.raise_for_status()
+        return r
+
+    # generic DELETE function for internal use.
+    # Implements waiting for job slots, see gcpcvs._do_api_delete
+    # use timeout_seconds == 0 for no error handling
+    async def _do_api_delete(self, url: str, timeout_seconds: int = 120, retry: RetryPolicy = None) -> AsyncResponse:
+        logging.info(f"API DELETE {url}")
+        r = await self._request("DELETE", url, None, retry or self._mutation_retry_policy(timeout_seconds))
+        if r.status_code >= 400:
+            logging.error(f"API DELETE: {r.text}")
+        r.raise_for_status()
+        return r
+
+    async def _do_api_put(self, url: str, payload: dict) -> AsyncResponse:
+        r = await self._request("PUT", url, payload)
+        r.raise_for_status()
+        return r
+
+    async def getVersionByRegion(self, region: str) -> dict:
+        """ returns API and SDE version for specified region. See gcpcvs.getVersionByRegion """
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/version")
+        return r.json()
+
+    #
+    # StoragePools
+    #
+
+    async def getPoolsByRegion(self, region: str) -> list:
+        """ returns list with dicts of all pools in specified region. See gcpcvs.getPoolsByRegion """
+        logging.info(f"getPoolsByRegion {region}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Pools")
+        return r.json()
+
+    async def getPoolsByName(self, region: str, name: str) -> list:
+        """ returns list with dicts of pools named "name" in specified region. See gcpcvs.getPoolsByName """
+        logging.info(f"getPoolsByName {region}, {name}")
+        return [pool for pool in await self.getPoolsByRegion(region) if pool["name"] == name]
+
+    async def getPoolsByPoolID(self, region: str, poolID: str) -> dict:
+        """ returns dict of pool with "poolID" in specified region. See gcpcvs.getPoolsByPoolID """
+        logging.info(f"getPoolByPoolID {region}, {poolID}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Pools/{poolID}")
+        return r.json()
+
+    async def createPool(self, region: str, payload: dict, timeout: int = 15*60) -> dict:
+        """ Creates a StoragePool and waits for completion. See gcpcvs.createPool """
+        logging.info(f"createPool {region}, {payload}")
+        r = await self._do_api_post(f"{self.baseurl}/locations/{region}/Pools", payload, timeout)
+
+        poolID = r.json()['response']['AnyValue']['poolId']
+        pool = await self.getPoolsByPoolID(region, poolID)
+        if r.status_code == 202:
+            # pool still creating, wait for completion
+            while pool['state'] == "creating":
+                await asyncio.sleep(20)
+                pool = await self.getPoolsByPoolID(region, poolID)
+        logging.info(f"createPool: {region}, {poolID} created")
+        return pool # return data of new pool. Might have failed to create. Caller needs to check state
+
+    async def _modifyPoolByPoolID(self, region: str, poolID: str, changes: dict) -> dict:
+        """ Modifies a pool. Internal method """
+        logging.info(f"_modifyPoolByPoolID {region}, {poolID}, {changes}")
+        r = await self._do_api_put(f"{self.baseurl}/locations/{region}/Pools/{poolID}", changes)
+        return r.json()
+
+    async def resizePoolByPoolID(self, region: str, poolID: str, newSize: int) -> dict:
+        """ Resize a pool. See gcpcvs.resizePoolByPoolID """
+        logging.info(f"resizePoolByPoolID {region}, {poolID}, {newSize}")
+        return await self._modifyPoolByPoolID(region, poolID, {"sizeInBytes": newSize})
+
+    async def deletePoolByPoolID(self, region: str, poolID: str) -> dict:
+        """ delete pool with "poolID" in specified region. See gcpcvs.deletePoolByPoolID """
+        logging.info(f"deletePoolByPoolID {region}, {poolID}")
+        r = await self._do_api_delete(f"{self.baseurl}/locations/{region}/Pools/{poolID}", 10*60)
+        return r.json()
+
+    #
+    # Volumes
+    #
+
+    async def getVolumesByRegion(self, region: str) -> list:
+        """ returns list with dicts of all volumes in specified region. See gcpcvs.getVolumesByRegion """
+        logging.info(f"getVolumesByRegion {region}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Volumes")
+        return r.json()
+
+    async def getVolumesByName(self, region: str, name: str) -> list:
+        """ returns list with dicts of volumes named "name" in specified region. See gcpcvs.getVolumesByName """
+        logging.info(f"getVolumesByName {region}, {name}")
+        vols = [volume for volume in await self.getVolumesByRegion(region) if volume["name"] == name]
+        # Do a lookup of volumeId, since to generic query returns less details compared to volumeID query
+        if len(vols) == 1:
+            return [await self.getVolumesByVolumeID(region, vols[0]['volumeId'])]
+        else:
+            return []
+
+    async def getVolumesByVolumeID(self, region: str, volumeID: str) -> dict:
+        """ returns dict of volume with "volumeID" in specified region. See gcpcvs.getVolumesByVolumeID """
+        logging.info(f"getVolumesByVolumeID {region}, {volumeID}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Volumes/{volumeID}")
+        return r.json()
+
+    async def _modifyVolumeByVolumeID(self, region: str, volumeID: str, changes: dict) -> dict:
+        """ Modifies a volume. Internal method """
+        logging.info(f"_modifyVolumeByVolumeID {region}, {volumeID}, {changes}")
+        r = await self._do_api_put(f"{self.baseurl}/locations/{region}/Volumes/{volumeID}", changes)
+        return r.json()
+
+    async def resizeVolumeByVolumeID(self, region: str, volumeID: str, newSize: int) -> dict:
+        """ Resize a volume. See gcpcvs.resizeVolumeByVolumeID """
+        logging.info(f"updateVolumeByVolumeID {region}, {volumeID}, {newSize}")
+        return await self._modifyVolumeByVolumeID(region, volumeID, {"quotaInBytes": newSize})
+
+    async def setServiceLevelByVolumeID(self, region: str, volumeID: str, serviceLevel: str):
+        """ Change service level of volume. See gcpcvs.setServiceLevelByVolumeID """
+        logging.info(f"setServiceLevelByVolumeID {region}, {volumeID}, {serviceLevel}")
+        await self._modifyVolumeByVolumeID(region, volumeID, {"serviceLevel": self.translateServiceLevelUI2API(serviceLevel)})
+
+    async def createVolume(self, region: str, payload: dict, timeout: int = 15*60) -> dict:
+        """ Creates a volume and waits for completion. See gcpcvs.createVolume """
+        logging.info(f"createVolume {region}, {payload}")
+        if 'isDataProtection' in payload and payload['isDataProtection'] == True:
+            # Create a Data Protection volume
+            r = await self._do_api_post(f"{self.baseurl}/locations/{region}/DataProtectionVolumes", payload, timeout)
+        else:
+            r = await self._do_api_post(f"{self.baseurl}/locations/{region}/Volumes", payload, timeout)
+
+        volumeID = r.json()['response']['AnyValue']['volumeId']
+        volume = await self.getVolumesByVolumeID(region, volumeID)
+        if r.status_code == 202:
+            # volume still creating, wait for completion
+            while volume['lifeCycleState'] == "creating":
+                await asyncio.sleep(20)
+                volume = await self.getVolumesByVolumeID(region, volumeID)
+        logging.info(f"createVolume: {region}, {volumeID} created")
+        return volume # return data of new volume. Might have failed to create. Caller needs to check lifeCycleState
+
+    async def deleteVolumeByVolumeID(self, region: str, volumeID: str) -> dict:
+        """ delete volume with "volumeID" in specified region. See gcpcvs.deleteVolumeByVolumeID """
+        logging.info(f"deleteVolumeByVolumeID {region}, {volumeID}")
+        r = await self._do_api_delete(f"{self.baseurl}/locations/{region}/Volumes/{volumeID}", 10*60)
+        return r.json()
+
+    #
+    # Snapshots
+    #
+
+    async def getSnapshotsByRegion(self, region: str) -> list:
+        """ returns list with dicts of all snapshots in specified region. See gcpcvs.getSnapshotsByRegion """
+        logging.info(f"getSnapshotsByRegion {region}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Snapshots")
+        return r.json()
+
+    async def deleteSnapshotBySnapshotID(self, region: str, snaphotID: str) -> dict:
+        """ delete snapshot with snapshotID in specified region. See gcpcvs.deleteSnapshotBySnapshotID """
+        logging.info(f"deleteSnapshotBySnapshotID {region}, {snaphotID}")
+        r = await self._do_api_delete(f"{self.baseurl}/locations/{region}/Snapshots/{snaphotID}", 2*60)
+        return r.json()
+
+    #
+    # Replication
+    #
+
+    async def getVolumeReplicationByRegion(self, region: str) -> list:
+        """ returns list with dicts of all relationships in specified region. See gcpcvs.getVolumeReplicationByRegion """
+        logging.info(f"getVolumeReplicationByRegion {region}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/VolumeReplications")
+        return r.json()
+
+    async def getVolumeReplicationByID(self, region: str, relationshipID: str) -> dict:
+        """ returns dict of relationship with relationshipID. See gcpcvs.getVolumeReplicationByID """
+        logging.info(f"getVolumeReplicationByID {region} {relationshipID}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/VolumeReplications/{relationshipID}")
+        return r.json()
+
+    async def getVolumeReplicationByName(self, region: str, name: str) -> list:
+        """ returns list with dicts of all relationships in specified region with name. See gcpcvs.getVolumeReplicationByName """
+        logging.info(f"getVolumeReplicationByName {region} {name}")
+        return [r for r in await self.getVolumeReplicationByRegion(region) if r['name'] == name]
+
+    async def createVolumeReplication(self, relationship_name: str, source_volume: Volume, destination_volume: Volume, schedule: str) -> dict:
+        """ Creates a Volume Replication Relationship. See gcpcvs.createVolumeReplication """
+        logging.info(f"createVolumeReplication {relationship_name}")
+        region = destination_volume["region"]
+        if destination_volume['isDataProtection'] == False:
+            # destination volume needs to be a secondary volume
+            raise ValueError(f"Volume {destination_volume['volumeId']} needs to by a secondary/dataprotection volume.")
+        if destination_volume['inReplication'] == True:
+            logging.warning(f"createVolumeReplication {relationship_name}: Destination volume {destination_volume['volumeId']} already in replication state.")
+            return None
+        if schedule not in ['10minutely', 'hourly', 'daily']:
+            raise ValueError(f"Invalid schedule: {schedule} (10minutely|hourly|daily)")
+
+        payload = {
+            "destinationVolumeUUID": destination_volume["volumeId"],
+            "endpointType": "dst",
+            "name": relationship_name,
+            "remoteRegion": source_volume["region"],
+            "replicationPolicy": "MirrorAllSnapshots",
+            "replicationSchedule": schedule,
+            "sourceVolumeUUID": source_volume["volumeId"]
+        }
+        logging.info(f"createVolumeReplication {relationship_name} {payload}")
+        r = await self._do_api_post(f"{self.baseurl}/locations/{region}/VolumeReplications", payload)
+        return r.json()
+
+    async def breakVolumeReplicationByID(self, destination_region: str, relationshipID: str, force: bool) -> dict:
+        """ breaks a replication relationship and waits for completion. See gcpcvs.breakVolumeReplicationByID """
+        logging.info(f"breakVolumeReplicationByID {destination_region}, {relationshipID}, {force}")
+        await self._do_api_post(f"{self.baseurl}/locations/{destination_region}/VolumeReplications/{relationshipID}/Break", {"force": force})
+
+        # Wait for connection to be broken
+        start = time()
+        while True:
+            await asyncio.sleep(15)
+            relationship = await self.getVolumeReplicationByID(destination_region, relationshipID)
+            if relationship['lifeCycleState'] == 'available':
+                break
+            if relationship['lifeCycleState'] == 'error':
+                logging.error(f"breakVolumeReplicationByID {destination_region}, {relationshipID}: {relationship['lifeCycleStateDetails']}")
+                raise RuntimeError(relationship['lifeCycleStateDetails'])
+            if time() > start + 5*60:
+                raise TimeoutError(f"breakVolumeReplicationByID {destination_region}, {relationshipID} Waiting for break to finish timed out")
+            logging.info(f"breakVolumeReplicationByID {destination_region}, {relationshipID} Waiting for break to complete")
+        return relationship
+
+    async def resyncVolumeReplicationByID(self, destination_region: str, relationshipID: str) -> dict:
+        """ resyncs a replication relationship. See gcpcvs.resyncVolumeReplicationByID """
+        logging.info(f"resyncVolumeReplicationByID {destination_region}, {relationshipID}")
+        r = await self._do_api_post(f"{self.baseurl}/locations/{destination_region}/VolumeReplications/{relationshipID}/Resync", {})
+        return r.json()
+
+    async def createReverseVolumeReplicationByID(self, relationship_region: str, relationshipID: str) -> dict:
+        """ reverse resyncs a replication relationship. See gcpcvs.createReverseVolumeReplicationByID """
+        logging.info(f"createReverseVolumeReplicationByID {relationship_region}, {relationshipID}")
+        relationship = await self.getVolumeReplicationByID(relationship_region, relationshipID)
+
+        if relationship['mirrorState'] != 'broken':
+            logging.error(f"createReverseVolumeReplicationByID {relationship_region}, {relationshipID} - mirror not broken")
+            raise ValueError(f"createReverseVolumeReplicationByID {relationship_region}, {relationshipID} - mirror not broken")
+        if relationship['relationshipStatus'] != 'idle':
+            logging.error(f"createReverseVolumeReplicationByID {relationship_region}, {relationshipID} - relationshipStatus not idle")
+            raise ValueError(f"createReverseVolumeReplicationByID {relationship_region}, {relationshipID} - relationshipStatus not idle")
+
+        payload = {
+            "destinationVolumeUUID": relationship['sourceVolumeUUID'],
+            "sourceVolumeUUID": relationship['destinationVolumeUUID'],
+            "remoteRegion": relationship['destinationRegion'],
+            "endpointType": "dst",
+            "name": relationship['name'] + "-reversed",
+            "replicationPolicy": relationship['replicationPolicy'],
+            "replicationSchedule": relationship['replicationSchedule'],
+        }
+        r = await self._do_api_post(f"{self.baseurl}/locations/{relationship['remoteRegion']}/VolumeReplications", payload)
+        return r.json()
+
+    async def deleteVolumeReplicationByID(self, region: str, relationshipID: str) -> dict:
+        """ delete replication relationship. See gcpcvs.deleteVolumeReplicationByID """
+        logging.info(f"deleteVolumeReplicationByID {region}, {relationshipID}")
+        r = await self._do_api_delete(f"{self.baseurl}/locations/{region}/VolumeReplications/{relationshipID}", 10*60)
+        return r.json()
+
+    #
+    # Backups
+    #
+
+    async def getBackups(self, region: str) -> list:
+        """ returns list with dicts of all backups in specified region. See gcpcvs.getBackups """
+        logging.info(f"getBackups {region}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Backups")
+        return r.json()
+
+    async def getBackupsByVolumeID(self, region: str, volumeID: str) -> list:
+        """ returns list with dicts of backups of volume "volumeID". See gcpcvs.getBackupsByVolumeID """
+        logging.info(f"getBackupsByVolume {region}, {volumeID}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Volumes/{volumeID}/Backups")
+        return r.json()
+
+    async def createBackup(self, region: str, volumeID: str, name: str) -> bool:
+        """ Create volume backup and wait for completion. See gcpcvs.createBackup """
+        logging.info(f"createBackup {region}, {volumeID}, {name} begin")
+        body = {
+            "name": name,
+            "volumeId": volumeID
+        }
+        r = await self._do_api_post(f"{self.baseurl}/locations/{region}/Backups", body, 10*60)
+        if r.status_code == 201 or r.status_code == 202:
+            # Wait until backup is complete
+            backupID = r.json()["response"]["AnyValue"]["backupId"]
+            while True:
+                await asyncio.sleep(5)
+                b = await self._do_api_get(f"{self.baseurl}/locations/{region}/Backups/{backupID}")
+                status = b.json()["lifeCycleState"]
+                if status == "available":
+                    break
+                if status == "error":
+                    logging.error(f"createBackup: Backup {name} of volume {volumeID} failed: {b.json().get('lifeCycleStateDetails')}")
+                    return False
+                logging.warning(f"createBackup: Backup {name} of volume {volumeID} still in status {status}. Waiting ...")
+            logging.info(f"createBackup: Backup {name} of volume {volumeID} completed.")
+            return True
+        else:
+            logging.error(f"createBackup: Backup {name} of volume {volumeID} failed.")
+            return False
+
+    async def rotateBackup(self, region: str, volumeID: str, count: int) -> bool:
+        """ create new backup according to name schema and delete oldest ones. See gcpcvs.rotateBackup """
+        logging.info(f"rotateBackup: Region: {region}, Volume: {volumeID}, Backups to keep: {count}")
+
+        # Currently max 32 backups per volume allowed. We allow max_backups - 2 to keep
+        max_backups = 32
+        if not 1 <= count <= max_backups - 2:
+            logging.error(f"rotateBackup: Number of backups {count} to keep must be between 1-{max_backups - 2}.")
+            return False
+
+        backups = await self.getBackupsByVolumeID(region, volumeID)
+        if len(backups) == max_backups:
+            logging.error(f"rotateBackup: Region: {region}, Volume: {volumeID}, Cannot create new backup, since max number ({max_backups}) of backups exist.")
+            return False
+
+        volumename = (await self.getVolumesByVolumeID(region, volumeID))["name"]
+        volumehash = volumeID[0:6]
+
+        # Create new backup. Will fail if name already exits, e.g if ran multiple times in the same minute
+        backupname = f"{volumename}-{volumehash}-{datetime.now().isoformat(timespec='minutes')}"
+        if not await self.createBackup(region, volumeID, backupname):
+            logging.error(f"rotateBackup: Region: {region}, Volume: {volumename}, VolumeID: {volumeID}: Creating Backup {backupname} failed.")
+            return False
+        p = re.compile(rf"{re.escape(volumename)}-......-\d\d\d\d-\d\d-\d\dT\d\d:\d\d")
+        backups = [backup for backup in await self.getBackupsByVolumeID(region, volumeID) if p.match(backup["name"])]
+        sortedbackups = sorted(backups, key=lambda b: datetime.fromisoformat(b['created'].strip("Z")), reverse=True)
+        if len(sortedbackups) > count:
+            logging.info(f"rotateBackup: Region: {region}, Volume: {volumename}, Pruning {len(sortedbackups) - count} old backup(s).")
+        await asyncio.gather(*[self.deleteBackupByBackupID(region, b["backupId"]) for b in sortedbackups[count:]])
+        return True
+
+    async def deleteBackupByBackupID(self, region: str, backupID: str) -> bool:
+        """ Deletes a CVS backup specified by region and backupID. See gcpcvs.deleteBackupByBackupID """
+        logging.info(f"deleteBackupByBackupID: {region}, {backupID} begin")
+        r = await self._do_api_delete(f"{self.baseurl}/locations/{region}/Backups/{backupID}", 10*60)
+        if r.status_code in [200, 202]:
+            logging.info(f"deleteBackupByBackupID: {region}, {backupID} done.")
+            return True
+        else:
+            logging.error(f"deleteBackupByBackupID: Deleting backup {backupID} in region {region} failed.")
+            return False
+
+    async def deleteBackupByName(self, region: str, volumeID: str, name: str) -> bool:
+        """ Deletes a CVS Backup specified by region and name. See gcpcvs.deleteBackupByName """
+        logging.info(f"deleteBackupByName {region}, {volumeID}, {name} begin")
+        backupID = [backup for backup in await self.getBackupsByVolumeID(region, volumeID) if backup["name"] == name]
+        if len(backupID) == 1:
+            return await self.deleteBackupByBackupID(region, backupID[0]["backupId"])
+        return False
+
+    async def deleteAllBackupsByVolumeID(self, region: str, volumeID: str):
+        """ deletes all backups for given volumeID. Use with care. See gcpcvs.deleteAllBackupsByVolumeID """
+        logging.info(f"deleteAllBackupsByVolumeID: Region: {region}, Volume: {volumeID}")
+        await asyncio.gather(*[self.deleteBackupByBackupID(region, b["backupId"]) for b in await self.getBackupsByVolumeID(region, volumeID)])
+
+    #
+    # KMS config
+    #
+
+    async def getKMSConfigurationByRegion(self, region: str) -> list:
+        """ returns list with dicts of all KMS configurations in specified region """
+        logging.info(f"getKMSConfigurationByRegion {region}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Storage/KmsConfig")
+        return r.json()
+
+    async def getKMSConfigurationByID(self, region: str, configID: str) -> dict:
+        """ returns dict of KMS configurations with configID in specified region """
+        logging.info(f"getKMSConfigurationByID {region} {configID}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Storage/KmsConfig/{configID}")
+        return r.json()
+
+    async def deleteKMSConfigurationByID(self, region: str, configID: str) -> bool:
+        """ deletes a KMS configurations in specified region with configID """
+        logging.info(f"deleteKMSConfigurationByID: {region}, {configID} begin")
+        r = await self._do_api_delete(f"{self.baseurl}/locations/{region}/Storage/KmsConfig/{configID}", 2*60)
+        if r.status_code in [200, 202]:
+            logging.info(f"deleteKMSConfigurationByID: {region}, {configID} done.")
+            return True
+        else:
+            logging.error(f"deleteKMSConfigurationByID: Deleting config {configID} in region {region} failed.")
+            return False
+
+    #
+    # Active Directory config
+    #
+
+    async def getActiveDirectoryConfigurationByRegion(self, region: str) -> list:
+        """ returns list with dicts of all AD configurations in specified region """
+        logging.info(f"getActiveDirectoryConfigurationByRegion {region}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Storage/ActiveDirectory")
+        return r.json()
+
+    async def getActiveDirectoryConfigurationByID(self, region: str, configID: str) -> dict:
+        """ returns dict of AD configuration with configID in specified region """
+        logging.info(f"getActiveDirectoryConfigurationByID {region} {configID}")
+        r = await self._do_api_get(f"{self.baseurl}/locations/{region}/Storage/ActiveDirectory/{configID}")
+        return r.json()
@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 
 import requests
-import base64, json, logging, re, datetime, threading
-from google.auth.transport.requests import Request as googleRequest
-from google.auth.jwt import Credentials
-from google.oauth2 import service_account
+import base64, json, logging, math, re, datetime, threading, weakref
+from abc import ABC, abstractmethod
+from time import monotonic, time
 from pathlib import Path
-from google.cloud import iam_credentials_v1
+# google.auth, google.oauth2 and google.cloud.iam_credentials_v1 (gRPC) take long to import.
+# They are imported by the credential helpers using them, not on "import gcpcvs"
 
 
 def isBase64(sb):
@@ -24,12 +24,106 @@ def isBase64(sb):
     except Exception:
             return False
 
+class _Creds(ABC):
+    # Base class of credential helpers. Tracks token expiry and refresh statistics
+    # A token is used until it expires within min_valid seconds
+    min_valid = 10
+
+    def __init__(self, cache=None, cache_key: str = None):
+        self.token = None
+        self.cache = cache
+        self.cache_key = cache_key
+        self.refreshes = 0
+        self.failures = 0
+        self.blocked = 0
+        self.refresh_seconds = 0.0
+        self.max_refresh_seconds = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def expires_in(self) -> float:
+        # Seconds until current token expires
+        pass
+
+    @abstractmethod
+    def _mint(self):
+        # Fetches a new token
+        pass
+
+    @abstractmethod
+    def _set_token(self, token: str, expiry: float):
+        # Uses token loaded from cache, valid until expiry (UNIX timestamp)
+        pass
+
+    def init_token(self):
+        # Takes initial token from DiskCache, if there is a valid one. Else fetches a new one
+        if self.cache != None:
+            cached = self.cache.get_token(self.cache_key)
+            if cached != None:
+                self._set_token(*cached)
+                return
+        self.refresh()
+
+    def refresh(self):
+        # Fetches a new token and records how long it took
+        start = monotonic()
+        try:
+            self._mint()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = repr(e)
+            raise
+        finally:
+            elapsed = monotonic() - start
+            self.refresh_seconds += elapsed
+            self.max_refresh_seconds = max(self.max_refresh_seconds, elapsed)
+        self.refreshes += 1
+        if self.cache != None:
+            self.cache.put_token(self.cache_key, self.token, time() + self.expires_in())
+
+    def get_token(self) -> str:
+        if self.expires_in() > self.min_valid:
+            return self.token
+        # Token to expire within min_valid seconds. Caller has to wait for a new one
+        with self._lock:
+            self.blocked += 1
+            if self.token == None:
+                self.init_token()
+            elif self.expires_in() <= self.min_valid:
+                self.refresh()
+        return self.token
+
+    def get_cached_token(self):
+        if self.expires_in() <= self.min_valid:
+            return None
+        return self.token
+
+    def get_stats(self) -> dict:
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "blocked": self.blocked,
+            "refresh_seconds_total": self.refresh_seconds,
+            "refresh_seconds_max": self.max_refresh_seconds,
+            "refresh_seconds_avg": self.refresh_seconds / self.refreshes if self.refreshes else 0.0,
+            "expires_in": self.expires_in(),
+            "last_error": self.last_error,
+        }
+
 class BearerAuth(requests.auth.AuthBase):
-    """ Stores, passes und refreshes JWT tokens for CVS. Use with with requests 'auth' parameter. """
+    """ Stores, passes und refreshes JWT tokens for CVS. Use with with requests 'auth' parameter. 
+
+    By default tokens are refreshed when a request finds them expired, so that request waits for
+    the new token. With refresh_ahead=True, a background thread renews the token refresh_margin
+    seconds before it expires and requests don't wait.
+    """
     credentials = None
     projectID = None
+    _refresher = None
 
-    def __init__(self, service_account_identifier):
+    def __init__(self, service_account_identifier, refresh_ahead: bool = False, refresh_margin: float = 300, cache = None,
+                 lazy: bool = False):
         """ Initialize token
 
         Args:
@@ -38,6 +132,10 @@ class BearerAuth(requests.auth.AuthBase):
                     1. Absolute file path to an JSON key file
                     2. JSON key as base64-encoded string
                     3. Service Account principal name when using service account impersonation
+            refresh_ahead (bool): Renew token in a background thread before it expires, default = False
+            refresh_margin (float): Seconds before expiry the background thread renews the token, default = 300
+            cache (DiskCache): Reuse still valid tokens stored on disk and store new ones. Default None = no disk cache
+            lazy (bool): Fetch first token with the first request instead of now, default = False
 
         It raises a ValueError if key provided isn't a valid JSON key.
         """
@@ -48,7 +146,7 @@ class BearerAuth(requests.auth.AuthBase):
         user_managed_sa_regex = "^[a-z]([-a-z0-9]*[a-z0-9])@[a-z0-9-]+\.iam\.gserviceaccount\.com$"
         if re.match(user_managed_sa_regex, service_account_identifier):
             self.projectID = service_account_identifier.split('@')[1].split('.')[0]
-            self.credentials = self.ImpersonationCreds(service_account_identifier)
+            self.credentials = self.ImpersonationCreds(service_account_identifier, cache, lazy)
         else:
             # check if we got passed a path to a service account JSON key file
             # or we got passed the key itself encoded base64
@@ -66,7 +164,10 @@ class BearerAuth(requests.auth.AuthBase):
                     raise ValueError('Passed credentials are not a base64 encoded json key nor a vaild file path to a keyfile.')
 
             self.projectID = json_key['project_id']
-            self.credentials = self.JSONKeyCreds(json_key)
+            self.credentials = self.JSONKeyCreds(json_key, cache, lazy)
+
+        if refresh_ahead:
+            self.start_refresh_ahead(refresh_margin)
 
     def __call__(self, r):
         r.headers["authorization"] = "Bearer " + self.credentials.get_token()
@@ -79,60 +180,166 @@ class BearerAuth(requests.auth.AuthBase):
         """ Returns projectID fetched from JSON key """
         return self.projectID
 
-    class ImpersonationCreds:
+    def get_cached_token(self):
+        """ Returns current token if it is still valid, else None. Never refreshes, never blocks """
+        return self.credentials.get_cached_token()
+
+    def get_stats(self) -> dict:
+        """ Returns number of refreshes and failures, refresh latency, number of requests which had to
+        wait for a refresh and seconds until the current token expires """
+        return self.credentials.get_stats()
+
+    def start_refresh_ahead(self, refresh_margin: float = 300):
+        """ Starts background thread renewing the token refresh_margin seconds before it expires.
+        Does nothing for tokens which never expire """
+        if self._refresher != None and self._refresher.is_alive():
+            return
+        if math.isinf(self.credentials.expires_in()):
+            return
+        self._stop_refresh = threading.Event()
+        self._refresher = threading.Thread(target=BearerAuth._refresh_ahead,
+                                           args=(weakref.ref(self), self._stop_refresh, refresh_margin),
+                                           name="gcpcvs-BearerAuth-refresh", daemon=True)
+        self._refresher.start()
+
+    def close(self):
+        """ Stops background refresh thread """
+        if self._refresher != None:
+            self._stop_refresh.set()
+            self._refresher = None
+
+    @staticmethod
+    def _refresh_ahead(ref, stop: threading.Event, refresh_margin: float):
+        # Holds only a weak reference while sleeping, so unused BearerAuth objects can be garbage collected
+        retry_delay = 1
+        refreshed = False
+        while not stop.is_set():
+            # Only a refresh in the previous iteration counts, not one before a sleep
+            just_refreshed, refreshed = refreshed, False
+            auth = ref()
+            if auth == None:
+                return
+            credentials = auth.credentials
+            del auth
+            wait = credentials.expires_in() - refresh_margin
+            if wait > 0:
+                stop.wait(min(wait, threading.TIMEOUT_MAX))
+                continue
+            if just_refreshed:
+                # Token lives shorter than refresh_margin. Renew it at half of its lifetime
+                stop.wait(max(credentials.expires_in() / 2, 1))
+                continue
+            try:
+                with credentials._lock:
+                    credentials.refresh()
+                refreshed = True
+                retry_delay = 1
+            except Exception as e:
+                # Old token is still valid for a while. Requests refresh themselves if it expires
+                logging.warning(f"BearerAuth: background token refresh failed: {e}. Retry in {retry_delay}s")
+                stop.wait(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)
+
+    @classmethod
+    def from_token(cls, token: str, projectID: str = None):
+        """ Returns BearerAuth which always passes a fixed token. Used with test servers like FakeCVSServer
+
+        Args:
+            token (str): token to pass
+            projectID (str): projectID (or number) returned by getProjectID()
+        """
+
+        auth = cls.__new__(cls)
+        auth.projectID = projectID
+        auth.credentials = cls.StaticCreds(token)
+        return auth
+
+    class StaticCreds(_Creds):
+        # Internal helper class for fixed tokens
+        def __init__(self, token: str):
+            super().__init__()
+            self.token = token
+
+        def expires_in(self) -> float:
+            return float("inf")
+
+        def _mint(self):
+            # Token never expires, nothing to fetch
+            pass
+
+        def _set_token(self, token: str, expiry: float):
+            self.token = token
+
+    class ImpersonationCreds(_Creds):
         # Internal helper class for Service Account Impersonation auth
-        expiry = datetime.datetime.now()
-        token = None
         service_account_name = None
         token_life_time = 15*60  # 15 Minutes
-        _lock = threading.Lock()
 
-        def __init__(self, service_account_name: str):
+        def __init__(self, service_account_name: str, cache = None, lazy: bool = False):
+            super().__init__(cache, service_account_name)
             self.service_account_name = service_account_name
-            self._new_token()
+            self.expiry = datetime.datetime.now()
+            self._client = None
+            if not lazy:
+                self.init_token()
 
-        def get_token(self) -> str:
-            with self._lock:
-                if datetime.datetime.now() + datetime.timedelta(seconds=10) > self.expiry:
-                    # Token to expire within 10s. Let's refresh
-                    self._new_token()
-            return self.token
+        def expires_in(self) -> float:
+            return (self.expiry - datetime.datetime.now()).total_seconds()
+
+        def _set_token(self, token: str, expiry: float):
+            self.token = token
+            self.expiry = datetime.datetime.fromtimestamp(expiry)
 
-        def _new_token(self):
+        def _mint(self):
             audience = 'https://cloudvolumesgcp-api.netapp.com'
 
             now = datetime.datetime.now()
-            self.expiry = now + datetime.timedelta(seconds = self.token_life_time)
+            expiry = now + datetime.timedelta(seconds = self.token_life_time)
 
             claims = {
                 "iss": self.service_account_name,
                 "sub": self.service_account_name,
                 "iat": int(now.timestamp()),
-                "exp": int(self.expiry.timestamp()),
+                "exp": int(expiry.timestamp()),
                 "aud": audience,
             }
 
-            client = iam_credentials_v1.IAMCredentialsClient()
-            service_account_path = client.service_account_path('-', self.service_account_name)
-            response = client.sign_jwt(request = { "name": service_account_path, "payload": json.dumps(claims) })
+            if self._client == None:
+                from google.cloud import iam_credentials_v1
+                self._client = iam_credentials_v1.IAMCredentialsClient()
+            service_account_path = self._client.service_account_path('-', self.service_account_name)
+            response = self._client.sign_jwt(request = { "name": service_account_path, "payload": json.dumps(claims) })
             self.token = response.signed_jwt
+            self.expiry = expiry
 
-    class JSONKeyCreds:
+    class JSONKeyCreds(_Creds):
         # Internal helper class for JSON key auth
         credentials = None
-        _lock = threading.Lock()
 
-        def __init__(self, json_key: str):
+        def __init__(self, json_key: str, cache = None, lazy: bool = False):
+            super().__init__(cache, f"{json_key.get('client_email')}:{json_key.get('private_key_id')}")
             audience = 'https://cloudvolumesgcp-api.netapp.com'
 
+            from google.auth.jwt import Credentials
+            from google.oauth2 import service_account
             svc_creds = service_account.Credentials.from_service_account_info(json_key)
-            jwt_creds = Credentials.from_signing_credentials(svc_creds, audience=audience)
-            jwt_creds.refresh(googleRequest())
+            self.credentials = Credentials.from_signing_credentials(svc_creds, audience=audience)
+            if not lazy:
+                self.init_token()
+
+        def expires_in(self) -> float:
+            if self.credentials.expiry == None:
+                return 0
+            # google-auth keeps expiry as naive UTC datetime
+            now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            return (self.credentials.expiry - now).total_seconds()
 
-            self.credentials = jwt_creds
+        def _mint(self):
+            from google.auth.transport.requests import Request as googleRequest
+            self.credentials.refresh(googleRequest())
+            self.token = self.credentials.token.decode('utf-8')
 
-        def get_token(self) -> str:
-            with self._lock:
-                if self.credentials.expired:
-                    self.credentials.refresh(googleRequest())
-            return self.credentials.token.decode('utf-8')
+        def _set_token(self, token: str, expiry: float):
+            self.token = token
+            self.credentials.token = token.encode('utf-8')
+            self.credentials.expiry = datetime.datetime.fromtimestamp(expiry, datetime.timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+# In-memory cache for CVS API GET responses
+
+import threading
+from collections import OrderedDict
+from time import monotonic
+from urllib.parse import urlsplit
+
+# Object collections of the CVS API
+API_COLLECTIONS = ["Pools", "Volumes", "DataProtectionVolumes", "Snapshots", "Backups", "VolumeReplications",
+                   "Storage/KmsConfig", "Storage/ActiveDirectory", "version"]
+
+def parse_api_path(url: str) -> tuple:
+    """ Splits a CVS API URL into region and object type
+
+    Args:
+        url (str): CVS API URL, e.g. https://.../v2/projects/123/locations/us-east4/Volumes/<volumeId>/Backups
+
+    Returns:
+        tuple: (region, object type), e.g. ("us-east4", "Backups"). (None, None) for non-regional paths.
+            Object type is the last collection in the path, "Storage/*" collections keep their prefix
+    """
+
+    path = urlsplit(url).path
+    if "/locations/" not in path:
+        return None, None
+    segments = path.split("/locations/", 1)[1].strip("/").split("/")
+    region = segments[0]
+    segments = segments[1:]
+    if len(segments) >= 2 and segments[0] == "Storage":
+        segments = [segments[0] + "/" + segments[1]] + segments[2:]
+    # Collections and IDs alternate: Volumes/<id>/Backups/<id>. Actions like VolumeReplications/<id>/Break
+    # belong to the collection before them
+    collections = [c for c in segments[0::2] if c in API_COLLECTIONS]
+    if len(collections) > 0:
+        return region, collections[-1]
+    return region, segments[0] if len(segments) > 0 else None
+
+class ResponseCache():
+    """ TTL and LRU bounded cache for GET responses of the CVS API, keyed by URL path
+
+    Entries expire after the TTL of their object type (see DEFAULT_TTLS). If the cache holds more than
+    max_entries responses, the least recently used ones are dropped. gcpcvs invalidates the
+    affected region and object type on all POST/PUT/DELETE calls.
+
+    Share one ResponseCache between gcpcvs objects of the same project only.
+    """
+
+    # Seconds a response stays valid, by object type
+    DEFAULT_TTLS = {
+        "Pools": 60,
+        "Volumes": 30,
+        "Snapshots": 30,
+        "Backups": 30,
+        "VolumeReplications": 30,
+        "Storage/KmsConfig": 300,
+        "Storage/ActiveDirectory": 300,
+        "version": 3600,
+    }
+
+    # Changes to objects of type key also change list results of these types
+    RELATED = {
+        "Volumes": ["Pools"],
+        "DataProtectionVolumes": ["Volumes", "Pools"],
+        "Snapshots": ["Volumes"],
+        "Backups": ["Volumes"],
+        "VolumeReplications": ["Volumes"],
+    }
+
+    def __init__(self, ttls: dict = None, default_ttl: float = 30, max_entries: int = 1024):
+        """
+        Args:
+            ttls (dict): object type -> TTL in seconds. Overrides DEFAULT_TTLS. Use 0 to disable caching of a type
+            default_ttl (float): TTL for object types not listed, default = 30
+            max_entries (int): Maximum number of cached responses, default = 1024
+        """
+
+        self.ttls = dict(self.DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str):
+        """ Returns cached response for url, or None if not cached or expired """
+        key = urlsplit(url).path
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry == None or entry[0] < monotonic():
+                if entry != None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def put(self, url: str, response):
+        """ Stores response for url """
+        region, resource = parse_api_path(url)
+        ttl = self.ttls.get(resource, self.default_ttl)
+        if ttl <= 0:
+            return
+        key = urlsplit(url).path
+        with self._lock:
+            self._entries[key] = (monotonic() + ttl, region, resource, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, region: str = None, resource: str = None):
+        """ Drops cached responses
+
+        Args:
+            region (str): Region to drop. Entries for all regions ("-") are dropped too. None for all regions
+            resource (str): Object type to drop, e.g. "Volumes". Related types (see RELATED) are dropped too. None for all types
+        """
+
+        resources = None
+        if resource != None:
+            resources = [resource] + self.RELATED.get(resource, [])
+        with self._lock:
+            for key in [k for k, e in self._entries.items()
+                        if (region == None or region == "-" or e[1] in [region, "-"]) and (resources == None or e[2] in resources)]:
+                del self._entries[key]
+
+    def clear(self):
+        """ Drops all cached responses """
+        self.invalidate()
+
+    def get_stats(self) -> dict:
+        """ Returns number of entries, hits, misses and evictions """
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
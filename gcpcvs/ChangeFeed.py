@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+#
+# Change feed: added, removed and modified CVS objects between two list calls
+
+import logging
+import threading
+from typing import Callable, Iterable
+
+# Object types the feed can follow: API path -> ID field
+FEED_RESOURCES = {
+    "Pools": "poolId",
+    "Volumes": "volumeId",
+    "Snapshots": "snapshotId",
+    "Backups": "backupId",
+    "VolumeReplications": "relationshipId",
+    "Storage/KmsConfig": "uuid",
+    "Storage/ActiveDirectory": "UUID",
+}
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+class Change():
+    """ One changed object
+
+    Attributes:
+        kind (str): ADDED, REMOVED or MODIFIED
+        region (str): region the list call was done for ("-" for all regions)
+        resource (str): object type, one of FEED_RESOURCES (e.g. "Volumes")
+        objectID (str): ID of the object
+        object (dict): object as listed now, None if removed
+        previous (dict): object as listed before, None if added
+        fields (dict): field -> (old value, new value) of modified fields. Missing fields are None
+    """
+
+    __slots__ = ("kind", "region", "resource", "objectID", "object", "previous", "fields")
+
+    def __init__(self, kind: str, region: str, resource: str, objectID: str, object: dict, previous: dict, fields: dict = None):
+        self.kind = kind
+        self.region = region
+        self.resource = resource
+        self.objectID = objectID
+        self.object = object
+        self.previous = previous
+        self.fields = fields or {}
+
+    def __repr__(self) -> str:
+        fields = f", fields={sorted(self.fields)}" if self.fields else ""
+        return f"Change({self.kind} {self.resource}/{self.objectID} in {self.region}{fields})"
+
+def diff_fields(previous: dict, current: dict, ignore: frozenset = frozenset()) -> dict:
+    """ Returns field -> (old value, new value) of all top level fields which differ """
+    fields = {}
+    for key, value in current.items():
+        if key not in ignore:
+            old = previous.get(key)
+            if old != value or key not in previous:
+                fields[key] = (old, value)
+    for key in previous.keys() - current.keys():
+        if key not in ignore:
+            fields[key] = (previous[key], None)
+    return fields
+
+class ChangeFeed():
+    """ Turns repeated list calls into a feed of changes
+
+    Keeps the last listed snapshot per region and object type, keyed by object ID. Each poll
+    compares the new list with it in one pass and hands the added, removed and modified objects,
+    with the fields which changed, to the subscribers. Work done by subscribers grows with the
+    number of changes, not with the number of objects.
+
+    Example:
+        feed = ChangeFeed(cvs, ignore_fields=["usedBytes"])
+        feed.subscribe(lambda changes: print(changes), resources=["Volumes"])
+        feed.start(regions=["-"], interval=60)
+
+    The first poll of a region and object type reports all objects as added, unless
+    publish_initial is False.
+    """
+
+    def __init__(self, cvs, ignore_fields: Iterable[str] = None, publish_initial: bool = True):
+        """
+        Args:
+            cvs (gcpcvs): client used for the list calls
+            ignore_fields (iterable): fields whose changes are ignored, e.g. "usedBytes". Default None = none
+            publish_initial (bool): Report objects of the first poll as added, default = True
+        """
+
+        self.cvs = cvs
+        self.ignore_fields = frozenset(ignore_fields or ())
+        self.publish_initial = publish_initial
+        self.polls = 0
+        self._snapshots = {}        # (region, resource) -> {objectID: object}
+        self._subscribers = []      # (callback, resources or None)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def subscribe(self, callback: Callable, resources: Iterable[str] = None):
+        """ Calls callback(changes) with the list of changes of each poll which found changes
+
+        Args:
+            callback (callable): Called in the polling thread. Exceptions are logged and ignored
+            resources (iterable): Only pass changes of these object types. Default None = all
+        """
+
+        with self._lock:
+            self._subscribers.append((callback, frozenset(resources) if resources != None else None))
+
+    def unsubscribe(self, callback: Callable):
+        """ Removes all subscriptions of callback """
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[0] != callback]
+
+    def snapshot(self, region: str, resource: str) -> dict:
+        """ Returns objectID -> object of the last poll of region and resource, {} if not polled yet """
+        with self._lock:
+            return dict(self._snapshots.get((region, resource), {}))
+
+    def load(self, region: str, resource: str, objects: Iterable[dict]):
+        """ Sets the snapshot of region and resource without publishing changes, e.g. to continue from stored state """
+        id_field = FEED_RESOURCES[resource]
+        snapshot = {o[id_field]: o for o in objects}
+        with self._lock:
+            self._snapshots[(region, resource)] = snapshot
+
+    def update(self, region: str, resource: str, objects: Iterable[dict]) -> list:
+        """ Compares objects with the last snapshot of region and resource and publishes the changes
+
+        Args:
+            region (str): Name of GCP region, or "-"
+            resource (str): Object type, one of FEED_RESOURCES
+            objects (iterable): all objects currently listed, e.g. from cvs.iterVolumesByRegion()
+
+        Returns:
+            list: changes found
+        """
+
+        if resource not in FEED_RESOURCES:
+            raise ValueError(f"Cannot follow {resource}. Supported: {', '.join(FEED_RESOURCES)}")
+        id_field = FEED_RESOURCES[resource]
+        key = (region, resource)
+        # Read the list (may be streamed from the API) before taking the lock
+        objects = list(objects)
+
+        # Concurrent updates of the same snapshot must not diff against the same previous state
+        with self._lock:
+            initial = key not in self._snapshots
+            previous = dict(self._snapshots.get(key, {}))
+            changes = []
+            current = {}
+            for obj in objects:
+                objectID = obj[id_field]
+                current[objectID] = obj
+                old = previous.pop(objectID, None)
+                if old == None:
+                    changes.append(Change(ADDED, region, resource, objectID, obj, None))
+                elif old != obj:
+                    fields = diff_fields(old, obj, self.ignore_fields)
+                    if fields:
+                        changes.append(Change(MODIFIED, region, resource, objectID, obj, old, fields))
+            # Objects not listed anymore
+            for objectID, old in previous.items():
+                changes.append(Change(REMOVED, region, resource, objectID, None, old))
+            self._snapshots[key] = current
+            self.polls += 1
+            subscribers = list(self._subscribers)
+        if initial and not self.publish_initial:
+            return []
+        if changes:
+            self._publish(resource, changes, subscribers)
+        return changes
+
+    def _publish(self, resource: str, changes: list, subscribers: list):
+        for callback, resources in subscribers:
+            if resources != None and resource not in resources:
+                continue
+            try:
+                callback(changes)
+            except Exception as e:
+                logging.error(f"ChangeFeed: subscriber {callback} failed: {e}")
+
+    def poll(self, region: str, resource: str) -> list:
+        """ Lists resource in region and publishes the changes. See update() """
+        return self.update(region, resource, self.cvs._API_iterAll(region, resource, refresh=True))
+
+    def poll_all(self, regions: list = None, resources: list = None) -> list:
+        """ Polls every region and object type. Failed list calls are logged and skipped
+
+        Args:
+            regions (list): Regions to poll. Default None = "-" (all regions with one call)
+            resources (list): Object types to poll. Default None = all FEED_RESOURCES
+
+        Returns:
+            list: changes found
+        """
+
+        changes = []
+        for region in regions or ["-"]:
+            for resource in resources or FEED_RESOURCES:
+                try:
+                    changes.extend(self.poll(region, resource))
+                except Exception as e:
+                    logging.warning(f"ChangeFeed: listing {resource} in {region} failed: {e}")
+        return changes
+
+    def start(self, regions: list = None, resources: list = None, interval: float = 60):
+        """ Polls in a daemon thread every interval seconds until stop(). See poll_all() """
+        with self._lock:
+            if self._thread != None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(regions, resources, interval),
+                                            name="gcpcvs-ChangeFeed", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """ Stops the polling thread started by start() """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread != None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self, regions: list, resources: list, interval: float):
+        while not self._stop.is_set():
+            self.poll_all(regions, resources)
+            self._stop.wait(interval)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#
+# On-disk cache for tokens, project numbers and region maps, to speed up short lived processes like cvs.py
+
+import hashlib
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+from time import time
+from typing import Optional
+
+def default_cache_dir() -> str:
+    """ Returns $XDG_CACHE_HOME/gcpcvs, default ~/.cache/gcpcvs """
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "gcpcvs")
+
+class DiskCache():
+    """ Stores still valid tokens and projectId -> projectNumber mappings on disk
+
+    Short lived processes (e.g. every cvs.py call) otherwise mint a new token and resolve the
+    project number on every start, which takes seconds. With a warm cache, creating a gcpcvs
+    object doesn't do any network calls.
+
+    Tokens are credentials. The cache directory is created with mode 0700 and files with mode
+    0600. Files which other users could have written or read are ignored. Tokens are stored per
+    service account (file name is a hash of it) and only used while they are valid.
+
+    Opt-in, pass to gcpcvs/AsyncGcpcvs/BearerAuth:
+
+        cvs = gcpcvs.gcpcvs(service_account, disk_cache=DiskCache())
+    """
+
+    def __init__(self, path: str = None, min_valid: float = 60):
+        """
+        Args:
+            path (str): Cache directory, default = $XDG_CACHE_HOME/gcpcvs or ~/.cache/gcpcvs
+            min_valid (float): Cached tokens expiring within min_valid seconds aren't used, default = 60
+        """
+
+        self.path = path or default_cache_dir()
+        self.min_valid = min_valid
+        self._lock = threading.Lock()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _prepare_dir(self) -> bool:
+        # Creates cache directory, restricted to the current user
+        try:
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+            if stat.S_IMODE(os.stat(self.path).st_mode) & 0o077:
+                os.chmod(self.path, 0o700)
+            return True
+        except OSError as e:
+            logging.warning(f"DiskCache: cannot use {self.path}: {e}")
+            return False
+
+    def _read(self, name: str) -> Optional[dict]:
+        try:
+            fd = os.open(self._file(name), os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            st = os.fstat(fd)
+            if hasattr(os, "getuid") and (st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) & 0o077):
+                logging.warning(f"DiskCache: ignoring {self._file(name)}, it is accessible by other users")
+                return None
+            with os.fdopen(fd, "r") as f:
+                fd = None
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+        finally:
+            if fd != None:
+                os.close(fd)
+
+    def _write(self, name: str, data: dict):
+        # Writes file atomically with mode 0600
+        if not self._prepare_dir():
+            return
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".tmp-")    # mkstemp creates files with mode 0600
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self._file(name))
+        except OSError as e:
+            logging.warning(f"DiskCache: cannot write {self._file(name)}: {e}")
+
+    @staticmethod
+    def _token_file(key: str) -> str:
+        return "token-" + hashlib.sha256(key.encode()).hexdigest()[:32] + ".json"
+
+    def get_token(self, key: str) -> Optional[tuple]:
+        """ Returns (token, expiry as UNIX timestamp) cached for service account key, None if there is no valid token """
+        data = self._read(self._token_file(key))
+        if data == None or data.get("key") != key or data.get("expiry", 0) - time() <= self.min_valid:
+            return None
+        return data["token"], data["expiry"]
+
+    def put_token(self, key: str, token: str, expiry: float):
+        """ Stores token of service account key, which expires at expiry (UNIX timestamp) """
+        with self._lock:
+            self._write(self._token_file(key), {"key": key, "token": token, "expiry": expiry})
+
+    def get_project_number(self, project_id: str) -> Optional[str]:
+        """ Returns cached project number of project_id, None if unknown """
+        return (self._read("projects.json") or {}).get(project_id)
+
+    def put_project_number(self, project_id: str, project_number: str):
+        """ Stores project number of project_id """
+        with self._lock:
+            projects = self._read("projects.json") or {}
+            projects[project_id] = str(project_number)
+            self._write("projects.json", projects)
+
+    def get_region_map(self, project: str) -> Optional[tuple]:
+        """ Returns (region -> capabilities, UNIX timestamp of the probe) cached for project, None if unknown """
+        data = self._read(f"regions-{project}.json")
+        if data == None or "regions" not in data:
+            return None
+        return data["regions"], data.get("probed", 0)
+
+    def put_region_map(self, project: str, regions: dict, probed: float):
+        """ Stores region capabilities of project, probed at UNIX timestamp probed """
+        with self._lock:
+            self._write(f"regions-{project}.json", {"regions": regions, "probed": probed})
+
+    def clear(self):
+        """ Removes all cached tokens, project numbers and region maps """
+        with self._lock:
+            try:
+                names = os.listdir(self.path)
+            except OSError:
+                return
+            for name in names:
+                if name == "projects.json" or name.startswith("token-") or name.startswith("regions-"):
+                    os.remove(self._file(name))
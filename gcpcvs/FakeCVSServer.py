@@ -0,0 +1,663 @@
+# -*- coding: utf-8 -*-
+#
+# Local stand-in for the CVS v2 REST API, for tests and benchmarks without the real service
+
+import argparse
+import heapq
+import json
+import logging
+import random
+import threading
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+from urllib.parse import urlsplit
+
+from .BearerAuth import BearerAuth
+from .Retry import JOB_SLOT_MESSAGE
+
+# Object types served: API path -> (ID field, state field). State field None = object is created instantly
+FAKE_RESOURCES = {
+    "Pools": ("poolId", "state"),
+    "Volumes": ("volumeId", "lifeCycleState"),
+    "Snapshots": ("snapshotId", "lifeCycleState"),
+    "Backups": ("backupId", "lifeCycleState"),
+    "VolumeReplications": ("relationshipId", "lifeCycleState"),
+    "Storage/KmsConfig": ("uuid", None),
+    "Storage/ActiveDirectory": ("UUID", None),
+}
+
+FAKE_REGIONS = ["us-east4", "us-central1", "europe-west3", "asia-southeast1"]
+
+# Default messages of injected errors
+FAULT_MESSAGES = {
+    409: "Conflict: another operation is in progress for this resource",
+    429: "Too many requests",
+    500: f"{JOB_SLOT_MESSAGE} at this time. Please retry later",
+    503: "Service unavailable",
+}
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+class FakeHTTPError(Exception):
+    # Ends request handling with an error response
+    def __init__(self, status: int, message: str, headers: dict = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+class Fault():
+    """ Error response injected by FakeCVSServer
+
+    Example:
+        Fault(429, rate=0.05, retry_after=1)            # 5% of all calls are throttled
+        Fault(500, methods=["POST"], count=3)           # first 3 POSTs fail with "Cannot spawn additional jobs"
+        Fault(409, resources=["Volumes"], rate=0.1)     # 10% of volume calls get a conflict
+        Fault(503, regions=["europe-west3"])            # europe-west3 is down
+    """
+
+    def __init__(self, status: int, rate: float = 1.0, methods: list = None, resources: list = None, message: str = None,
+                 retry_after: float = None, count: int = None, regions: list = None):
+        """
+        Args:
+            status (int): HTTP status code to return
+            rate (float): Probability (0-1) a matching call fails, default = 1.0
+            methods (list): HTTP methods to match, None = all
+            resources (list): Object types to match (e.g. "Volumes", "version"), None = all
+            message (str): Error message. Default depends on status, see FAULT_MESSAGES
+            retry_after (float): Value for Retry-After header, None = no header
+            count (int): Inject at most count errors, None = no limit
+            regions (list): Regions (as in the request path, "-" for all regions calls) to match, None = all
+        """
+
+        self.status = status
+        self.rate = rate
+        self.methods = [m.upper() for m in methods] if methods != None else None
+        self.resources = resources
+        self.message = message or FAULT_MESSAGES.get(status, "Injected error")
+        self.retry_after = retry_after
+        self.count = count
+        self.regions = regions
+        self.injected = 0
+
+    def matches(self, method: str, resource: str, region: str = None) -> bool:
+        if self.count != None and self.injected >= self.count:
+            return False
+        if self.methods != None and method not in self.methods:
+            return False
+        if self.resources != None and resource not in self.resources:
+            return False
+        if self.regions != None and region not in self.regions:
+            return False
+        return random.random() < self.rate
+
+class FakeCVSServer():
+    """ In-process fake of the CVS v2 REST API
+
+    Serves Pools, Volumes, DataProtectionVolumes, Snapshots, Backups, VolumeReplications,
+    Storage/KmsConfig, Storage/ActiveDirectory and version with the request and response shapes
+    gcpcvs expects. Long running operations answer 202 with the object in response.AnyValue and
+    move from "creating"/"deleting"/"updating" to their final state after create_seconds/delete_seconds.
+    Objects are kept in memory; seed() fills the server with large fleets.
+
+    Latency is configured per call with keys "METHOD Resource", "Resource", "METHOD" or "*"
+    (most specific wins). Values are seconds or (min, max) for uniformly distributed latency.
+    Errors are injected with Fault objects. With max_jobs_per_region set, the server answers
+    500 "Cannot spawn additional jobs" like the real API if too many jobs are in flight.
+
+    Example:
+        with FakeCVSServer(latency={"GET Volumes": (0.05, 0.2)}, faults=[Fault(429, rate=0.05)]) as server:
+            server.seed(volumes_per_pool=500)
+            cvs = server.client()
+            vols = cvs.getVolumesByRegion("-")
+
+    Run standalone with: python -m gcpcvs.FakeCVSServer --help
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, project: str = "123456789012", latency: dict = None,
+                 faults: list = None, create_seconds: float = 1.0, delete_seconds: float = 1.0,
+                 max_jobs_per_region: int = None):
+        """
+        Args:
+            host (str): Address to listen on, default = 127.0.0.1
+            port (int): Port to listen on, default = 0 (any free port)
+            project (str): Project number served, default = 123456789012
+            latency (dict): Latency per call, see class description. Default None = no added latency
+            faults (list): list of Fault objects, checked in order. Default None = no errors
+            create_seconds (float): Seconds objects stay in "creating" state, default = 1.0
+            delete_seconds (float): Seconds objects stay in "deleting" state, default = 1.0
+            max_jobs_per_region (int): Jobs in flight per region before 500 errors are returned, None = no limit
+        """
+
+        self.host = host
+        self.port = port
+        self.project = str(project)
+        self.latency = latency or {}
+        self.faults = faults or []
+        self.create_seconds = create_seconds
+        self.delete_seconds = delete_seconds
+        self.max_jobs_per_region = max_jobs_per_region
+        self._objects = {resource: {} for resource in FAKE_RESOURCES}     # resource -> region -> {id: object}
+        self._transitions = []      # heap of (due, seq, region, resource, id, next state or None for removal)
+        self._seq = 0
+        self._jobs = {}             # region -> jobs in flight
+        self._requests = {}         # "METHOD Resource" -> number of calls
+        self._errors = {}           # status -> number of error responses
+        self._connections = 0       # client connections accepted
+        self._lock = threading.RLock()
+        self._httpd = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """ Starts serving in a background thread """
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="gcpcvs-FakeCVSServer", daemon=True)
+        self._thread.start()
+        logging.info(f"FakeCVSServer: serving project {self.project} on {self.url}")
+
+    def stop(self):
+        """ Stops serving """
+        if self._httpd != None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    @property
+    def url(self) -> str:
+        """ Endpoint URL to pass to gcpcvs """
+        return f"http://{self.host}:{self.port}"
+
+    def client(self, cls=None, **kwargs):
+        """ Returns a client object using this server
+
+        Args:
+            cls: Client class, default = gcpcvs. Use AsyncGcpcvs for asyncio
+            kwargs: Further arguments passed to the client, e.g. job_scheduler
+        """
+
+        if cls == None:
+            from .gcpcvs import gcpcvs as cls
+        return cls(BearerAuth.from_token("fake-token", self.project), project=self.project, endpoint=self.url, **kwargs)
+
+    #
+    # Object store
+    #
+
+    def add(self, region: str, resource: str, obj: dict) -> dict:
+        """ Adds an object in its final state. Missing ID and region fields are filled in
+
+        Returns:
+            dict: the stored object
+        """
+
+        id_field = FAKE_RESOURCES[resource][0]
+        obj.setdefault(id_field, str(uuid.uuid4()))
+        obj["region"] = region
+        with self._lock:
+            self._objects[resource].setdefault(region, {})[obj[id_field]] = obj
+        return obj
+
+    def objects(self, region: str, resource: str) -> list:
+        """ Returns copies of all objects of a type. region "-" for all regions """
+        with self._lock:
+            self._advance()
+            return [dict(o) for o in self._list(region, resource)]
+
+    def seed(self, regions: list = None, pools_per_region: int = 2, volumes_per_pool: int = 50, snapshots_per_volume: int = 2,
+             backups_per_volume: int = 1, replications_per_region: int = 0, seed: int = 0) -> dict:
+        """ Creates a fleet of available objects
+
+        The defaults create 400 volumes and 1200 snapshots and backups in 4 regions. Use e.g.
+        volumes_per_pool=1250 for 10k volumes.
+
+        Args:
+            regions (list): Regions to populate, default = FAKE_REGIONS
+            pools_per_region (int): Pools per region
+            volumes_per_pool (int): Volumes per pool
+            snapshots_per_volume (int): Snapshots per volume
+            backups_per_volume (int): Backups per volume
+            replications_per_region (int): Replications per region. Each creates a data protection volume
+                in the next region, replicating one of the region's volumes
+            seed (int): Random seed, same seed creates the same names and sizes
+
+        Returns:
+            dict: Object type -> number of objects created
+        """
+
+        rnd = random.Random(seed)
+        regions = regions or FAKE_REGIONS
+        created = {}
+        def add(region, resource, obj):
+            created[resource] = created.get(resource, 0) + 1
+            return self.add(region, resource, obj)
+
+        for r, region in enumerate(regions):
+            volumes = []
+            for p in range(pools_per_region):
+                pool = add(region, "Pools", self._new_pool(region, {"name": f"pool-{region}-{p}", "sizeInBytes": 10 * 1024**4}))
+                for v in range(volumes_per_pool):
+                    volume = add(region, "Volumes", self._new_volume(region, {
+                        "name": f"vol-{region}-{p}-{v}", "poolId": pool["poolId"], "quotaInBytes": rnd.randint(1, 100) * 1024**3}))
+                    volume["usedBytes"] = rnd.randint(0, volume["quotaInBytes"])
+                    volumes.append(volume)
+                    for s in range(snapshots_per_volume):
+                        add(region, "Snapshots", self._new_snapshot(region, {"name": f"snap-{s}", "volumeId": volume["volumeId"]}))
+                    for b in range(backups_per_volume):
+                        add(region, "Backups", self._new_backup(region, {"name": f"backup-{b}", "volumeId": volume["volumeId"]}))
+            remote = regions[(r + 1) % len(regions)]
+            for i in range(min(replications_per_region, len(volumes))):
+                source = volumes[i]
+                destination = add(remote, "Volumes", self._new_volume(remote, {
+                    "name": f"{source['name']}-dp", "quotaInBytes": source["quotaInBytes"], "isDataProtection": True}))
+                relationship = add(remote, "VolumeReplications", self._new_replication(remote, {
+                    "name": f"crr-{source['name']}", "remoteRegion": region, "endpointType": "dst",
+                    "sourceVolumeUUID": source["volumeId"], "destinationVolumeUUID": destination["volumeId"],
+                    "replicationPolicy": "MirrorAllSnapshots", "replicationSchedule": "hourly"}))
+                relationship["mirrorState"] = "mirrored"
+                source["inReplication"] = destination["inReplication"] = True
+        logging.info(f"FakeCVSServer: seeded {created}")
+        return created
+
+    def get_stats(self) -> dict:
+        """ Returns number of calls per "METHOD Resource", error responses per status, connections accepted
+        and jobs in flight per region """
+        with self._lock:
+            return {
+                "requests": dict(self._requests),
+                "errors": dict(self._errors),
+                "connections": self._connections,
+                "jobs": {region: n for region, n in self._jobs.items() if n > 0},
+            }
+
+    def reset_stats(self):
+        """ Clears call, error and connection counters """
+        with self._lock:
+            self._requests.clear()
+            self._errors.clear()
+            self._connections = 0
+
+    #
+    # Object templates
+    #
+
+    def _new_pool(self, region: str, payload: dict) -> dict:
+        pool = {
+            "poolId": str(uuid.uuid4()), "name": "pool", "region": region, "state": "available", "stateDetails": "Available for use",
+            "sizeInBytes": 1024**4, "allocatedBytes": 0, "numberOfVolumes": 0, "serviceLevel": "ZoneRedundantStandardSW",
+            "storageClass": "software", "network": f"projects/{self.project}/global/networks/default", "created": _now(),
+        }
+        pool.update(payload)
+        return pool
+
+    def _new_volume(self, region: str, payload: dict) -> dict:
+        volume = {
+            "volumeId": str(uuid.uuid4()), "name": "volume", "region": region, "lifeCycleState": "available",
+            "lifeCycleStateDetails": "Available for use", "quotaInBytes": 1024**4, "usedBytes": 0, "protocolTypes": ["NFSv3"],
+            "serviceLevel": "basic", "storageClass": "software", "network": f"projects/{self.project}/global/networks/default",
+            "isDataProtection": False, "inReplication": False, "snapshotPolicy": {"enabled": False}, "labels": [], "created": _now(),
+        }
+        volume.update(payload)
+        volume.setdefault("creationToken", volume["name"])
+        return volume
+
+    def _new_snapshot(self, region: str, payload: dict) -> dict:
+        snapshot = {
+            "snapshotId": str(uuid.uuid4()), "name": "snapshot", "region": region, "lifeCycleState": "available",
+            "lifeCycleStateDetails": "Available for use", "usedBytes": 0, "created": _now(),
+        }
+        snapshot.update(payload)
+        snapshot["ownerId"] = snapshot.pop("volumeId", snapshot.get("ownerId"))
+        return snapshot
+
+    def _new_backup(self, region: str, payload: dict) -> dict:
+        backup = {
+            "backupId": str(uuid.uuid4()), "name": "backup", "region": region, "lifeCycleState": "available",
+            "lifeCycleStateDetails": "Available for use", "backupType": "manual", "bytesTransferred": 0, "created": _now(),
+        }
+        backup.update(payload)
+        return backup
+
+    def _new_replication(self, region: str, payload: dict) -> dict:
+        relationship = {
+            "relationshipId": str(uuid.uuid4()), "name": "replication", "region": region, "lifeCycleState": "available",
+            "lifeCycleStateDetails": "Available for use", "mirrorState": "uninitialized", "relationshipStatus": "idle",
+            "replicationPolicy": "MirrorAllSnapshots", "replicationSchedule": "hourly", "created": _now(),
+        }
+        relationship.update(payload)
+        relationship["destinationRegion"] = region
+        relationship["sourceRegion"] = relationship.get("remoteRegion")
+        return relationship
+
+    #
+    # Request handling. All methods below are called with self._lock held
+    #
+
+    def _list(self, region: str, resource: str) -> list:
+        if region == "-":
+            return [o for objects in self._objects[resource].values() for o in objects.values()]
+        return list(self._objects[resource].get(region, {}).values())
+
+    def _get(self, region: str, resource: str, objectID: str) -> dict:
+        if region == "-":
+            for objects in self._objects[resource].values():
+                if objectID in objects:
+                    return objects[objectID]
+        elif objectID in self._objects[resource].get(region, {}):
+            return self._objects[resource][region][objectID]
+        raise FakeHTTPError(404, f"{resource} {objectID} not found in {region}")
+
+    def _find_volume(self, volumeID: str) -> dict:
+        try:
+            return self._get("-", "Volumes", volumeID)
+        except FakeHTTPError:
+            return None
+
+    def _schedule(self, region: str, resource: str, objectID: str, state, seconds: float):
+        # Moves object to state after seconds. state None removes it
+        self._seq += 1
+        heapq.heappush(self._transitions, (monotonic() + seconds, self._seq, region, resource, objectID, state))
+        self._jobs[region] = self._jobs.get(region, 0) + 1
+
+    def _advance(self):
+        # Applies all due state transitions
+        now = monotonic()
+        while len(self._transitions) > 0 and self._transitions[0][0] <= now:
+            _, _, region, resource, objectID, state = heapq.heappop(self._transitions)
+            self._jobs[region] -= 1
+            obj = self._objects[resource].get(region, {}).get(objectID)
+            if obj == None:
+                continue
+            if state == None:
+                del self._objects[resource][region][objectID]
+                if resource == "Volumes":
+                    # Snapshots are deleted with their volume, backups are kept
+                    snapshots = self._objects["Snapshots"].get(region, {})
+                    for snapshotID in [s for s, o in snapshots.items() if o.get("ownerId") == objectID]:
+                        del snapshots[snapshotID]
+                if resource == "VolumeReplications":
+                    for volumeID in [obj.get("sourceVolumeUUID"), obj.get("destinationVolumeUUID")]:
+                        volume = self._find_volume(volumeID)
+                        if volume != None:
+                            volume["inReplication"] = False
+                continue
+            obj[FAKE_RESOURCES[resource][1]] = state
+            obj[FAKE_RESOURCES[resource][1] + "Details"] = "Available for use"
+            if resource == "VolumeReplications" and obj["mirrorState"] == "uninitialized":
+                obj["mirrorState"] = "mirrored"
+
+    def _start_job(self, region: str):
+        if self.max_jobs_per_region != None and self._jobs.get(region, 0) >= self.max_jobs_per_region:
+            raise FakeHTTPError(500, FAULT_MESSAGES[500])
+
+    def _accepted(self, obj: dict) -> tuple:
+        # 202 response of long running operations
+        jobID = str(uuid.uuid4())
+        return 202, {
+            "name": f"projects/{self.project}/locations/{obj['region']}/operations/{jobID}",
+            "jobs": [{"jobId": jobID, "state": "ongoing", "action": "create"}],
+            "response": {"AnyValue": dict(obj)},
+        }
+
+    def _create(self, region: str, resource: str, payload: dict) -> tuple:
+        if region == "-":
+            raise FakeHTTPError(400, "Objects cannot be created in all regions (\"-\")")
+        if resource == "DataProtectionVolumes":
+            resource = "Volumes"
+            payload = dict(payload, isDataProtection=True)
+        id_field, state_field = FAKE_RESOURCES[resource]
+        if state_field == None:
+            obj = self.add(region, resource, dict(payload))
+            return 200, dict(obj)
+
+        if resource == "Pools":
+            obj = self._new_pool(region, payload)
+        elif resource == "Volumes":
+            if payload.get("poolId") != None and payload["poolId"] not in self._objects["Pools"].get(region, {}):
+                raise FakeHTTPError(400, f"Pool {payload['poolId']} not found in {region}")
+            obj = self._new_volume(region, payload)
+        elif resource in ["Snapshots", "Backups"]:
+            volumeID = payload.get("volumeId", payload.get("ownerId"))
+            volume = self._find_volume(volumeID)
+            if volume == None or volume["region"] != region:
+                raise FakeHTTPError(400, f"Volume {volumeID} not found in {region}")
+            if any(o["name"] == payload.get("name") and o.get("volumeId", o.get("ownerId")) == volumeID for o in self._list(region, resource)):
+                raise FakeHTTPError(409, f"{resource[:-1]} with name {payload.get('name')} already exists")
+            obj = self._new_snapshot(region, payload) if resource == "Snapshots" else self._new_backup(region, payload)
+            obj["volumeName"] = volume["name"]
+        else:
+            destination = self._find_volume(payload.get("destinationVolumeUUID"))
+            if destination == None or not destination["isDataProtection"]:
+                raise FakeHTTPError(400, "Destination volume needs to be a data protection volume")
+            obj = self._new_replication(region, payload)
+            destination["inReplication"] = True
+            source = self._find_volume(payload.get("sourceVolumeUUID"))
+            if source != None:
+                source["inReplication"] = True
+        self._start_job(region)
+        obj[id_field] = str(uuid.uuid4())
+        obj[state_field] = "creating"
+        self.add(region, resource, obj)
+        self._schedule(region, resource, obj[id_field], "available", self.create_seconds)
+        return self._accepted(obj)
+
+    def _delete(self, region: str, resource: str, objectID: str) -> tuple:
+        obj = self._get(region, resource, objectID)
+        region = obj["region"]
+        state_field = FAKE_RESOURCES[resource][1]
+        if state_field == None:
+            del self._objects[resource][region][objectID]
+            return 200, {}
+        if obj[state_field] == "deleting":
+            return 202, {}
+        if resource == "Pools" and any(v.get("poolId") == objectID for v in self._list(region, "Volumes")):
+            raise FakeHTTPError(400, f"Pool {objectID} cannot be deleted, it still contains volumes")
+        if resource == "Volumes" and obj.get("inReplication"):
+            raise FakeHTTPError(400, f"Volume {objectID} is in a replication relationship")
+        self._start_job(region)
+        obj[state_field] = "deleting"
+        self._schedule(region, resource, objectID, None, self.delete_seconds)
+        return 202, {}
+
+    def _update(self, region: str, resource: str, objectID: str, changes: dict) -> tuple:
+        obj = self._get(region, resource, objectID)
+        state_field = FAKE_RESOURCES[resource][1]
+        if state_field != None and obj[state_field] not in ["available", "ready"]:
+            raise FakeHTTPError(409, f"{resource} {objectID} is {obj[state_field]}")
+        obj.update({k: v for k, v in changes.items() if k != FAKE_RESOURCES[resource][0]})
+        return 200, dict(obj)
+
+    def _replication_action(self, region: str, objectID: str, action: str) -> tuple:
+        relationship = self._get(region, "VolumeReplications", objectID)
+        if action not in ["Break", "Resync"]:
+            raise FakeHTTPError(404, f"Unknown action {action}")
+        if relationship["lifeCycleState"] != "available":
+            raise FakeHTTPError(409, f"Relationship {objectID} is {relationship['lifeCycleState']}")
+        self._start_job(relationship["region"])
+        relationship["lifeCycleState"] = "updating"
+        relationship["mirrorState"] = "broken" if action == "Break" else "mirrored"
+        self._schedule(relationship["region"], "VolumeReplications", objectID, "available", self.create_seconds)
+        return self._accepted(relationship)
+
+    def _route(self, method: str, region: str, segments: list, payload: dict) -> tuple:
+        resource = segments[0]
+        if resource == "version":
+            return 200, {"apiVersion": "2.0", "sdeVersion": "1.4.0", "region": region}
+        if resource not in FAKE_RESOURCES and resource != "DataProtectionVolumes":
+            raise FakeHTTPError(404, f"Unknown path {'/'.join(segments)}")
+        if len(segments) == 1:
+            if method == "GET":
+                return 200, self._list(region, resource)
+            if method == "POST":
+                return self._create(region, resource, payload)
+        elif len(segments) == 2:
+            if method == "GET":
+                return 200, self._get(region, resource, segments[1])
+            if method == "PUT":
+                return self._update(region, resource, segments[1], payload)
+            if method == "DELETE":
+                return self._delete(region, resource, segments[1])
+        elif len(segments) == 3:
+            if resource == "Volumes" and segments[2] in ["Snapshots", "Backups"]:
+                if method == "GET":
+                    owner = "ownerId" if segments[2] == "Snapshots" else "volumeId"
+                    return 200, [o for o in self._list(region, segments[2]) if o.get(owner) == segments[1]]
+                if method == "POST":
+                    return self._create(region, segments[2], dict(payload, volumeId=segments[1]))
+            if resource == "VolumeReplications" and method == "POST":
+                return self._replication_action(region, segments[1], segments[2])
+        raise FakeHTTPError(405, f"{method} not supported for {'/'.join(segments)}")
+
+    def _latency(self, method: str, resource: str) -> float:
+        for key in [f"{method} {resource}", resource, method, "*"]:
+            if key in self.latency:
+                value = self.latency[key]
+                if isinstance(value, (tuple, list)):
+                    return random.uniform(*value)
+                return value
+        return 0
+
+    def _handle(self, method: str, path: str, payload: dict) -> tuple:
+        # Returns (status, body, headers)
+        segments = urlsplit(path).path.strip("/").split("/")
+        if len(segments) < 6 or segments[:2] != ["v2", "projects"] or segments[3] != "locations":
+            return 404, {"code": 404, "message": f"Unknown path {path}"}, {}
+        if segments[2] != self.project:
+            return 403, {"code": 403, "message": f"No access to project {segments[2]}"}, {}
+        region = segments[4]
+        segments = segments[5:]
+        if segments[0] == "Storage" and len(segments) > 1:
+            segments = [segments[0] + "/" + segments[1]] + segments[2:]
+        resource = segments[2] if len(segments) == 3 and segments[2] in FAKE_RESOURCES else segments[0]
+
+        delay = self._latency(method, resource)
+        if delay > 0:
+            sleep(delay)
+        with self._lock:
+            key = f"{method} {resource}"
+            self._requests[key] = self._requests.get(key, 0) + 1
+            try:
+                for fault in self.faults:
+                    if fault.matches(method, resource, region):
+                        fault.injected += 1
+                        headers = {"Retry-After": str(fault.retry_after)} if fault.retry_after != None else {}
+                        raise FakeHTTPError(fault.status, fault.message, headers)
+                self._advance()
+                status, body = self._route(method, region, segments, payload)
+                # Objects change while the response is serialized outside the lock. Copy them
+                if isinstance(body, list):
+                    body = [dict(o) for o in body]
+                else:
+                    body = dict(body)
+                return status, body, {}
+            except FakeHTTPError as e:
+                self._errors[e.status] = self._errors.get(e.status, 0) + 1
+                return e.status, {"code": e.status, "message": e.message}, e.headers
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately. Don't let them wait for delayed ACKs
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server._connections += 1
+
+            def _serve(self, method: str):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = {}
+                if length > 0:
+                    try:
+                        payload = json.loads(self.rfile.read(length))
+                    except ValueError:
+                        self._reply(400, {"code": 400, "message": "Invalid JSON body"}, {})
+                        return
+                status, body, headers = server._handle(method, self.path, payload)
+                try:
+                    self._reply(status, body, headers)
+                except ConnectionError:
+                    # Client closed the connection, e.g. stopped reading a streamed list
+                    self.close_connection = True
+
+            def _reply(self, status: int, body, headers: dict):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def do_PUT(self):
+                self._serve("PUT")
+
+            def do_DELETE(self):
+                self._serve("DELETE")
+
+            def do_HEAD(self):
+                # Connection warm-up of gcpcvs. Not counted as request, keeps the connection open
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                logging.debug("FakeCVSServer: " + format % args)
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake of the CVS v2 REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--project", default="123456789012")
+    parser.add_argument("--regions", default=",".join(FAKE_REGIONS), help="comma separated regions to seed")
+    parser.add_argument("--pools-per-region", type=int, default=2)
+    parser.add_argument("--volumes-per-pool", type=int, default=50)
+    parser.add_argument("--snapshots-per-volume", type=int, default=2)
+    parser.add_argument("--backups-per-volume", type=int, default=1)
+    parser.add_argument("--replications-per-region", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0, help="seconds added to every call")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of calls answered with 429")
+    parser.add_argument("--max-jobs-per-region", type=int, default=None)
+    parser.add_argument("--create-seconds", type=float, default=1.0)
+    parser.add_argument("--delete-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeCVSServer(args.host, args.port, args.project, latency={"*": args.latency},
+                           faults=[Fault(429, rate=args.error_rate, retry_after=1)] if args.error_rate > 0 else None,
+                           create_seconds=args.create_seconds, delete_seconds=args.delete_seconds,
+                           max_jobs_per_region=args.max_jobs_per_region)
+    server.seed(args.regions.split(","), args.pools_per_region, args.volumes_per_pool, args.snapshots_per_volume,
+                args.backups_per_volume, args.replications_per_region)
+    server.start()
+    print(f"Serving CVS API for project {server.project} on {server.url}. Press Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,67 @@
 # This file contains code which doesn't use CVS APIs, but Google APIs
 # to do CVS related things
 
-import requests, logging, re
-from googleapiclient import discovery, errors
-from google.auth import default
+import requests, logging, re, threading
+# googleapiclient and google.auth take long to import. Functions below import them when called
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-def getGoogleProjectNumber(project_id: str) -> Optional[str]:
+# (connect, read) timeout for metadata server queries. Outside of Google Cloud the server doesn't exist
+METADATA_TIMEOUT = (0.5, 1)
+METADATA_URL = "http://metadata.google.internal/computeMetadata/v1/project"
+
+def _get_metadata(path: str) -> str:
+   r = requests.get(f"{METADATA_URL}/{path}", headers={'Metadata-Flavor': 'Google'}, timeout=METADATA_TIMEOUT)
+   r.raise_for_status()
+   return r.text
+
+# Per process registry of Google API clients. Building one parses its discovery document,
+# so every (api, version) is built once and shared by all functions below
+_services = {}
+_credentials = None
+_registry_lock = threading.Lock()
+_local = threading.local()
+
+def get_credentials() -> tuple:
+   """Returns (credentials, project) of Application Default Credentials, resolved once per process"""
+   global _credentials
+   with _registry_lock:
+      if _credentials == None:
+         from google.auth import default
+         _credentials = default()
+      return _credentials
+
+def get_service(api: str, version: str = "v1"):
+   """Returns shared googleapiclient service object for api, e.g. "compute" or "cloudresourcemanager"
+
+   Uses the discovery documents bundled with googleapiclient, no download. Service objects can be
+   shared between threads, as long as requests are executed with execute(http=get_http())
+   """
+   credentials, _ = get_credentials()
+   with _registry_lock:
+      service = _services.get((api, version))
+      if service == None:
+         from googleapiclient import discovery
+         service = discovery.build(api, version, credentials=credentials, static_discovery=True, cache_discovery=False)
+         _services[(api, version)] = service
+      return service
+
+def get_http():
+   """Returns authorized HTTP transport of the calling thread. httplib2 transports aren't thread-safe"""
+   http = getattr(_local, "http", None)
+   if http == None:
+      import google_auth_httplib2, httplib2
+      credentials, _ = get_credentials()
+      http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+      _local.http = http
+   return http
+
+def getGoogleProjectNumber(project_id: str, cache = None) -> Optional[str]:
    """Lookup Project Number for gives ProjectID
    
    Args:
       project_id (str): Google Project ID
+      cache (DiskCache): Look up and store result in DiskCache. Default None = no cache
       
    Returns:
       str: Google Project Number
@@ -23,10 +74,19 @@ def getGoogleProjectNumber(project_id: str) -> Optional[str]:
    which requires resourcemanager.projects.get permissions.
    """
 
-   # First try to fetch from Google VM Metadata
+   if cache != None:
+      project_number = cache.get_project_number(project_id)
+      if project_number != None:
+         return project_number
+      project_number = getGoogleProjectNumber(project_id)
+      if project_number != None:
+         cache.put_project_number(project_id, project_number)
+      return project_number
+
+   # First try to fetch from Google VM Metadata. Query both values in parallel
    try:
-      metadata_project_ID = requests.get("http://metadata.google.internal/computeMetadata/v1/project/project-id", headers={'Metadata-Flavor': 'Google'}).text
-      metadata_project_number = requests.get("http://metadata.google.internal/computeMetadata/v1/project/numeric-project-id", headers={'Metadata-Flavor': 'Google'}).text
+      with ThreadPoolExecutor(max_workers=2) as executor:
+         metadata_project_ID, metadata_project_number = executor.map(_get_metadata, ["project-id", "numeric-project-id"])
 
       if project_id == metadata_project_ID:
          return metadata_project_number
@@ -34,13 +94,12 @@ def getGoogleProjectNumber(project_id: str) -> Optional[str]:
       pass
 
    # No metadata available, lets use resource manager
-   credentials, _ = default()
-
-   service = discovery.build('cloudresourcemanager', 'v1', credentials=credentials)
+   from googleapiclient import errors
+   service = get_service('cloudresourcemanager')
 
    request = service.projects().get(projectId = project_id)
    try:
-      response = request.execute()
+      response = request.execute(http=get_http())
       return response["projectNumber"]
    except errors.HttpError as e:
       # Unable to resolve project. No permission or project doesn't exist
@@ -58,12 +117,10 @@ def get_host_project(service_project: str) -> str:
       
    Returns: Host Project ID
    """
-   credentials, project = default()
-
-   service = discovery.build('compute', 'v1', credentials = credentials)
+   service = get_service('compute')
 
    request = service.projects().getXpnHost(project = service_project)
-   response = request.execute()
+   response = request.execute(http=get_http())
 
    if 'name' in response:
       return response['name']
@@ -77,13 +134,13 @@ def get_gcp_regions() -> list[str]:
       list(str): List of GCP regions
    
    """   
-   credentials, project = default()
-   service = discovery.build('compute', 'v1', credentials = credentials)
+   _, project = get_credentials()
+   service = get_service('compute')
 
    request = service.regions().list(project = project)
    gcp_regions = []
    while request is not None:
-      response = request.execute()
+      response = request.execute(http=get_http())
 
       for region in response['items']:
          gcp_regions.append(region['name'])
@@ -91,6 +148,11 @@ def get_gcp_regions() -> list[str]:
       request = service.regions().list_next(previous_request=request, previous_response=response)
    return gcp_regions
 
+# Peerings to CVS tenant projects. Group 1: tenant project, group 3: set for CVS (software)
+_TENANT_VPC = re.compile(r'https://www.googleapis.com/compute/v1/projects/(.+)/global/networks/(netapp(-sds)?-tenant-vpc)$')
+# Only network names and their complete peerings are returned by networks.list, as the peerings are handed out as is
+_NETWORK_FIELDS = "items(name,peerings),nextPageToken"
+
 class VPCPeerings():
    cvs_peerings = []
    def __init__(self, project: str):
@@ -98,38 +160,113 @@ class VPCPeerings():
       Args:
          project (str): Google project_id
       """
+      self.project = project
+      self.host_project = None
       self.cvs_peerings = []
-      self.update_peerings(project)
+      self._networks = {}     # (project, vpc) -> peerings of the VPC, as returned by the API
+      self._peerings = {}     # (project, vpc) -> CVS peerings of the VPC
+      self._by_vpc = {}       # (vpc, hardware) -> list of CVS peerings
+      self._by_tenant = {}    # tenant project -> list of CVS peerings
+      # List service project networks while looking up and listing the host project
+      with ThreadPoolExecutor(max_workers=2) as executor:
+         service_networks = executor.submit(self._list_networks, project)
+         host_networks = executor.submit(self._list_host_networks, project)
+         self._update(project, service_networks.result())
+         host_networks = host_networks.result()
+         if self.host_project:
+            self._update(self.host_project, host_networks)
+
+   def _list_host_networks(self, project: str) -> dict:
       # If project is a service project, get CVS peerings for host project also
-      host_project = get_host_project(project)
-      if host_project:
-         self.update_peerings(host_project)
+      self.host_project = get_host_project(project)
+      if self.host_project:
+         return self._list_networks(self.host_project)
+      return {}
 
-   def update_peerings(self, project: str):
-      # Fetch all Peerings to CVS
-      credentials, _ = default()
-      service = discovery.build('compute', 'v1', credentials=credentials)
+   def _list_networks(self, project: str) -> dict:
+      # Returns vpc -> peerings of all VPCs of project
+      networks = {}
+      service = get_service('compute')
+      http = get_http()
 
-      request = service.networks().list(project = project)
+      request = service.networks().list(project = project, fields = _NETWORK_FIELDS)
       while request is not None:
-         response = request.execute()
-         if 'items' in response:
-            # Iterate over all VPCs found
-            for network in response['items']:
-               # Does the VPC have an peerings?
-               if 'peerings' in network:
-                  for peering in network['peerings']:
-                        m = re.search(f'https://www.googleapis.com/compute/v1/projects/(.+)/global/networks/(netapp(-sds)?-tenant-vpc)$', peering['network'])
-                        if m:
-                           peering['vpc'] = network['name']
-                           peering['tp'] = m.group(1)
-                           if m.group(3):
-                              peering['hardware'] = False
-                           else:
-                              peering['hardware'] = True
-                           peering['project'] = project
-                           self.cvs_peerings.append(peering)
+         response = request.execute(http=http)
+         for network in response.get('items', []):
+            networks[network['name']] = network.get('peerings', [])
          request = service.networks().list_next(previous_request=request, previous_response=response)
+      return networks
+
+   def _update(self, project: str, networks: dict) -> set:
+      # Updates indexes for VPCs of project whose peerings changed. Returns changed VPCs
+      changed = set()
+      for vpc, peerings in networks.items():
+         if self._networks.get((project, vpc)) != peerings:
+            self._set_network(project, vpc, peerings)
+            changed.add(vpc)
+      # VPCs not listed anymore were deleted
+      for p, vpc in [k for k in self._networks if k[0] == project and k[1] not in networks]:
+         self._set_network(p, vpc, None)
+         changed.add(vpc)
+      if changed:
+         self.cvs_peerings = [peering for peerings in self._peerings.values() for peering in peerings]
+      return changed
+
+   def _set_network(self, project: str, vpc: str, peerings: list):
+      # Replaces CVS peerings of a VPC in all indexes. peerings None removes the VPC
+      key = (project, vpc)
+      for peering in self._peerings.pop(key, []):
+         self._by_vpc[(vpc, peering['hardware'])].remove(peering)
+         self._by_tenant[peering['tp']].remove(peering)
+      self._networks.pop(key, None)
+      if peerings == None:
+         return
+
+      self._networks[key] = peerings
+      cvs_peerings = []
+      for p in peerings:
+         if not p['network'].endswith('-tenant-vpc'):
+            continue
+         m = _TENANT_VPC.match(p['network'])
+         if m:
+            peering = dict(p)
+            peering['vpc'] = vpc
+            peering['tp'] = m.group(1)
+            peering['hardware'] = not m.group(3)
+            peering['project'] = project
+            cvs_peerings.append(peering)
+            self._by_vpc.setdefault((vpc, peering['hardware']), []).append(peering)
+            self._by_tenant.setdefault(peering['tp'], []).append(peering)
+      if cvs_peerings:
+         self._peerings[key] = cvs_peerings
+
+   def update_peerings(self, project: str) -> set:
+      """
+      Lists VPCs of project and updates their peerings
+
+      Args:
+         project (str): Google project_id
+
+      Returns:
+         set: names of VPCs whose peerings changed
+      """
+      return self._update(project, self._list_networks(project))
+
+   def refresh(self) -> set:
+      """
+      Lists VPCs of service and host project in parallel. Only VPCs whose peerings changed since the
+      last listing are updated
+
+      Returns:
+         set: (project, vpc) of VPCs whose peerings changed, were added or deleted
+      """
+      projects = [p for p in [self.project, self.host_project] if p]
+      with ThreadPoolExecutor(max_workers=len(projects)) as executor:
+         listings = list(executor.map(self._list_networks, projects))
+      changed = set()
+      for project, networks in zip(projects, listings):
+         changed.update((project, vpc) for vpc in self._update(project, networks))
+      return changed
 
    def get_networks(self, is_hw: bool) -> set:
       """
@@ -140,27 +277,30 @@ class VPCPeerings():
       """
       # Returns a set of all connected VPCs.
       # hardware or software
-      r = set()
-      for p in self.cvs_peerings:
-         if p['hardware'] == is_hw:
-            r.add(p['vpc'])
-      return r
+      return {vpc for (vpc, hardware), peerings in self._by_vpc.items() if hardware == is_hw and peerings}
 
    def get_tenant_project(self, is_hw: bool, vpc: str) -> str:
       # Returns tenant project for given VPC and service type
-      for n in self.cvs_peerings:
-         if n['vpc'] == vpc and n['hardware'] == is_hw:
-            return n['tp']
+      peerings = self._by_vpc.get((vpc, is_hw))
+      if peerings:
+         return peerings[0]['tp']
       return None
 
    def is_active(self, is_hw: bool, vpc: str) -> bool:
       # Checks if peering in active
-      for n in self.cvs_peerings:
-         if n['vpc'] == vpc and n['hardware'] == is_hw:
-            return n['state'] == 'ACTIVE'
+      peerings = self._by_vpc.get((vpc, is_hw))
+      if peerings:
+         return peerings[0]['state'] == 'ACTIVE'
       return None
 
+   def get_peerings_by_tenant_project(self, tenant_project: str) -> list:
+      """
+      Get CVS peerings to a tenant project
 
+      Args:
+         tenant_project (str): project_id of the CVS tenant project
 
-
-      
\ No newline at end of file
+      Returns:
+         list: peerings, with keys vpc, tp, hardware and project added
+      """
+      return list(self._by_tenant.get(tenant_project, []))
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+#
+# Local SQLite copy of all CVS objects of a project, for fast queries without API calls
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from time import time
+from .ChangeFeed import ChangeFeed, ADDED, MODIFIED, REMOVED
+from .DiskCache import default_cache_dir
+
+# Object types stored: API path -> (name field, state field, used bytes field, size bytes field)
+INVENTORY_RESOURCES = {
+    "Volumes": ("name", "lifeCycleState", "usedBytes", "quotaInBytes"),
+    "Pools": ("name", "state", "allocatedBytes", "sizeInBytes"),
+    "Snapshots": ("name", "lifeCycleState", "usedBytes", None),
+    "Backups": ("name", "lifeCycleState", "bytesTransferred", None),
+    "VolumeReplications": ("name", "mirrorState", None, None),
+    "Storage/KmsConfig": ("keyName", "state", None, None),
+    "Storage/ActiveDirectory": ("domain", "status", None, None),
+}
+
+# Columns which can be used in filters and group_by
+COLUMNS = ["id", "region", "name", "pool", "network", "service_level", "state", "used_bytes", "size_bytes"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    resource TEXT NOT NULL,
+    id TEXT NOT NULL,
+    region TEXT,
+    name TEXT,
+    pool TEXT,
+    network TEXT,
+    service_level TEXT,
+    state TEXT,
+    used_bytes INTEGER,
+    size_bytes INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (resource, id)
+);
+CREATE INDEX IF NOT EXISTS objects_name ON objects (resource, name);
+CREATE INDEX IF NOT EXISTS objects_region ON objects (resource, region);
+CREATE INDEX IF NOT EXISTS objects_pool ON objects (resource, pool);
+CREATE INDEX IF NOT EXISTS objects_network ON objects (resource, network);
+CREATE INDEX IF NOT EXISTS objects_service_level ON objects (resource, service_level);
+CREATE INDEX IF NOT EXISTS objects_state ON objects (resource, state);
+CREATE TABLE IF NOT EXISTS refreshes (
+    resource TEXT PRIMARY KEY,
+    refreshed REAL NOT NULL,
+    objects INTEGER NOT NULL
+);
+"""
+
+class RefreshResult(dict):
+    """ resource -> number of changed objects of a refresh, for the resources which were listed
+
+    Attributes:
+        errors (dict): resource -> Exception for resources which couldn't be listed
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.errors = {}
+
+    @property
+    def complete(self) -> bool:
+        """ True if all resources were refreshed """
+        return len(self.errors) == 0
+
+def default_inventory_path(project: str) -> str:
+    """ Returns $XDG_CACHE_HOME/gcpcvs/inventory-<project>.sqlite """
+    return os.path.join(default_cache_dir(), f"inventory-{project}.sqlite")
+
+class Inventory():
+    """ SQLite inventory of volumes, pools, snapshots, backups, replications, KMS and AD configs
+
+    refresh() lists all objects ("-" region) and writes only the objects which were added,
+    removed or modified since the last refresh, also across processes. Queries are answered
+    from the database, indexed on name, region, pool, network, service level and state.
+    freshness() tells how old the data is.
+
+    Example:
+        inventory = Inventory(cvs)
+        inventory.refresh()
+        full = inventory.query("Volumes", pool="pool-1", min_used_percent=80)
+        per_region = inventory.aggregate("Volumes", group_by="region")
+    """
+
+    def __init__(self, cvs, path: str = None):
+        """
+        Args:
+            cvs (gcpcvs): client used for refresh(). Queries don't do API calls
+            path (str): SQLite database file, default = default_inventory_path(project ID), ":memory:" for no file
+        """
+
+        self.cvs = cvs
+        self.path = path or default_inventory_path(cvs.getProjectID())
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), mode=0o700, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+
+    def close(self):
+        """ Closes the database """
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def _row(resource: str, objectID: str, obj: dict) -> tuple:
+        name, state, used, size = INVENTORY_RESOURCES[resource]
+        return (resource, objectID, obj.get("region"), obj.get(name), obj.get("poolId"), obj.get("network"),
+                obj.get("serviceLevel"), obj.get(state), obj.get(used) if used else None,
+                obj.get(size) if size else None, json.dumps(obj, separators=(",", ":")))
+
+    def _stored(self, resource: str) -> list:
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM objects WHERE resource = ?", (resource,)).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def _apply(self, resource: str, changes: list, objects: int):
+        upserts = [self._row(resource, c.objectID, c.object) for c in changes if c.kind in (ADDED, MODIFIED)]
+        deletes = [(resource, c.objectID) for c in changes if c.kind == REMOVED]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", upserts)
+            self._db.executemany("DELETE FROM objects WHERE resource = ? AND id = ?", deletes)
+            self._db.execute("INSERT OR REPLACE INTO refreshes VALUES (?, ?, ?)", (resource, time(), objects))
+
+    def refresh(self, resources: list = None) -> dict:
+        """ Updates the inventory from the API
+
+        Args:
+            resources (list): Object types to refresh. Default None = all INVENTORY_RESOURCES
+
+        Returns:
+            RefreshResult: resource -> number of changed objects. Resources which failed to list are left out
+                and reported in its errors attribute
+        """
+
+        feed = ChangeFeed(self.cvs)
+        result = RefreshResult()
+        for resource in resources or INVENTORY_RESOURCES:
+            if resource not in INVENTORY_RESOURCES:
+                raise ValueError(f"Cannot store {resource}. Supported: {', '.join(INVENTORY_RESOURCES)}")
+            # Continue from the stored state, so only changes are written
+            feed.load("-", resource, self._stored(resource))
+            try:
+                changes = feed.poll("-", resource)
+            except Exception as e:
+                logging.warning(f"Inventory: listing {resource} failed: {e}")
+                result.errors[resource] = e
+                continue
+            self._apply(resource, changes, len(feed.snapshot("-", resource)))
+            result[resource] = len(changes)
+        return result
+
+    def freshness(self) -> dict:
+        """ Returns resource -> seconds since its last refresh, None if never refreshed """
+        with self._lock:
+            refreshed = {row["resource"]: row["refreshed"] for row in self._db.execute("SELECT resource, refreshed FROM refreshes")}
+        now = time()
+        return {resource: now - refreshed[resource] if resource in refreshed else None for resource in INVENTORY_RESOURCES}
+
+    def _where(self, resource: str, filters: dict, min_used_percent: float = None) -> tuple:
+        clauses = ["resource = ?"]
+        params = [resource]
+        for column, value in filters.items():
+            if value == None:
+                continue
+            if column not in COLUMNS:
+                raise ValueError(f"Unknown column {column}. Supported: {', '.join(COLUMNS)}")
+            if column == "pool":
+                # Pool name or ID
+                clauses.append("(pool = ? OR pool IN (SELECT id FROM objects WHERE resource = 'Pools' AND name = ?))")
+                params += [value, value]
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if min_used_percent != None:
+            clauses.append("size_bytes > 0 AND used_bytes * 100.0 / size_bytes >= ?")
+            params.append(min_used_percent)
+        return " AND ".join(clauses), params
+
+    def query(self, resource: str, min_used_percent: float = None, order_by: str = "name", limit: int = None, **filters) -> list:
+        """ Returns stored objects matching all filters
+
+        Args:
+            resource (str): Object type, one of INVENTORY_RESOURCES
+            min_used_percent (float): Only objects with used_bytes at least this percentage of size_bytes
+            order_by (str): Column to sort by, default = "name"
+            limit (int): Maximum number of objects. Default None = all
+            filters: column=value, e.g. region="us-east4", pool="pool-1" (name or ID), state="available"
+
+        Returns:
+            list: objects as returned by the API
+        """
+
+        if order_by not in COLUMNS:
+            raise ValueError(f"Unknown column {order_by}. Supported: {', '.join(COLUMNS)}")
+        where, params = self._where(resource, filters, min_used_percent)
+        sql = f"SELECT data FROM objects WHERE {where} ORDER BY {order_by}"
+        if limit != None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def aggregate(self, resource: str, group_by: str = "region", min_used_percent: float = None, **filters) -> list:
+        """ Returns count, used and size bytes of stored objects, grouped by a column
+
+        Args:
+            resource (str): Object type, one of INVENTORY_RESOURCES
+            group_by (str): Column to group by, default = "region"
+            min_used_percent, filters: See query()
+
+        Returns:
+            list: dicts with keys group_by, "count", "used_bytes" and "size_bytes", ordered by group_by
+        """
+
+        if group_by not in COLUMNS:
+            raise ValueError(f"Unknown column {group_by}. Supported: {', '.join(COLUMNS)}")
+        where, params = self._where(resource, filters, min_used_percent)
+        sql = (f"SELECT {group_by}, COUNT(*) AS count, SUM(used_bytes) AS used_bytes, SUM(size_bytes) AS size_bytes "
+               f"FROM objects WHERE {where} GROUP BY {group_by} ORDER BY {group_by}")
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
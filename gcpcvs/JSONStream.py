@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Incremental parsing of JSON array responses
+
+import codecs
+import json
+import re
+from typing import Iterable, Iterator
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_skip_whitespace = re.compile(r"[ \t\n\r]*").match
+
+def iter_json_array(chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator:
+    """ Parses a JSON array from chunks of bytes and yields its elements one at a time
+
+    Only the current chunk and the element being parsed are held in memory, so elements can be
+    processed while the rest of the array is still being downloaded.
+
+    Args:
+        chunks (iterable): bytes of the JSON document, e.g. requests.Response.iter_content()
+        encoding (str): Text encoding of the document, default = "utf-8"
+
+    Yields:
+        Elements of the array, parsed like json.loads() would
+
+    Raises ValueError if the document isn't a JSON array or is truncated.
+    """
+
+    text = codecs.getincrementaldecoder(encoding)()
+    buffer = ""
+    pos = 0
+    started = False
+    finished = False
+    expect_element = True   # False after an element, until the next ","
+
+    chunks = iter(chunks)
+    done = False
+    while not done:
+        chunk = next(chunks, None)
+        if chunk == None:
+            done = True
+            buffer = buffer[pos:] + text.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + text.decode(chunk)
+        pos = 0
+        length = len(buffer)
+
+        while True:
+            pos = _skip_whitespace(buffer, pos).end()
+            if pos == length:
+                break
+            c = buffer[pos]
+            if finished:
+                raise ValueError(f"Unexpected data after end of JSON array: {buffer[pos:pos + 20]!r}")
+            if not started:
+                if c != "[":
+                    raise ValueError(f"Expected JSON array, got {buffer[pos:pos + 20]!r}")
+                started = True
+                pos += 1
+                continue
+            if c == "]":
+                finished = True
+                pos += 1
+                continue
+            if not expect_element:
+                if c != ",":
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {buffer[pos:pos + 20]!r}")
+                expect_element = True
+                pos += 1
+                continue
+            try:
+                element, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if done:
+                    raise
+                # Element continues in the next chunk
+                break
+            if not done and type(element) not in (dict, list, str):
+                # Numbers may continue in the next chunk ("1." + "5"). Wait until a delimiter follows
+                rest = buffer[end:].lstrip(_WHITESPACE)
+                if rest == "" or rest[0] not in ",]":
+                    break
+            pos = end
+            expect_element = False
+            yield element
+
+    if not finished:
+        raise ValueError("Truncated JSON array")
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# Client side scheduling of long running CVS jobs
+
+import logging
+import threading
+from contextlib import contextmanager
+from time import monotonic
+
+class JobScheduler():
+    """ Limits the number of long running CVS jobs in flight per region and per pool
+
+    The CVS API only runs a limited number of jobs (volume/pool/backup creates, deletes,
+    replication changes) at a time and answers additional requests with
+    500 "Cannot spawn additional jobs". Instead of letting every caller retry blindly,
+    callers wait in a queue until a slot is free. A slot is held from submission until
+    the job reached a terminal state.
+
+    Share one JobScheduler between all gcpcvs objects working on the same project:
+
+        scheduler = JobScheduler(max_jobs_per_region=8, max_jobs_per_pool=2)
+        cvs = gcpcvs.gcpcvs(service_account, job_scheduler=scheduler)
+    """
+
+    def __init__(self, max_jobs_per_region: int = 8, max_jobs_per_pool: int = 2):
+        """
+        Args:
+            max_jobs_per_region (int): Maximum jobs in flight per region, default = 8
+            max_jobs_per_pool (int): Maximum jobs in flight per pool, default = 2
+        """
+
+        self.max_jobs_per_region = max_jobs_per_region
+        self.max_jobs_per_pool = max_jobs_per_pool
+        self._running_regions = {}
+        self._running_pools = {}
+        self._queued = {}
+        self._jobs_started = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._condition = threading.Condition()
+
+    def _is_free(self, region: str, pool: str) -> bool:
+        if self._running_regions.get(region, 0) >= self.max_jobs_per_region:
+            return False
+        if pool != None and self._running_pools.get(pool, 0) >= self.max_jobs_per_pool:
+            return False
+        return True
+
+    def acquire(self, region: str, pool: str = None, name: str = None) -> float:
+        """ Blocks until a job slot for region/pool is free and takes it
+
+        Args:
+            region (str): Name of GCP region
+            pool (str): poolID, None if job isn't bound to a pool
+            name (str): Description of job for logging
+
+        Returns:
+            float: Seconds waited for the slot
+        """
+
+        start = monotonic()
+        with self._condition:
+            if not self._is_free(region, pool):
+                logging.info(f"JobScheduler: {name or 'job'} in {region} queued")
+                self._queued[region] = self._queued.get(region, 0) + 1
+                try:
+                    self._condition.wait_for(lambda: self._is_free(region, pool))
+                finally:
+                    self._queued[region] -= 1
+            self._running_regions[region] = self._running_regions.get(region, 0) + 1
+            if pool != None:
+                self._running_pools[pool] = self._running_pools.get(pool, 0) + 1
+            waited = monotonic() - start
+            self._jobs_started += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return waited
+
+    def release(self, region: str, pool: str = None):
+        """ Frees job slot taken with acquire() """
+        with self._condition:
+            self._running_regions[region] -= 1
+            if pool != None:
+                self._running_pools[pool] -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, region: str, pool: str = None, name: str = None):
+        """ Context manager holding a job slot for region/pool while the block runs """
+        self.acquire(region, pool, name)
+        try:
+            yield
+        finally:
+            self.release(region, pool)
+
+    def get_stats(self) -> dict:
+        """ Returns queue depth and wait times
+
+        Returns:
+            dict: queued and running jobs per region, running jobs per pool, number of jobs started,
+                total/max/average seconds jobs waited for a slot
+        """
+
+        with self._condition:
+            return {
+                "queued": {r: n for r, n in self._queued.items() if n > 0},
+                "running": {r: n for r, n in self._running_regions.items() if n > 0},
+                "running_pools": {p: n for p, n in self._running_pools.items() if n > 0},
+                "jobs_started": self._jobs_started,
+                "total_wait_seconds": self._total_wait,
+                "max_wait_seconds": self._max_wait,
+                "avg_wait_seconds": self._total_wait / self._jobs_started if self._jobs_started else 0.0,
+            }
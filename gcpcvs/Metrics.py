@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#
+# Client side metrics for CVS API calls
+
+import threading
+from bisect import bisect_left
+from time import time
+from urllib.parse import urlsplit
+
+# Upper bounds in seconds of the request latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def endpoint_template(url: str) -> str:
+    """ Replaces region and object IDs in a CVS API URL by placeholders
+
+    Args:
+        url (str): CVS API URL, e.g. https://.../v2/projects/123/locations/us-east4/Volumes/<volumeId>
+
+    Returns:
+        str: endpoint template, e.g. "locations/{region}/Volumes/{id}"
+    """
+
+    path = urlsplit(url).path
+    if "/locations/" not in path:
+        return path.strip("/")
+    segments = path.split("/locations/", 1)[1].strip("/").split("/")
+    template = ["locations", "{region}"]
+    segments = segments[1:]
+    if len(segments) >= 2 and segments[0] == "Storage":
+        template.append("Storage")
+        segments = segments[1:]
+    # Collections and IDs alternate: Volumes/<id>/Backups/<id>, VolumeReplications/<id>/Break
+    template += [s if i % 2 == 0 else "{id}" for i, s in enumerate(segments)]
+    return "/".join(template)
+
+def timed_init_step(metrics, step: str, func, *args):
+    """ Returns func(*args) and records its duration as initialization step of metrics (None = not recorded) """
+    start = time()
+    try:
+        return func(*args)
+    finally:
+        if metrics != None:
+            metrics.observe_init(step, time() - start)
+
+class _Histogram():
+    # Cumulative counts are computed on export, observe_request() only increments one bucket
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+class Metrics():
+    """ Collects latency, status, retry, byte and wait metrics of CVS API calls
+
+    gcpcvs and AsyncGcpcvs record every HTTP call (each retry attempt counts as a call) by
+    HTTP method and endpoint template (see endpoint_template()). Read the numbers with
+    get_stats(), or export them with to_prometheus() in Prometheus text format.
+
+    Share one Metrics object between clients to aggregate their calls:
+
+        metrics = Metrics()
+        cvs = gcpcvs.gcpcvs(service_account, metrics=metrics)
+        ...
+        print(metrics.to_prometheus())
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS, prefix: str = "gcpcvs"):
+        """
+        Args:
+            buckets (tuple): Upper bounds in seconds of the latency histogram buckets, default = DEFAULT_BUCKETS
+            prefix (str): Prefix of exported metric names, default = "gcpcvs"
+        """
+
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Sets all metrics to zero """
+        with self._lock:
+            self._latency = {}          # (method, endpoint) -> _Histogram
+            self._status = {}           # (method, endpoint, status) -> calls
+            self._bytes = {}            # (method, endpoint) -> response bytes
+            self._retries = {}          # (method, endpoint) -> retries
+            self._retry_sleep = {}      # (method, endpoint) -> seconds slept before retries
+            self._token_refreshes = 0
+            self._token_failures = 0
+            self._token_wait = 0.0
+            self._rate_limit_wait = 0.0
+            self._init = {}             # step -> seconds of the last initialization
+
+    def observe_request(self, method: str, url: str, status, seconds: float, response_bytes: int = 0):
+        """ Records one HTTP call
+
+        Args:
+            method (str): HTTP method
+            url (str): URL called
+            status: HTTP status code, or a short error name (e.g. "ConnectionError") if no response was received
+            seconds (float): Time until the response was received
+            response_bytes (int): Size of response body
+        """
+
+        key = (method, endpoint_template(url))
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram == None:
+                histogram = self._latency[key] = _Histogram(len(self.buckets))
+            histogram.counts[bisect_left(self.buckets, seconds)] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+            status_key = key + (str(status),)
+            self._status[status_key] = self._status.get(status_key, 0) + 1
+            self._bytes[key] = self._bytes.get(key, 0) + response_bytes
+
+    def observe_response_bytes(self, method: str, url: str, response_bytes: int):
+        """ Records bytes of a streamed response body, which aren't known when the call is recorded """
+        key = (method, endpoint_template(url))
+        with self._lock:
+            self._bytes[key] = self._bytes.get(key, 0) + response_bytes
+
+    def observe_retry(self, method: str, url: str, delay: float):
+        """ Records a retry and the seconds slept before it """
+        key = (method, endpoint_template(url))
+        with self._lock:
+            self._retries[key] = self._retries.get(key, 0) + 1
+            self._retry_sleep[key] = self._retry_sleep.get(key, 0.0) + delay
+
+    def observe_token_refresh(self, seconds: float, failed: bool = False):
+        """ Records seconds a call waited for a new token """
+        with self._lock:
+            self._token_refreshes += 1
+            self._token_wait += seconds
+            if failed:
+                self._token_failures += 1
+
+    def observe_rate_limit_wait(self, seconds: float):
+        """ Records seconds a call waited for the rate limiter """
+        with self._lock:
+            self._rate_limit_wait += seconds
+
+    def observe_init(self, step: str, seconds: float):
+        """ Records seconds an initialization step took ("token", "project", "warmup" or "total") """
+        with self._lock:
+            self._init[step] = seconds
+
+    def get_stats(self) -> dict:
+        """ Returns all metrics
+
+        Returns:
+            dict: "requests" maps "METHOD endpoint" to calls, status counts, latency sum and average,
+                response bytes, retries and retry sleep seconds. Totals are in "token_refreshes", "token_refresh_failures",
+                "token_wait_seconds" and "rate_limit_wait_seconds". "init_seconds" maps initialization steps to seconds
+        """
+
+        with self._lock:
+            requests = {}
+            for (method, endpoint), histogram in self._latency.items():
+                key = (method, endpoint)
+                requests[f"{method} {endpoint}"] = {
+                    "calls": histogram.count,
+                    "status": {s: n for (m, e, s), n in self._status.items() if (m, e) == key},
+                    "latency_seconds_sum": histogram.sum,
+                    "latency_seconds_avg": histogram.sum / histogram.count,
+                    "response_bytes": self._bytes.get(key, 0),
+                    "retries": self._retries.get(key, 0),
+                    "retry_sleep_seconds": self._retry_sleep.get(key, 0.0),
+                }
+            return {
+                "requests": requests,
+                "token_refreshes": self._token_refreshes,
+                "token_refresh_failures": self._token_failures,
+                "token_wait_seconds": self._token_wait,
+                "rate_limit_wait_seconds": self._rate_limit_wait,
+                "init_seconds": dict(self._init),
+            }
+
+    def to_prometheus(self) -> str:
+        """ Returns all metrics in Prometheus text exposition format """
+        p = self.prefix
+        lines = []
+        def header(name, kind, text):
+            lines.append(f"# HELP {p}_{name} {text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+        def labels(method, endpoint, **extra):
+            pairs = [("method", method), ("endpoint", endpoint)] + list(extra.items())
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        with self._lock:
+            header("request_duration_seconds", "histogram", "Latency of CVS API calls")
+            for (method, endpoint), histogram in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{p}_request_duration_seconds_bucket{labels(method, endpoint, le=bound)} {cumulative}")
+                lines.append(f"{p}_request_duration_seconds_bucket{labels(method, endpoint, le='+Inf')} {histogram.count}")
+                lines.append(f"{p}_request_duration_seconds_sum{labels(method, endpoint)} {histogram.sum}")
+                lines.append(f"{p}_request_duration_seconds_count{labels(method, endpoint)} {histogram.count}")
+
+            header("requests_total", "counter", "CVS API calls by status code")
+            for (method, endpoint, status), n in sorted(self._status.items()):
+                lines.append(f"{p}_requests_total{labels(method, endpoint, status=status)} {n}")
+
+            for name, values, text in [
+                    ("response_bytes_total", self._bytes, "Bytes received from the CVS API"),
+                    ("retries_total", self._retries, "Retried CVS API calls"),
+                    ("retry_sleep_seconds_total", self._retry_sleep, "Seconds slept before retrying CVS API calls")]:
+                header(name, "counter", text)
+                for (method, endpoint), n in sorted(values.items()):
+                    lines.append(f"{p}_{name}{labels(method, endpoint)} {n}")
+
+            for name, value, text in [
+                    ("token_refreshes_total", self._token_refreshes, "Token refreshes done by API calls"),
+                    ("token_refresh_failures_total", self._token_failures, "Failed token refreshes done by API calls"),
+                    ("token_wait_seconds_total", self._token_wait, "Seconds API calls waited for token refreshes"),
+                    ("rate_limit_wait_seconds_total", self._rate_limit_wait, "Seconds API calls waited for the rate limiter")]:
+                header(name, "counter", text)
+                lines.append(f"{p}_{name} {value}")
+
+            header("init_seconds", "gauge", "Seconds the last client initialization took, by step")
+            for step, seconds in sorted(self._init.items()):
+                lines.append(f'{p}_init_seconds{{step="{step}"}} {seconds}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# Compact object model for CVS objects held in large numbers
+
+import json
+import sys
+from typing import Iterable, Iterator
+
+_MISSING = object()
+
+# Fields with few distinct values. Their strings are shared between objects
+INTERNED_FIELDS = {"region", "lifeCycleState", "state", "mirrorState", "relationshipStatus", "serviceLevel",
+                   "storageClass", "network", "poolId", "remoteRegion", "replicationSchedule"}
+
+class CVSObject():
+    """ Memory efficient representation of a CVS object. Base class of Volume, Pool, Snapshot, Backup and Replication
+
+    The API returns every object as a dict with dozens of keys. Subclasses keep the frequently used
+    ("hot") fields listed in their __slots__ as attributes. All other fields are kept as one compact
+    JSON string and only decoded when accessed. With fields (projection), only the requested fields
+    are kept at all.
+
+    Attributes and items work the same: volume.name == volume["name"]. Accessing a field the object
+    doesn't have raises AttributeError/KeyError. Use to_dict() for code expecting the API dicts.
+
+    Example:
+        vols = Volume.from_list(cvs.iterVolumesByRegion("-"), fields=["volumeId", "name", "usedBytes"])
+    """
+
+    __slots__ = ("_rest",)
+    RESOURCE = None
+
+    def __init__(self, data: dict, fields: Iterable[str] = None):
+        """
+        Args:
+            data (dict): object as returned by the API
+            fields (iterable): names of fields to keep. Default None = all
+        """
+
+        if fields != None:
+            fields = set(fields)
+        rest = {}
+        for key, value in data.items():
+            if fields != None and key not in fields:
+                continue
+            if key in self.__slots__:
+                if key in INTERNED_FIELDS and type(value) is str:
+                    value = sys.intern(value)
+                object.__setattr__(self, key, value)
+            else:
+                rest[key] = value
+        self._rest = json.dumps(rest, separators=(",", ":")).encode() if rest else None
+
+    @classmethod
+    def from_list(cls, objects: Iterable[dict], fields: Iterable[str] = None) -> list:
+        """ Converts API dicts, e.g. the result of getVolumesByRegion or iterVolumesByRegion, to a list of objects """
+        fields = set(fields) if fields != None else None
+        return [cls(o, fields) for o in objects]
+
+    @classmethod
+    def from_iter(cls, objects: Iterable[dict], fields: Iterable[str] = None) -> Iterator:
+        """ Like from_list, but converts one object at a time """
+        fields = set(fields) if fields != None else None
+        for o in objects:
+            yield cls(o, fields)
+
+    def _cold(self) -> dict:
+        return json.loads(self._rest) if self._rest != None else {}
+
+    def __getattr__(self, name: str):
+        # Called for fields not in __slots__ or not set
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = self._cold().get(name, _MISSING)
+        if value is _MISSING:
+            raise AttributeError(f"{type(self).__name__} has no field {name}")
+        return value
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: str, default=None):
+        """ Returns field "key", default if the object doesn't have it """
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            return default
+
+    def to_dict(self) -> dict:
+        """ Returns the object as dict, like the API returned it (minus fields dropped by projection) """
+        d = {key: getattr(self, key) for key in self.__slots__ if key != "_rest" and hasattr(self, key)}
+        d.update(self._cold())
+        return d
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.get(self.__slots__[0])}, name={self.get('name')})"
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+class Volume(CVSObject):
+    """ Volume, see CVSObject """
+    __slots__ = ("volumeId", "name", "region", "poolId", "lifeCycleState", "quotaInBytes", "usedBytes", "serviceLevel",
+                 "network", "isDataProtection", "inReplication")
+    RESOURCE = "Volumes"
+
+class Pool(CVSObject):
+    """ Storage pool, see CVSObject """
+    __slots__ = ("poolId", "name", "region", "state", "sizeInBytes", "allocatedBytes", "serviceLevel", "storageClass",
+                 "network")
+    RESOURCE = "Pools"
+
+class Snapshot(CVSObject):
+    """ Snapshot, see CVSObject. ownerId is the volumeId of its volume """
+    __slots__ = ("snapshotId", "ownerId", "name", "region", "lifeCycleState", "usedBytes", "created")
+    RESOURCE = "Snapshots"
+
+class Backup(CVSObject):
+    """ Backup, see CVSObject """
+    __slots__ = ("backupId", "volumeId", "name", "region", "lifeCycleState", "bytesTransferred", "created")
+    RESOURCE = "Backups"
+
+class Replication(CVSObject):
+    """ Volume replication relationship, see CVSObject """
+    __slots__ = ("relationshipId", "name", "region", "remoteRegion", "sourceVolumeUUID", "destinationVolumeUUID",
+                 "mirrorState", "relationshipStatus", "lifeCycleState", "replicationSchedule")
+    RESOURCE = "VolumeReplications"
+
+# API path -> model class
+MODELS = {cls.RESOURCE: cls for cls in [Volume, Pool, Snapshot, Backup, Replication]}
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Name lookups for CVS objects without downloading a region list per lookup
+
+import logging
+import threading
+from time import monotonic
+
+# Object types which can be indexed: API path -> ID field
+INDEXED_RESOURCES = {
+    "Pools": "poolId",
+    "Volumes": "volumeId",
+    "VolumeReplications": "relationshipId",
+}
+
+class _Index():
+    # Index of one region and object type
+    def __init__(self):
+        self.built = monotonic()
+        self.by_name = {}
+        self.by_id = {}
+
+    def add(self, objectID: str, obj: dict):
+        self.remove(objectID)
+        self.by_name.setdefault(obj['name'], {})[objectID] = obj
+        self.by_id[objectID] = obj['name']
+
+    def remove(self, objectID: str):
+        name = self.by_id.pop(objectID, None)
+        if name != None:
+            del self.by_name[name][objectID]
+            if len(self.by_name[name]) == 0:
+                del self.by_name[name]
+
+class NameIndex():
+    """ name -> objects index per region and object type
+
+    Built from one list call per region and object type. Lookups are dict lookups. The index is
+    updated incrementally by changes done through the owning gcpcvs object (creates add, deletes
+    remove entries). It is rebuilt when it is older than ttl, or when a name isn't found and the
+    index is older than miss_refresh seconds, to pick up objects created by others.
+
+    CVS doesn't enforce unique names. Lookups return all objects with a name, duplicates() lists
+    ambiguous names.
+    """
+
+    def __init__(self, cvs, ttl: float = 300, miss_refresh: float = 10):
+        """
+        Args:
+            cvs (gcpcvs): client used for the list calls
+            ttl (float): Seconds after which an index is rebuilt, default = 300
+            miss_refresh (float): Rebuild index on unknown names if older than this, default = 10
+        """
+
+        self.cvs = cvs
+        self.ttl = ttl
+        self.miss_refresh = miss_refresh
+        self.builds = 0
+        self._indexes = {}
+        self._build_locks = {}
+        self._lock = threading.Lock()
+
+    def _key(self, region: str, resource: str) -> tuple:
+        if resource not in INDEXED_RESOURCES:
+            raise ValueError(f"Cannot index {resource}. Supported: {', '.join(INDEXED_RESOURCES)}")
+        return (region, resource)
+
+    def refresh(self, region: str, resource: str):
+        """ Rebuilds index for region and object type with one list call """
+        key = self._key(region, resource)
+        id_field = INDEXED_RESOURCES[resource]
+        objects = self.cvs._API_getAll(region, resource, refresh=True).json()
+        index = _Index()
+        for o in objects:
+            index.add(o[id_field], o)
+        with self._lock:
+            self._indexes[key] = index
+            self.builds += 1
+        logging.info(f"NameIndex: indexed {len(objects)} {resource} in {region}")
+
+    def _get_index(self, key: tuple, max_age: float) -> _Index:
+        # Returns index, (re)builds it if older than max_age
+        with self._lock:
+            index = self._indexes.get(key)
+            if index != None and monotonic() - index.built <= max_age:
+                return index
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        # Only one thread builds an index, others wait for it
+        with build_lock:
+            with self._lock:
+                index = self._indexes.get(key)
+                if index != None and monotonic() - index.built <= max_age:
+                    return index
+            self.refresh(*key)
+            with self._lock:
+                return self._indexes[key]
+
+    def _find(self, index: _Index, name: str) -> list:
+        with self._lock:
+            return [dict(o) for o in index.by_name.get(name, {}).values()]
+
+    def lookup(self, region: str, resource: str, name: str) -> list:
+        """ Returns list entries of all objects named "name"
+
+        Args:
+            region (str): Name of GCP region. "-" for all
+            resource (str): Object type, one of INDEXED_RESOURCES
+            name (str): Name of object
+
+        Returns:
+            list: list of dicts as returned by the list API call. Empty if name is unknown
+        """
+
+        key = self._key(region, resource)
+        found = self._find(self._get_index(key, self.ttl), name)
+        if len(found) == 0:
+            found = self._find(self._get_index(key, self.miss_refresh), name)
+        return found
+
+    def add(self, region: str, resource: str, obj: dict):
+        """ Adds object to existing indexes of region and "-" """
+        id_field = INDEXED_RESOURCES[resource]
+        with self._lock:
+            for r in set([region, obj.get('region', region), "-"]):
+                index = self._indexes.get((r, resource))
+                if index != None:
+                    index.add(obj[id_field], obj)
+
+    def remove(self, region: str, resource: str, objectID: str):
+        """ Removes object from existing indexes of region and "-" """
+        with self._lock:
+            for r in [region, "-"]:
+                index = self._indexes.get((r, resource))
+                if index != None:
+                    index.remove(objectID)
+
+    def invalidate(self, region: str = None, resource: str = None):
+        """ Drops indexes. None for all regions/types """
+        with self._lock:
+            for key in [k for k in self._indexes if (region == None or k[0] == region) and (resource == None or k[1] == resource)]:
+                del self._indexes[key]
+
+    def duplicates(self, region: str, resource: str) -> dict:
+        """ Returns names used by more than one object
+
+        Returns:
+            dict: name -> list of object IDs
+        """
+
+        index = self._get_index(self._key(region, resource), self.ttl)
+        with self._lock:
+            return {name: list(objects) for name, objects in index.by_name.items() if len(objects) > 1}
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Client side rate limiting for CVS API calls
+
+import logging
+import threading
+from time import monotonic, sleep
+
+class TokenBucket():
+    """ Thread-safe token bucket with adaptive rate (AIMD)
+
+    Callers reserve a token and get the time they have to wait before sending. The bucket
+    may go into debt, so waiting callers are served in order of their reservation.
+    """
+
+    def __init__(self, rate: float, burst: float = None, min_rate: float = None, decrease_factor: float = 0.5,
+                 additive_increase: float = None):
+        """
+        Args:
+            rate (float): Maximum (and initial) rate in calls per second
+            burst (float): Bucket size. Default = rate, at least 1
+            min_rate (float): Lower limit for adaptive rate. Default = rate/10
+            decrease_factor (float): Factor to lower the rate by when throttled. Default = 0.5
+            additive_increase (float): Calls/s the rate recovers per second without throttling. Default = rate/20
+        """
+
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst if burst != None else max(1.0, rate)
+        self.min_rate = min_rate if min_rate != None else rate / 10
+        self.decrease_factor = decrease_factor
+        self.additive_increase = additive_increase if additive_increase != None else rate / 20
+        self.tokens = self.burst
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self._updated = monotonic()
+        self._adjusted = monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """ Takes a token. Returns seconds the caller has to wait before sending its request """
+        with self._lock:
+            now = monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            self.wait_seconds += wait
+            return wait
+
+    def on_throttled(self):
+        """ Multiplicative decrease. Called when the API answered 429 """
+        with self._lock:
+            now = monotonic()
+            self.throttled += 1
+            # Calls sent before the last decrease took effect will also see 429s. Decrease only once per interval
+            # Successes don't move _last_decrease, so they can't hold back the next decrease
+            if now - self._last_decrease < 1 / self.rate:
+                return
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._last_decrease = now
+            self._adjusted = now
+            logging.info(f"TokenBucket: throttled by API, lowering rate to {self.rate:.2f}/s")
+
+    def on_success(self):
+        """ Additive increase. Called on successful API calls """
+        with self._lock:
+            if self.rate >= self.max_rate:
+                return
+            now = monotonic()
+            self._refill(now)
+            self.rate = min(self.max_rate, self.rate + (now - self._adjusted) * self.additive_increase)
+            self._adjusted = now
+
+class RateLimiter():
+    """ Rate limiter for CVS API calls with separate budgets for reads and writes
+
+    Pass the same object to multiple gcpcvs/AsyncGcpcvs objects to share the budget, e.g.
+    for multiple workers using the same project quota:
+
+        limiter = RateLimiter.shared(my_project, read_rate=10, write_rate=1)
+        cvs = gcpcvs.gcpcvs(service_account, rate_limiter=limiter)
+
+    The rates adapt to the API: each 429 response halves the rate of the affected budget,
+    successful calls raise it again slowly up to the configured rate.
+    """
+
+    READ_METHODS = ["GET", "HEAD", "OPTIONS"]
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, read_rate: float = 10.0, write_rate: float = 1.0, read_burst: float = None, write_burst: float = None,
+                 decrease_factor: float = 0.5):
+        """
+        Args:
+            read_rate (float): Maximum GET calls per second, default = 10
+            write_rate (float): Maximum POST/PUT/DELETE calls per second, default = 1
+            read_burst (float): Number of GET calls which can be sent without waiting. Default = read_rate
+            write_burst (float): Number of write calls which can be sent without waiting. Default = write_rate
+            decrease_factor (float): Factor to lower rates by on 429 responses, default = 0.5
+        """
+
+        self.read = TokenBucket(read_rate, read_burst, decrease_factor=decrease_factor)
+        self.write = TokenBucket(write_rate, write_burst, decrease_factor=decrease_factor)
+
+    def __repr__(self) -> str:
+        return f"RateLimiter(read_rate={self.read.rate:.2f}, write_rate={self.write.rate:.2f})"
+
+    @classmethod
+    def shared(cls, name: str = "default", **kwargs) -> "RateLimiter":
+        """ Returns process wide rate limiter "name". Created with kwargs on first use
+
+        Args:
+            name (str): Name of limiter, e.g. project number
+            kwargs: Arguments for RateLimiter, used only when the limiter is created
+
+        Returns:
+            RateLimiter: limiter shared by all callers using the same name
+        """
+
+        with cls._shared_lock:
+            if name not in cls._shared:
+                cls._shared[name] = cls(**kwargs)
+            return cls._shared[name]
+
+    def bucket(self, method: str) -> TokenBucket:
+        """ Returns token bucket used for HTTP method """
+        return self.read if method.upper() in self.READ_METHODS else self.write
+
+    def reserve(self, method: str) -> float:
+        """ Takes a token for method. Returns seconds to wait before sending. Use for asyncio """
+        return self.bucket(method).reserve()
+
+    def acquire(self, method: str) -> float:
+        """ Takes a token for method, blocks until request may be sent. Returns seconds waited """
+        wait = self.reserve(method)
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+    def on_response(self, method: str, status_code: int):
+        """ Adapts rate of the method's budget to the API response """
+        if status_code == 429:
+            self.bucket(method).on_throttled()
+        elif status_code < 400:
+            self.bucket(method).on_success()
+
+    def get_stats(self) -> dict:
+        """ Returns current rates, number of 429s and total seconds waited per budget """
+        return {name: {"rate": b.rate, "throttled": b.throttled, "wait_seconds": b.wait_seconds}
+                for name, b in [("read", self.read), ("write", self.write)]}
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#
+# Which regions offer which CVS service type, probed instead of hard-coded
+
+import logging
+import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from typing import Optional
+from .GoogleHelpers import get_gcp_regions
+from .Retry import RetryPolicy
+
+# Regions with CVS (software) and CVS-Performance (hardware) service types
+# Used for regions which couldn't be probed
+CVS_SW_REGIONS = ['asia-east2', 'asia-northeast2', 'asia-northeast3', 'asia-south1', 'asia-south2', 'asia-southeast2',
+                  'australia-southeast2',
+                  'europe-central2', 'europe-north1', 'europe-west1', 'europe-west6',
+                  'southamerica-east1',
+                  'us-east1', 'us-west1']
+CVS_HW_REGIONS = ['asia-northeast1', 'asia-southeast1',
+                  'australia-southeast1',
+                  'europe-west2', 'europe-west3', 'europe-west4', 'europe-southwest1',
+                  'northamerica-northeast1', 'northamerica-northeast2',
+                  'us-central1', 'us-east4', 'us-west2', 'us-west3', 'us-west4']
+
+# Service types, as used as keys of region entries
+CVS = "cvs"
+CVS_PERFORMANCE = "cvs_performance"
+
+class RegionMap():
+    """ Region capability map: CVS service types and API latency per region
+
+    Built by calling the version API of every GCP region in parallel. Regions answering are
+    available. Regions answering with a client error (e.g. 404) don't offer CVS.
+
+    The version answer doesn't state the service type. The service type of regions in
+    CVS_SW_REGIONS and CVS_HW_REGIONS is taken from these lists. For other regions it is
+    guessed from the sdeVersion field: it is assumed that only CVS (software defined engine)
+    regions report one, so regions with an sdeVersion are taken as CVS, others as CVS-Performance.
+
+    Regions which couldn't be probed (timeouts, server errors, 401/403 which say nothing about
+    the region) fall back to the static lists. The map is rebuilt after ttl seconds and can be
+    stored in a DiskCache. Maps without any successful probe aren't stored.
+
+    Each region entry is a dict with keys "available" (True, False or None if unknown),
+    "cvs", "cvs_performance", "latency" (seconds), "apiVersion", "sdeVersion" and "error".
+    """
+
+    def __init__(self, cvs, ttl: float = 86400, disk_cache = None, regions: list = None, max_workers: int = 16):
+        """
+        Args:
+            cvs (gcpcvs): client used for the version calls
+            ttl (float): Seconds after which the map is probed again, default = 86400
+            disk_cache (DiskCache): Store the map on disk for later processes. Default None = memory only
+            regions (list): Regions to probe. Default None = all GCP regions (requires compute.regions.list
+                permissions), or CVS_SW_REGIONS + CVS_HW_REGIONS if they can't be listed
+            max_workers (int): Number of regions probed in parallel, default = 16
+        """
+
+        self.cvs = cvs
+        self.ttl = ttl
+        self.disk_cache = disk_cache
+        self.candidates = regions
+        self.max_workers = max_workers
+        self.probes = 0
+        self._regions = None
+        self._probed = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def _candidate_regions(self) -> list:
+        if self.candidates != None:
+            return list(self.candidates)
+        try:
+            return get_gcp_regions()
+        except Exception as e:
+            logging.warning(f"RegionMap: cannot list GCP regions, probing known CVS regions only: {e}")
+            return CVS_SW_REGIONS + CVS_HW_REGIONS
+
+    def _probe(self, region: str) -> dict:
+        entry = {"available": None, CVS: False, CVS_PERFORMANCE: False, "latency": None,
+                 "apiVersion": None, "sdeVersion": None, "error": None}
+        start = time()
+        try:
+            with self.cvs.retrying(RetryPolicy(max_attempts=2, timeout=30)):
+                version = self.cvs.getVersionByRegion(region)
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            entry["error"] = str(e)
+            if status != None and 400 <= status < 500 and status not in [401, 403, 429]:
+                # Answered, but doesn't serve this project in this region
+                entry["available"] = False
+            return entry
+        except Exception as e:
+            entry["error"] = str(e)
+            return entry
+        entry["latency"] = time() - start
+        entry["available"] = True
+        entry["apiVersion"] = version.get("apiVersion")
+        entry["sdeVersion"] = version.get("sdeVersion")
+        if region in CVS_SW_REGIONS or region in CVS_HW_REGIONS:
+            entry[CVS] = region in CVS_SW_REGIONS
+            entry[CVS_PERFORMANCE] = region in CVS_HW_REGIONS
+        else:
+            # Assumption, see class description
+            entry[CVS] = bool(entry["sdeVersion"])
+            entry[CVS_PERFORMANCE] = not entry[CVS]
+        return entry
+
+    def refresh(self) -> dict:
+        """ Probes all regions now and returns region -> entry """
+        regions = self._candidate_regions()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(regions)))) as executor:
+            probed = dict(zip(regions, executor.map(self._probe, regions)))
+        with self._lock:
+            self._regions = probed
+            self._probed = time()
+            self.probes += 1
+        if all(e["available"] == None for e in probed.values()):
+            # Nothing learned, e.g. no network or no permissions. Don't keep it for later processes
+            logging.warning("RegionMap: no region could be probed, using static region lists")
+        elif self.disk_cache != None:
+            self.disk_cache.put_region_map(self.cvs.project, probed, self._probed)
+        logging.info(f"RegionMap: probed {len(probed)} regions, {sum(1 for e in probed.values() if e['available'])} available")
+        return probed
+
+    def _current(self) -> Optional[dict]:
+        # Returns the map if it is younger than ttl, from memory or the disk cache. None if it needs probing
+        with self._lock:
+            if self._regions != None and time() - self._probed < self.ttl:
+                return self._regions
+            if self.disk_cache != None:
+                cached = self.disk_cache.get_region_map(self.cvs.project)
+                if cached != None and time() - cached[1] < self.ttl:
+                    self._regions, self._probed = cached
+                    return self._regions
+        return None
+
+    def get_map(self) -> dict:
+        """ Returns region -> entry. Loads the map from the disk cache or probes regions if it is older than ttl
+
+        Only one thread probes, concurrent callers wait for its result
+        """
+
+        regions = self._current()
+        if regions != None:
+            return regions
+        with self._refresh_lock:
+            # Another thread may have probed while this one waited
+            regions = self._current()
+            return regions if regions != None else self.refresh()
+
+    def has_type(self, region: str, service_type: str) -> Optional[bool]:
+        """ Returns True if service_type (CVS or CVS_PERFORMANCE) is available in region, None if unknown """
+        entry = self.get_map().get(region)
+        if entry == None or entry["available"] == None:
+            return None
+        return entry["available"] and entry[service_type]
+
+    def is_type_cvs(self, region: str) -> bool:
+        """ Returns True if CVS is available in region. Falls back to CVS_SW_REGIONS """
+        available = self.has_type(region, CVS)
+        return available if available != None else region in CVS_SW_REGIONS
+
+    def is_type_cvs_performance(self, region: str) -> bool:
+        """ Returns True if CVS-Performance is available in region. Falls back to CVS_HW_REGIONS """
+        available = self.has_type(region, CVS_PERFORMANCE)
+        return available if available != None else region in CVS_HW_REGIONS
+
+    def get_regions(self, service_type: str = None) -> list:
+        """ Returns regions offering service_type (CVS, CVS_PERFORMANCE or None for any), fastest first
+
+        Regions which couldn't be probed are included if the static lists contain them
+        """
+
+        regions = self.get_map()
+        fallback = {CVS: CVS_SW_REGIONS, CVS_PERFORMANCE: CVS_HW_REGIONS, None: CVS_SW_REGIONS + CVS_HW_REGIONS}[service_type]
+        result = []
+        for region, entry in regions.items():
+            if entry["available"] == None:
+                if region in fallback:
+                    result.append((float("inf"), region))
+            elif entry["available"] and (service_type == None or entry[service_type]):
+                result.append((entry["latency"], region))
+        return [region for _, region in sorted(result)]
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# Retry policies used by the gcpcvs API call engines. Contains no I/O, so
+# the same policy can be used by synchronous and asyncio clients.
+
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# HTTP methods which can be repeated without side effects
+IDEMPOTENT_METHODS = ["GET", "HEAD", "PUT", "OPTIONS"]
+
+# CVS API returns 500 with this message if no more jobs can be started for a pool/region.
+# The request wasn't processed and can be repeated
+JOB_SLOT_MESSAGE = "Cannot spawn additional jobs"
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """ Parses a Retry-After header value
+
+    Args:
+        value (str): Retry-After value, either delay in seconds or HTTP date
+
+    Returns:
+        float: seconds to wait, or None if header is missing or invalid
+    """
+
+    if value == None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo == None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class RetryPolicy():
+    """ Decides if and how long to wait before repeating an API call
+
+    Uses capped exponential backoff with full jitter: before retry n (starting at 0) it waits
+    a random time between 0 and min(max_delay, base_delay * 2**n) seconds. If the API sends
+    a Retry-After header, the wait is at least that long.
+
+    Retried are:
+        - 429 Too many requests and 409 (object is transitioning between states)
+        - 500 "Cannot spawn additional jobs", which means the request wasn't processed
+        - other 5xx codes in retry_statuses, but only for idempotent methods (GET, PUT)
+        - connection errors, but only for idempotent methods or if the request was never sent
+    """
+
+    def __init__(self, max_attempts: int = None, base_delay: float = 1.0, max_delay: float = 60.0, timeout: float = 600,
+                 retry_statuses: tuple = (409, 429, 500, 502, 503, 504), retry_connection_errors: bool = True,
+                 respect_retry_after: bool = True):
+        """
+        Args:
+            max_attempts (int): Maximum number of calls including the first one. None for no limit
+            base_delay (float): Backoff base in seconds, default = 1
+            max_delay (float): Upper limit of a single wait in seconds, default = 60
+            timeout (float): Don't start waits which would end later than timeout seconds after the first call, default = 600
+            retry_statuses (tuple): HTTP status codes to retry
+            retry_connection_errors (bool): Retry connection resets and timeouts, default = True
+            respect_retry_after (bool): Wait at least as long as the Retry-After header asks for, default = True
+        """
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.retry_statuses = retry_statuses
+        self.retry_connection_errors = retry_connection_errors
+        self.respect_retry_after = respect_retry_after
+
+    def __repr__(self) -> str:
+        return (f"RetryPolicy(max_attempts={self.max_attempts}, base_delay={self.base_delay}, max_delay={self.max_delay}, "
+                f"timeout={self.timeout})")
+
+    @classmethod
+    def never(cls) -> "RetryPolicy":
+        """ Policy which never retries """
+        return cls(max_attempts=1)
+
+    def is_retryable(self, method: str, status_code: int = None, message: str = None, sent: bool = True) -> bool:
+        """ Checks if a call may be repeated
+
+        Args:
+            method (str): HTTP method
+            status_code (int): HTTP status code, None if the call failed with a connection error
+            message (str): Error message returned by the API
+            sent (bool): False if the request is known to never have reached the server
+
+        Returns:
+            bool: True if call can be repeated
+        """
+
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        if status_code == None:
+            return self.retry_connection_errors and (idempotent or not sent)
+        if status_code not in self.retry_statuses:
+            return False
+        if status_code in [409, 429]:
+            return True
+        if status_code == 500 and message != None and JOB_SLOT_MESSAGE in message:
+            return True
+        return idempotent
+
+    def backoff(self, attempt: int) -> float:
+        """ Returns jittered backoff in seconds before retry number "attempt" (starting at 0) """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def get_delay(self, method: str, attempt: int, elapsed: float, status_code: int = None, message: str = None,
+                  retry_after: str = None, sent: bool = True) -> Optional[float]:
+        """ Returns seconds to wait before the next try, or None if the call shouldn't be repeated
+
+        Args:
+            method (str): HTTP method
+            attempt (int): Number of retries done so far
+            elapsed (float): Seconds since the first call
+            status_code (int): HTTP status code of last call, None for connection errors
+            message (str): Error message returned by the API
+            retry_after (str): Value of Retry-After header
+            sent (bool): False if the request is known to never have reached the server
+
+        Returns:
+            float: Seconds to wait or None
+        """
+
+        if not self.is_retryable(method, status_code, message, sent):
+            return None
+        if self.max_attempts != None and attempt + 1 >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt)
+        if self.respect_retry_after:
+            server_delay = parse_retry_after(retry_after)
+            if server_delay != None:
+                delay = max(delay, server_delay)
+        if elapsed + delay > self.timeout:
+            return None
+        return delay
+
+class RetryStats():
+    """ Accumulates retries and wait times of API calls """
+
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+
+    def __repr__(self) -> str:
+        return f"RetryStats(calls={self.calls}, retries={self.retries}, wait_seconds={self.wait_seconds:.1f})"
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+#
+# Central poller for long running CVS operations
+
+import logging
+import threading
+from concurrent.futures import Future
+from time import monotonic
+from typing import Callable, Optional
+
+# Object types which can be watched: API path -> (ID field, state field, poll interval in seconds)
+WATCHED_RESOURCES = {
+    "Pools": ("poolId", "state", 20),
+    "Volumes": ("volumeId", "lifeCycleState", 20),
+    "Snapshots": ("snapshotId", "lifeCycleState", 10),
+    "Backups": ("backupId", "lifeCycleState", 5),
+    "VolumeReplications": ("relationshipId", "lifeCycleState", 15),
+}
+
+class _Watch():
+    # A pending wait for one object
+    def __init__(self, objectID: str, until: Callable, deadline: Optional[float], missing_deadline: Optional[float]):
+        self.objectID = objectID
+        self.until = until
+        self.deadline = deadline
+        self.missing_deadline = missing_deadline
+        self.listed = False
+        self.future = Future()
+
+class StateWatcher():
+    """ Waits for state changes of many CVS objects with one list call per region and object type
+
+    Instead of polling every object with its own GET, all pending waits for e.g. volumes in a
+    region are resolved from a single "Volumes" list call. Polling traffic grows with the number
+    of regions and object types, not with the number of operations in flight.
+
+    Each watch returns a concurrent.futures.Future, which resolves to the object's list entry
+    (or None for deleted objects). Wait for one with future.result(), or for many with
+    StateWatcher.wait(futures), concurrent.futures.wait() or as_completed().
+
+    A daemon thread does the polling. It is started by the first watch and stops when no
+    watches are pending.
+
+    Waits don't hang on errors: after max_failures list calls in a row failed, all waits of the
+    region and object type fail with the last error. Waits for objects which have to exist (see
+    missing_grace of watch()) fail with LookupError if the object isn't listed.
+    """
+
+    def __init__(self, cvs, intervals: dict = None, max_failures: int = 3, missing_grace: float = 120):
+        """
+        Args:
+            cvs (gcpcvs): client used for the list calls
+            intervals (dict): API path -> poll interval in seconds, overrides the defaults in WATCHED_RESOURCES
+            max_failures (int): Failed list calls in a row after which pending waits fail, default = 3
+            missing_grace (float): Default seconds watch_state() waits for a new object to show up in lists, default = 120
+        """
+
+        self.cvs = cvs
+        self.intervals = {path: r[2] for path, r in WATCHED_RESOURCES.items()}
+        self.intervals.update(intervals or {})
+        self.max_failures = max_failures
+        self.missing_grace = missing_grace
+        self.polls = 0
+        self._pending = {}
+        self._failures = {}         # (region, resource) -> list calls failed in a row
+        self._next_poll = {}
+        self._thread = None
+        self._condition = threading.Condition()
+
+    def watch(self, region: str, resource: str, objectID: str, until: Callable, timeout: float = None,
+              missing_grace: float = None) -> Future:
+        """ Waits for an object to reach a condition
+
+        Args:
+            region (str): Name of GCP region
+            resource (str): Object type, one of WATCHED_RESOURCES (e.g. "Volumes")
+            objectID (str): ID of object
+            until (callable): Called with the object's list entry, or None if the object isn't listed.
+                Returns True when the wait is over. Exceptions raised are passed to the future
+            timeout (float): Seconds to wait before the future fails with TimeoutError. None = no timeout
+            missing_grace (float): The object has to exist. Fail with LookupError if it isn't listed within
+                missing_grace seconds, or isn't listed anymore after it was. None = missing objects are passed to until
+
+        Returns:
+            Future: resolves to the last list entry of the object (None if not listed)
+        """
+
+        if resource not in WATCHED_RESOURCES:
+            raise ValueError(f"Cannot watch {resource}. Supported: {', '.join(WATCHED_RESOURCES)}")
+        now = monotonic()
+        w = _Watch(objectID, until, now + timeout if timeout != None else None,
+                   now + missing_grace if missing_grace != None else None)
+        key = (region, resource)
+        with self._condition:
+            if key not in self._pending:
+                self._pending[key] = []
+                self._next_poll.setdefault(key, monotonic() + self.intervals[resource])
+            self._pending[key].append(w)
+            if self._thread == None:
+                self._thread = threading.Thread(target=self._run, name="gcpcvs-StateWatcher", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return w.future
+
+    def watch_state(self, region: str, resource: str, objectID: str, pending: tuple = ("creating",), timeout: float = None) -> Future:
+        """ Waits until object is listed with a state not in "pending". Fails if it isn't listed, see watch() """
+        state_field = WATCHED_RESOURCES[resource][1]
+        return self.watch(region, resource, objectID, lambda o: o != None and o.get(state_field) not in pending, timeout,
+                          self.missing_grace)
+
+    def watch_deleted(self, region: str, resource: str, objectID: str, timeout: float = None) -> Future:
+        """ Waits until object is no longer listed. See watch() """
+        return self.watch(region, resource, objectID, lambda o: o == None, timeout)
+
+    @staticmethod
+    def wait(futures: list, timeout: float = None) -> list:
+        """ Waits for multiple watches
+
+        Args:
+            futures (list): Futures returned by watch()
+            timeout (float): Maximum seconds to wait for each future
+
+        Returns:
+            list: results in the order of futures. Raises the exception of the first failed watch
+        """
+
+        return [f.result(timeout) for f in futures]
+
+    def get_stats(self) -> dict:
+        """ Returns number of list calls done and pending watches per region and object type """
+        with self._condition:
+            return {
+                "polls": self.polls,
+                "pending": {f"{region}/{resource}": len(w) for (region, resource), w in self._pending.items()},
+            }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._pending) == 0:
+                    self._thread = None
+                    return
+                now = monotonic()
+                due = [key for key in self._pending if self._next_poll[key] <= now]
+                if len(due) == 0:
+                    self._condition.wait(min(self._next_poll[key] for key in self._pending) - now)
+                    continue
+            for key in due:
+                self._poll(key)
+
+    def _poll(self, key: tuple):
+        region, resource = key
+        id_field = WATCHED_RESOURCES[resource][0]
+        error = None
+        try:
+            objects = {o[id_field]: o for o in self.cvs._API_getAll(region, resource, refresh=True).json()}
+        except Exception as e:
+            # Keep waits pending and try again next interval, unless the list calls keep failing
+            logging.warning(f"StateWatcher: listing {resource} in {region} failed: {e}")
+            objects = None
+            error = e
+
+        with self._condition:
+            self.polls += 1
+            self._next_poll[key] = monotonic() + self.intervals[resource]
+            self._failures[key] = self._failures.get(key, 0) + 1 if error != None else 0
+            if error != None and self._failures[key] >= self.max_failures:
+                logging.error(f"StateWatcher: listing {resource} in {region} failed {self._failures[key]} times, giving up")
+                for w in self._pending.pop(key):
+                    w.future.set_exception(error)
+                del self._failures[key]
+                return
+            now = monotonic()
+            remaining = []
+            for w in self._pending[key]:
+                try:
+                    if objects != None:
+                        obj = objects.get(w.objectID)
+                        if w.missing_deadline != None:
+                            if obj == None and (w.listed or now >= w.missing_deadline):
+                                raise LookupError(f"{resource} {w.objectID} in {region} is not listed")
+                            w.listed = w.listed or obj != None
+                        if (obj != None or w.missing_deadline == None) and w.until(obj):
+                            w.future.set_result(obj)
+                            continue
+                except Exception as e:
+                    w.future.set_exception(e)
+                    continue
+                if w.deadline != None and now >= w.deadline:
+                    w.future.set_exception(TimeoutError(f"Waiting for {resource} {w.objectID} in {region} timed out"))
+                    continue
+                remaining.append(w)
+            if len(remaining) > 0:
+                self._pending[key] = remaining
+            else:
+                del self._pending[key]
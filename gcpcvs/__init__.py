@@ -1 +1,18 @@
-from .gcpcvs import gcpcvs
+from .gcpcvs import gcpcvs, FanoutResult, BulkResult, RotationResult, DeleteResult
+from .AsyncGcpcvs import AsyncGcpcvs
+from .Retry import RetryPolicy, RetryStats
+from .RateLimiter import RateLimiter
+from .JobScheduler import JobScheduler
+from .StateWatcher import StateWatcher
+from .Cache import ResponseCache
+from .NameIndex import NameIndex
+from .Metrics import Metrics
+# Model classes are used as gcpcvs.Models.Volume etc. A package level Volume would clash with gcpcvs.gcpcvs.Volume
+from . import Models
+from .DiskCache import DiskCache
+from .RegionMap import RegionMap
+from .ChangeFeed import ChangeFeed, Change
+
+# Not imported here, so "import gcpcvs" doesn't load what only tests and tools need. Import them from their
+# modules: gcpcvs.FakeCVSServer (http.server, argparse) and gcpcvs.Inventory (sqlite3). Package level names
+# would clash with these submodules
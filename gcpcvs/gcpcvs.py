@@ -1,16 +1,185 @@
 # -*- coding: utf-8 -*-
 from .BearerAuth import BearerAuth
-from .GoogleHelpers import getGoogleProjectNumber
+from .DiskCache import DiskCache
+from .GoogleHelpers import getGoogleProjectNumber, get_gcp_regions
+from .Retry import RetryPolicy, RetryStats
+from .RateLimiter import RateLimiter
+from .JobScheduler import JobScheduler
+from .StateWatcher import StateWatcher, WATCHED_RESOURCES
+from .Cache import ResponseCache, parse_api_path
+from .NameIndex import NameIndex, INDEXED_RESOURCES
+from .Metrics import Metrics, timed_init_step
+from .JSONStream import iter_json_array
+from .RegionMap import RegionMap, CVS_SW_REGIONS, CVS_HW_REGIONS
 import requests
 import logging
 import re
-import random
+import socket
+import threading
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
 from time import sleep, time
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Iterator
 
 Volume = dict
 VolumeList = list[Volume]
 
+# Object types deleteObjects handles, children first: API path -> ID field
+DELETE_ORDER = {
+    "VolumeReplications": "relationshipId",
+    "Backups": "backupId",
+    "Snapshots": "snapshotId",
+    "Volumes": "volumeId",
+    "Pools": "poolId",
+}
+
+# Fields only volumes have. Volumes created from a snapshot or backup also carry snapshotId/backupId
+_VOLUME_FIELDS = ("creationToken", "quotaInBytes")
+
+def _object_resource(obj: dict) -> str:
+    # Returns the DELETE_ORDER resource of an object dict as returned by the API, None if unknown
+    if obj.get("relationshipId"):
+        return "VolumeReplications"
+    if obj.get("volumeId") and any(field in obj for field in _VOLUME_FIELDS):
+        return "Volumes"
+    return next((r for r in ["Backups", "Snapshots", "Volumes", "Pools"] if obj.get(DELETE_ORDER[r])), None)
+
+class FanoutResult(list):
+    """ List of objects merged from a per region fan-out query
+
+    Behaves like the list returned by the "-" (all regions) API calls. Additionally carries
+    per region results, so callers can tell which regions failed or were slow.
+
+    Attributes:
+        errors (dict): region -> Exception for regions which couldn't be listed
+        latencies (dict): region -> seconds the region took to answer (also for failed regions)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.errors = {}
+        self.latencies = {}
+
+    @property
+    def complete(self) -> bool:
+        """ True if all regions returned successfully """
+        return len(self.errors) == 0
+
+class BulkResult():
+    """ Outcome for one object of a bulk operation like createVolumes
+
+    Attributes:
+        name (str): name from the object's payload
+        objectID (str): ID of the object, None if the API call failed
+        lifeCycleState (str): final state of the object (state for pools), None if unknown
+        error (Exception): error raised while submitting or waiting, None on success
+        elapsed (float): seconds from start of submission until the final state was reached
+        object (dict): last known description of the object
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.objectID = None
+        self.lifeCycleState = None
+        self.error = None
+        self.elapsed = None
+        self.object = None
+
+    def __repr__(self) -> str:
+        return f"BulkResult(name={self.name}, objectID={self.objectID}, lifeCycleState={self.lifeCycleState}, error={self.error!r}, elapsed={self.elapsed})"
+
+    @property
+    def ok(self) -> bool:
+        """ True if object reached "available" state """
+        return self.error == None and self.lifeCycleState == "available"
+
+class RotationResult():
+    """ Outcome of rotateBackups for one volume
+
+    Attributes:
+        region (str): region of the volume
+        volumeID (str): volumeId of the volume
+        volumeName (str): name of the volume, None if unknown
+        backupName (str): name of the new backup, None if none was created
+        backupID (str): backupId of the new backup, None if creation failed
+        deleted (list): backupIds of pruned backups
+        error (str): reason of the failure, None on success
+        create_seconds (float): seconds from submission until the new backup was available
+        prune_seconds (float): seconds spent deleting old backups
+        elapsed (float): seconds from start of rotateBackups until the volume was done
+    """
+
+    def __init__(self, region: str, volumeID: str):
+        self.region = region
+        self.volumeID = volumeID
+        self.volumeName = None
+        self.backupName = None
+        self.backupID = None
+        self.deleted = []
+        self.error = None
+        self.create_seconds = None
+        self.prune_seconds = None
+        self.elapsed = None
+
+    def __repr__(self) -> str:
+        return (f"RotationResult(region={self.region}, volumeID={self.volumeID}, backupName={self.backupName}, "
+                f"deleted={len(self.deleted)}, error={self.error!r}, elapsed={self.elapsed})")
+
+    @property
+    def ok(self) -> bool:
+        """ True if the new backup was created and all old backups were pruned """
+        return self.error == None
+
+class DeleteResult():
+    """ Outcome of deleteObjects for one object
+
+    Attributes:
+        region (str): region of the object
+        resource (str): object type, e.g. "Volumes"
+        objectID (str): ID of the object
+        name (str): name of the object, None if unknown
+        error (str): reason why the object wasn't deleted, None on success
+        started (float): seconds from start of deleteObjects until the DELETE was sent, None if never sent
+        elapsed (float): seconds from start of deleteObjects until the object was gone or failed
+    """
+
+    def __init__(self, region: str, resource: str, objectID: str, name: str = None):
+        self.region = region
+        self.resource = resource
+        self.objectID = objectID
+        self.name = name
+        self.error = None
+        self.started = None
+        self.elapsed = None
+
+    def __repr__(self) -> str:
+        return f"DeleteResult({self.resource}/{self.objectID} in {self.region}, name={self.name}, error={self.error!r}, elapsed={self.elapsed})"
+
+    @property
+    def ok(self) -> bool:
+        """ True if the object is gone """
+        return self.error == None
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """ HTTPAdapter which enables TCP keep-alive on pooled connections
+
+    Keeps idle connections to the CVS API alive between calls, e.g. while
+    waiting for long running jobs to finish.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        socket_options = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        for option in ['TCP_KEEPIDLE', 'TCP_KEEPINTVL']:
+            # Not available on all platforms (e.g. MacOS only offers TCP_KEEPALIVE)
+            if hasattr(socket, option):
+                socket_options.append((socket.IPPROTO_TCP, getattr(socket, option), 30))
+        kwargs['socket_options'] = socket_options
+        super().init_poolmanager(*args, **kwargs)
+
 class gcpcvs():
     """ A class used to manage Cloud Volumes Services on GCP 
     
@@ -18,17 +187,31 @@ class gcpcvs():
     the API JSON output. See https://cloudvolumesgcp-api.netapp.com/swagger.json
     """
 
-    project: str = None
     projectId: str = None
     service_account: str = None
     token: BearerAuth = None
-    baseurl: str = None
+    _project: str = None
+    _baseurl: str = None
+    timeout: tuple = (10, 120)
+    # Default retry policy for GET and PUT calls. POST and DELETE calls use their timeout_seconds
+    read_retry_policy: RetryPolicy = RetryPolicy(max_attempts=5, timeout=120)
+    rate_limiter: RateLimiter = None
+    job_scheduler: JobScheduler = None
+    cache: ResponseCache = None
+    metrics: Metrics = None
+    probe_regions: bool = False
+    _region_map: RegionMap = None
+    _own_token: bool = False
     headers: dict = {
                 "Content-Type": "application/json",
                 "User-Agent": "GCPCVS"
             }
 
-    def __init__(self, service_account: str, project: str = None):
+    def __init__(self, service_account: str, project: str = None, pool_size: int = 10, timeout: tuple = (10, 120), keep_alive: bool = True,
+                 fanout_workers: int = 8, rate_limiter: RateLimiter = None, job_scheduler: JobScheduler = None,
+                 cache: ResponseCache = None, endpoint: str = 'https://cloudvolumesgcp-api.netapp.com', metrics: Metrics = None,
+                 refresh_token_ahead: bool = False, disk_cache: DiskCache = None, lazy_init: bool = False,
+                 probe_regions: bool = False):
         """
         Args:
             service_account (str): service account key with cloudvolumes.admin permissions
@@ -36,13 +219,61 @@ class gcpcvs():
                 1. Absolute file path to an JSON key file
                 2. JSON key as base64-encoded string
                 3. Service Account principal name when using service account impersonation
+                4. BearerAuth object, e.g. BearerAuth.from_token() for test servers
             project (str): Google project_number or project_id or None
                 If "None", project_id is fetched from service_account
                 If using project_id, resourcemanager.projects.get permissions are required
+            pool_size (int): Maximum number of pooled HTTP connections to the CVS API, default = 10
+                Use at least the number of threads sharing this object
+            timeout (tuple): (connect, read) timeout in seconds for each API call, default = (10, 120)
+            keep_alive (bool): Keep connections open between API calls, default = True
+            fanout_workers (int): Number of regions queried in parallel by fan-out list calls, default = 8
+            rate_limiter (RateLimiter): Limits API calls per second. Share one RateLimiter between objects
+                using the same project quota. Default None = no client side limit
+            job_scheduler (JobScheduler): Queues long running jobs (creates, deletes, replication changes) to stay
+                within the API's job limits per region and pool. Default None = no client side queueing
+            cache (ResponseCache): Caches GET responses. Entries are invalidated by all changes done through
+                this object. Default None = no caching
+            endpoint (str): URL of the CVS API, default = https://cloudvolumesgcp-api.netapp.com
+            metrics (Metrics): Records latency, status codes, retries and waits of all API calls. Pass a
+                shared Metrics object to aggregate multiple objects. Default None = new Metrics object
+            refresh_token_ahead (bool): Renew the token in a background thread before it expires, so API calls
+                don't wait for token refreshes. Default False = calls refresh expired tokens themselves
+            disk_cache (DiskCache): Keep tokens and project numbers on disk for later processes. Default None = no disk cache
+            lazy_init (bool): Defer fetching the token and resolving the project number to the first API call.
+                Default False = do it now. Either way, both run in parallel with opening the first connection
+            probe_regions (bool): Use a RegionMap, probed on first use, for is_type_cvs*, and fan-out list calls.
+                Stored in disk_cache, if set. Default False = use CVS_SW_REGIONS and CVS_HW_REGIONS
         """
 
+        self.timeout = timeout
+        self.metrics = metrics if metrics != None else Metrics()
+        self.rate_limiter = rate_limiter
+        self.job_scheduler = job_scheduler
+        self.cache = cache
+        self.fanout_workers = fanout_workers
+        self.keep_alive = keep_alive
+        # All threads share one connection pool. requests.Session itself isn't thread-safe,
+        # so every thread gets its own lightweight session on top of the shared adapter
+        self._adapter = _KeepAliveAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._local = threading.local()
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
+        self._names = None
+        self.probe_regions = probe_regions
+
+        self._endpoint = endpoint.rstrip('/')
+        self._disk_cache = disk_cache
+        self._refresh_token_ahead = refresh_token_ahead
+        self._init_lock = threading.Lock()
+
         self.service_account = service_account
-        self.token = BearerAuth(service_account)    # Will raise ValueError if key provided is invalid
+        self._own_token = not isinstance(service_account, BearerAuth)
+        if self._own_token:
+            # Only parses the key. Will raise ValueError if key provided is invalid
+            self.token = BearerAuth(service_account, cache=disk_cache, lazy=True)
+        else:
+            self.token = service_account
 
         if project == None:
             # Fetch projectID from JSON key file
@@ -50,19 +281,263 @@ class gcpcvs():
 
         # Initialize projectID. Its is now either a valid projectId, or at least the project number
         self.projectId = project
-        # Resolve projectID to projectNumber
-        if re.match(r"[a-zA-z][a-zA-Z0-9-]+", project):
-            project = getGoogleProjectNumber(project)
-            if project == None:
-                raise ValueError("Cannot resolve projectId to project number. Please specify project number.")
-        self.project = project
 
-        self.baseurl = 'https://cloudvolumesgcp-api.netapp.com/v2/projects/' + str(self.project)
+        if not lazy_init:
+            self._initialize()
+
+    def _initialize(self, warm_up: bool = True):
+        # Fetches token, resolves projectID to projectNumber and opens the first connection to the API.
+        # All three are network round trips to different services, so they run in parallel
+        with self._init_lock:
+            if self._baseurl != None:
+                return
+            start = time()
+            executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="gcpcvs-init")
+            try:
+                token = executor.submit(timed_init_step, self.metrics, "token", self.token.credentials.get_token)
+                if warm_up and self.keep_alive:
+                    executor.submit(timed_init_step, self.metrics, "warmup", self._warm_up)
+                project = self.projectId
+                if re.match(r"[a-zA-z][a-zA-Z0-9-]+", project):
+                    project = timed_init_step(self.metrics, "project", getGoogleProjectNumber, project, self._disk_cache)
+                    if project == None:
+                        raise ValueError("Cannot resolve projectId to project number. Please specify project number.")
+                token.result()
+            finally:
+                # Don't wait for the warm-up, the first API call will use the connection once it is open
+                executor.shutdown(wait=False)
+            if self._refresh_token_ahead:
+                self.token.start_refresh_ahead()
+            self._project = project
+            self._baseurl = self._endpoint + '/v2/projects/' + str(project)
+            if self.metrics != None:
+                self.metrics.observe_init("total", time() - start)
+
+    def _warm_up(self):
+        # Opens a pooled connection (TCP + TLS handshake) to the API. Unauthenticated, so it doesn't wait for the token
+        # Session isn't closed, as closing it would close the shared adapter
+        session = requests.Session()
+        session.mount("https://", self._adapter)
+        session.mount("http://", self._adapter)
+        try:
+            session.head(self._endpoint, headers=self.headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            logging.debug(f"Connection warm-up to {self._endpoint} failed: {e}")
+
+    @property
+    def baseurl(self) -> str:
+        """ Returns URL of the project's API. With lazy_init, the first access initializes the object """
+        if self._baseurl == None:
+            # Called for a request, which opens the connection itself. A warm-up would only add a round trip
+            self._initialize(warm_up=False)
+        return self._baseurl
+
+    @baseurl.setter
+    def baseurl(self, url: str):
+        self._baseurl = url
+
+    @property
+    def project(self) -> str:
+        """ Returns project number. With lazy_init, the first access initializes the object """
+        if self._project == None and self._baseurl == None:
+            self._initialize(warm_up=False)
+        return self._project
+
+    @project.setter
+    def project(self, project: str):
+        self._project = project
 
     # print some infos on the class
     def __str__(self) -> str:
         return f"CVS: Project: {self.project}\nService Account: {self.service_account}\n"
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """ Closes all pooled connections to the CVS API """
+        if self._own_token:
+            self.token.close()
+        self._adapter.close()
+
+    @property
+    def watcher(self) -> StateWatcher:
+        """ Returns StateWatcher used to wait for long running operations of this object """
+        if self._watcher == None:
+            with self._watcher_lock:
+                if self._watcher == None:
+                    self._watcher = StateWatcher(self)
+        return self._watcher
+
+    @property
+    def names(self) -> NameIndex:
+        """ Returns NameIndex used by the *ByName methods of this object """
+        if self._names == None:
+            with self._watcher_lock:
+                if self._names == None:
+                    self._names = NameIndex(self)
+        return self._names
+
+    def _getFreshByName(self, region: str, resource: str, name: str, get_by_id) -> list:
+        """ Resolves name to IDs with the NameIndex, then reads each object by ID
+
+        The index only tells which objects to read, so callers get current object state. Objects
+        deleted since the index was built (404) are removed from the index and left out
+        """
+
+        id_field = INDEXED_RESOURCES[resource]
+        result = []
+        for obj in self.names.lookup(region, resource, name):
+            try:
+                result.append(get_by_id(obj.get('region', region), obj[id_field]))
+            except requests.HTTPError as e:
+                if e.response.status_code != 404:
+                    raise
+                self.names.remove(region, resource, obj[id_field])
+        return result
+
+    @property
+    def region_map(self) -> RegionMap:
+        """ Returns RegionMap of the project. Used by is_type_cvs* and fan-out calls with probe_regions """
+        if self._region_map == None:
+            with self._watcher_lock:
+                if self._region_map == None:
+                    self._region_map = RegionMap(self, disk_cache=getattr(self, '_disk_cache', None))
+        return self._region_map
+
+    @property
+    def session(self) -> requests.Session:
+        """ Returns the requests session of the calling thread """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            session.headers.update(self.headers)
+            if not self.keep_alive:
+                session.headers["Connection"] = "close"
+            session.auth = self.token
+            session.hooks['response'].append(self._log_response)
+            self._local.session = session
+        return session
+
+    @contextmanager
+    def retrying(self, policy: RetryPolicy = None):
+        """ Context manager to set the retry policy for all API calls done by the current thread
+
+        Args:
+            policy (RetryPolicy): policy to use instead of the defaults. None keeps the defaults
+
+        Yields:
+            RetryStats: number of calls, retries and seconds waited for calls done within the block
+
+        Example:
+            with cvs.retrying(RetryPolicy(max_attempts=3)) as stats:
+                cvs.createVolume(region, payload)
+            print(stats.retries, stats.wait_seconds)
+        """
+
+        previous_policy = getattr(self._local, 'retry_policy', None)
+        previous_stats = getattr(self._local, 'retry_stats', None)
+        stats = RetryStats()
+        if policy != None:
+            self._local.retry_policy = policy
+        self._local.retry_stats = stats
+        try:
+            yield stats
+        finally:
+            self._local.retry_policy = previous_policy
+            self._local.retry_stats = previous_stats
+
+    # Returns error message from an API error response
+    def _error_message(self, resp: requests.Response) -> str:
+        try:
+            reason = resp.json()
+        except ValueError:
+            return resp.text
+        if isinstance(reason, dict) and 'message' in reason:
+            return reason['message']
+        return resp.text
+
+    # Single entry point for all HTTP calls to the CVS API
+    # Repeats calls according to retry policy. Policy set by retrying() takes precedence over
+    # the retry argument, which defaults to read_retry_policy.
+    # The returned response carries the number of retries and the seconds waited as
+    # "retries" and "retry_wait" attributes
+    def _request(self, method: str, url: str, retry: RetryPolicy = None, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        policy = getattr(self._local, 'retry_policy', None) or retry or self.read_retry_policy
+        stats = getattr(self._local, 'retry_stats', None)
+
+        start = time()
+        attempt = 0
+        waited = 0.0
+        while True:
+            if stats != None:
+                stats.calls += 1
+            if self.rate_limiter != None:
+                wait = self.rate_limiter.acquire(method)
+                if self.metrics != None and wait > 0:
+                    self.metrics.observe_rate_limit_wait(wait)
+            if self.metrics != None:
+                self._refresh_token()
+            call_start = time()
+            try:
+                r = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if self.metrics != None:
+                    self.metrics.observe_request(method, url, type(e).__name__, time() - call_start)
+                # A connect timeout means the request never reached the API
+                sent = not isinstance(e, requests.ConnectTimeout)
+                delay = policy.get_delay(method, attempt, time() - start, sent=sent)
+                if delay == None:
+                    raise
+                logging.warning(f"API {method} {url}: {e}. Retry {attempt + 1} in {delay:.1f}s")
+            else:
+                if self.metrics != None:
+                    # Streamed bodies are counted by their reader
+                    size = len(r.content) if not kwargs.get('stream') else 0
+                    self.metrics.observe_request(method, url, r.status_code, time() - call_start, size)
+                if self.rate_limiter != None:
+                    self.rate_limiter.on_response(method, r.status_code)
+                if r.ok:
+                    delay = None
+                else:
+                    delay = policy.get_delay(method, attempt, time() - start, r.status_code, self._error_message(r), r.headers.get('Retry-After'))
+                if delay == None:
+                    r.retries = attempt
+                    r.retry_wait = waited
+                    if self.cache != None and method != "GET":
+                        self.cache.invalidate(*parse_api_path(url))
+                    return r
+                logging.warning(f"API {method} {url}: HTTP {r.status_code}. Retry {attempt + 1} in {delay:.1f}s")
+                # Hands the connection back to the pool. Streamed responses would keep it otherwise
+                r.close()
+            if self.metrics != None:
+                self.metrics.observe_retry(method, url, delay)
+            sleep(delay)
+            attempt += 1
+            waited += delay
+            if stats != None:
+                stats.retries += 1
+                stats.wait_seconds += delay
+
+    # Refreshes an expired token before the call, so the time spent waiting for it is recorded
+    # separately from the call's latency
+    def _refresh_token(self):
+        if self.token == None or self.token.get_cached_token() != None:
+            return
+        start = time()
+        try:
+            self.token.credentials.get_token()
+        except Exception:
+            self.metrics.observe_token_refresh(time() - start, failed=True)
+            raise
+        self.metrics.observe_token_refresh(time() - start)
+
     def getProjectNumber(self) -> int:
         return self.project
     
@@ -77,69 +552,116 @@ class gcpcvs():
 
    # generic GET function for internal use.
    # Adds error logging for HTTP errors and throws expections
-    def _do_api_get(self, url):
-        r = requests.get(url, headers=self.headers, auth=self.token, hooks={'response': self._log_response})
+   # Uses cache if configured. refresh = True skips cache lookup, but stores the new result
+    def _do_api_get(self, url, refresh: bool = False):
+        if self.cache != None and not refresh:
+            r = self.cache.get(url)
+            if r != None:
+                return r
+        r = self._request("GET", url)
         r.raise_for_status()
+        if self.cache != None:
+            self.cache.put(url, r)
         return r
 
     # generic GET function for internal use. Specify region and Suffix part of API paths to read any kind of object
     # returns request result object
     # No error handling. Handle errors yourself, using result object
-    def _API_getAll(self, region, path):
-        r = requests.get(f"{self.baseurl}/locations/{region}/{path}", headers=self.headers, auth=self.token, hooks={'response': self._log_response})
-        r.raise_for_status()
-        return r
+    def _API_getAll(self, region, path, refresh: bool = False):
+        return self._do_api_get(f"{self.baseurl}/locations/{region}/{path}", refresh)
+
+    # generic streaming GET function for internal use. Yields the objects of a list response one at a time,
+    # parsing the body while it is downloaded. Memory use doesn't grow with the size of the list.
+    # Served from cache if configured and cached (unless refresh), but streamed responses aren't stored.
+    # Errors while streaming are raised after the objects already yielded
+    def _API_iterAll(self, region: str, path: str, chunk_size: int = 64*1024, refresh: bool = False) -> Iterator[dict]:
+        url = f"{self.baseurl}/locations/{region}/{path}"
+        if self.cache != None and not refresh:
+            r = self.cache.get(url)
+            if r != None:
+                yield from r.json()
+                return
+        r = self._request("GET", url, stream=True)
+        size = 0
+        def chunks():
+            nonlocal size
+            for chunk in r.iter_content(chunk_size):
+                size += len(chunk)
+                yield chunk
+        try:
+            r.raise_for_status()
+            yield from iter_json_array(chunks(), r.encoding or "utf-8")
+        finally:
+            r.close()
+            if self.metrics != None:
+                self.metrics.observe_response_bytes("GET", url, size)
+
+    # List objects of type "path" in each region in parallel and merge results.
+    # Never raises on API errors, errors are reported per region in the result
+    def _API_getAllFanout(self, path: str, regions: list = None, max_workers: int = None) -> FanoutResult:
+        if regions == None:
+            regions = self.getFanoutRegions()
+        if max_workers == None:
+            max_workers = self.fanout_workers
+
+        def list_region(region):
+            start = time()
+            try:
+                return region, self._API_getAll(region, path).json(), None, time() - start
+            except Exception as e:
+                return region, None, e, time() - start
+
+        result = FanoutResult()
+        if len(regions) == 0:
+            return result
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(regions))) as executor:
+            for region, items, error, latency in executor.map(list_region, regions):
+                result.latencies[region] = latency
+                if error is not None:
+                    logging.warning(f"_API_getAllFanout {path}: {region} failed: {error}")
+                    result.errors[region] = error
+                else:
+                    result.extend(items)
+        return result
+
+    def getFanoutRegions(self, all_gcp_regions: bool = False) -> list:
+        """ returns list of regions queried by fan-out list calls
+
+        Args:
+            all_gcp_regions (bool): If True, use all GCP regions (requires compute.regions.list permissions).
+                Default is all regions with CVS or CVS-Performance, as probed by region_map with probe_regions
+
+        Returns:
+            list: list of region names
+        """
+
+        if all_gcp_regions:
+            return get_gcp_regions()
+        if self.probe_regions:
+            # Slowest regions first, so they don't delay the end of the fan-out
+            regions = self.region_map.get_regions()
+            if len(regions) > 0:
+                return regions[::-1]
+        return CVS_SW_REGIONS + CVS_HW_REGIONS
+
+    # Default retry policy for POST and DELETE calls
+    # use timeout_seconds == 0 for no retries
+    def _mutation_retry_policy(self, timeout_seconds: int) -> RetryPolicy:
+        if timeout_seconds == 0:
+            return RetryPolicy.never()
+        return RetryPolicy(timeout=timeout_seconds)
 
     # generic POST function for internal use.
     # Implements waiting for job slots
     # Adds error logging for HTTP errors and throws expections
     # returns requests response object
     # use timeout_seconds == 0 for no error handling
-    def _do_api_post(self, url: str, payload: dict, timeout_seconds: int = 600):
+    def _do_api_post(self, url: str, payload: dict, timeout_seconds: int = 600, retry: RetryPolicy = None):
         logging.info(f"API POST {url}")
 
-        target_time = datetime.now() + timedelta(seconds = timeout_seconds)
-        while True:
-            r = requests.post(url, headers=self.headers, auth=self.token, json=payload, hooks={'response': self._log_response})
-            reason = r.json()
-
-            # If timeout_seconds is 0, we are not repeat the call
-            if timeout_seconds == 0:
-                if r.status_code not in [200, 202]:
-                    # If API call returned without 200 or 202, log error
-                    logging.error(f"API POST: {reason}")
-                break
-
-            # Successful call
-            if r.status_code in [200, 202]:
-                break
-
-            # For some error codes we want to sleep and repeat request
-            if r.status_code in [429, 409, 500]:
-                # 429 Too many requests
-                # 409 Pool is already transitioning between states
-                # 500 internal server error
-                logging.warning(f"API POST: {reason}")
-                if r.status_code == 500:
-                    if 'message' in reason:
-                        msg = reason['message']
-                    else:
-                        msg = "error"                     
-                    if "Cannot spawn additional jobs" in msg:
-                        pass
-                    else:
-                        # leave loop and let raise_for_status throw an exception
-                        logging.error(f"API POST: {reason}")
-                        break
-                sleep(random.randrange(50,70))
-            else:
-                # any other HTTP error
-                logging.error(f"API POST: {reason}")
-                break
-
-            # Timeout
-            if datetime.now() >= target_time:
-                break
+        r = self._request("POST", url, retry=retry or self._mutation_retry_policy(timeout_seconds), json=payload)
+        if not r.ok:
+            logging.error(f"API POST: {r.text}")
         r.raise_for_status()
         return r
 
@@ -148,54 +670,66 @@ class gcpcvs():
     # Adds error logging for HTTP errors and throws expections
     # returns requests response object
     # use timeout_seconds == 0 for no error handling
-    def _do_api_delete(self, url: str, timeout_seconds: int = 120):
+    def _do_api_delete(self, url: str, timeout_seconds: int = 120, retry: RetryPolicy = None):
         logging.info(f"API DELETE {url}")
 
-        target_time = datetime.now() + timedelta(seconds = timeout_seconds)
-        while True:
-            r = requests.delete(url, headers=self.headers, auth=self.token, hooks={'response': self._log_response})
-            reason = r.json()
-
-            # If timeout_seconds is 0, we are not repeat the call
-            if timeout_seconds == 0:
-                if r.status_code not in [200, 202]:
-                    # If API call returned without 200 or 202, log error
-                    logging.error(f"API POST: {reason}")
-                break
-
-            # Successful call
-            if r.status_code in [200, 202]:
-                break
-
-            # For some error codes we want to sleep and repeat request
-            if r.status_code in [429, 409, 500]:
-                # 429 Too many requests
-                # 409 Pool is already transitioning between states
-                # 500 internal server error
-                logging.warning(f"API POST: {reason}")
-                if r.status_code == 500:
-                    if 'message' in reason:
-                        msg = reason['message']
-                    else:
-                        msg = "error"                     
-                    if "Cannot spawn additional jobs" in msg:
-                        pass
-                    else:
-                        # leave loop and let raise_for_status throw an exception
-                        logging.error(f"API POST: {reason}")
-                        break
-                sleep(random.randrange(50,70))
-            else:
-                # any other HTTP error
-                logging.error(f"API POST: {reason}")
-                break
-
-            # Timeout
-            if datetime.now() >= target_time:
-                break
+        r = self._request("DELETE", url, retry=retry or self._mutation_retry_policy(timeout_seconds))
+        if not r.ok:
+            logging.error(f"API DELETE: {r.text}")
         r.raise_for_status()
         return r
 
+    # Returns context manager which holds a job slot while a long running job is in flight.
+    # Does nothing without job scheduler
+    def _job_slot(self, region: str, pool: str = None, name: str = None):
+        if self.job_scheduler == None:
+            return nullcontext()
+        return self.job_scheduler.slot(region, pool, name)
+
+    # Adds new object to name index, if there is one
+    def _index_created(self, region: str, resource: str, obj: dict):
+        if self._names != None and 'name' in obj:
+            self._names.add(region, resource, obj)
+
+    # Waits until a replication relationship leaves its transitional state. Raises RuntimeError if it ends in error
+    def _wait_replication(self, region: str, relationshipID: str, caller: str, timeout: int = 5*60) -> dict:
+        def is_settled(relationship):
+            if relationship['lifeCycleState'] == 'error':
+                logging.error(f"{caller} {region}, {relationshipID}: {relationship['lifeCycleStateDetails']}")
+                raise RuntimeError(relationship['lifeCycleStateDetails'])
+            return relationship['lifeCycleState'] not in ['creating', 'updating']
+
+        try:
+            return self.watcher.watch(region, "VolumeReplications", relationshipID, is_settled, timeout,
+                                      self.watcher.missing_grace).result()
+        except TimeoutError:
+            raise TimeoutError(f"{caller} {region}, {relationshipID} Waiting for relationship timed out")
+
+    # DELETE for long running delete jobs. With job scheduler, the job slot is held until the object is gone
+    def _do_job_delete(self, region: str, resource: str, objectID: str, timeout_seconds: int, pool: str = None):
+        with self._job_slot(region, pool, f"DELETE {resource}/{objectID}"):
+            r = self._do_api_delete(f"{self.baseurl}/locations/{region}/{resource}/{objectID}", timeout_seconds)
+            if self.job_scheduler != None:
+                self.watcher.watch_deleted(region, resource, objectID, timeout_seconds).result()
+        if self._names != None and resource in INDEXED_RESOURCES:
+            self._names.remove(region, resource, objectID)
+        return r
+
+    # DELETE which waits until the object is gone. Holds a job slot of limiter, or of the job scheduler
+    # if there is no limiter, until then. An object which is already gone (404) counts as deleted
+    def _delete_and_wait(self, region: str, resource: str, objectID: str, limiter: JobScheduler = None, pool: str = None,
+                         timeout_seconds: int = 10*60, wait_timeout: float = None):
+        name = f"DELETE {resource}/{objectID}"
+        with limiter.slot(region, pool, name) if limiter != None else self._job_slot(region, pool, name):
+            try:
+                self._do_api_delete(f"{self.baseurl}/locations/{region}/{resource}/{objectID}", timeout_seconds)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+            self.watcher.watch_deleted(region, resource, objectID, wait_timeout if wait_timeout != None else timeout_seconds).result()
+        if self._names != None and resource in INDEXED_RESOURCES:
+            self._names.remove(region, resource, objectID)
+
     def is_type_cvs(self, region: str) -> bool:
         """ returns True if CVS-SW is available in specified region
         
@@ -205,12 +739,9 @@ class gcpcvs():
         Returns:
             bool: True is service type is available in the specified region
         """           
-        available_sw_regions = ['asia-east2', 'asia-northeast2', 'asia-northeast3', 'asia-south1', 'asia-south2', 'asia-southeast2',
-                             'australia-southeast2',
-                             'europe-central2', 'europe-north1', 'europe-west1', 'europe-west6',
-                             'southamerica-east1',
-                             'us-east1', 'us-west1']
-        return region in available_sw_regions
+        if self.probe_regions:
+            return self.region_map.is_type_cvs(region)
+        return region in CVS_SW_REGIONS
         
     def is_type_cvs_performance(self, region: str) -> bool:
         """ returns True if CVS-Performance is available in specified region
@@ -221,12 +752,9 @@ class gcpcvs():
         Returns:
             bool: True is service type is available in the specified region
         """           
-        available_hw_regions = ['asia-northeast1', 'asia-southeast1',
-                             'australia-southeast1',
-                             'europe-west2', 'europe-west3', 'europe-west4', 'europe-southwest1',
-                             'northamerica-northeast1', 'northamerica-northeast2',
-                             'us-central1', 'us-east4', 'us-west2', 'us-west3', 'us-west4']
-        return region in available_hw_regions
+        if self.probe_regions:
+            return self.region_map.is_type_cvs_performance(region)
+        return region in CVS_HW_REGIONS
 
     def getVersionByRegion(self, region: str) -> dict:
         """ returns API and SDE version for specified region
@@ -243,17 +771,22 @@ class gcpcvs():
     # StoragePools
     #
 
-    def getPoolsByRegion(self, region: str) -> list:
+    def getPoolsByRegion(self, region: str, fanout: bool = False, regions: list = None) -> list:
         """ returns list with dicts of all pools in specified region
         
         Args:
             region (str): name of GCP region. "-" for all
+            fanout (bool): If True and region is "-", query each region in parallel instead of using the
+                API's all regions query. Failing regions don't raise, see FanoutResult
+            regions (list): regions to query in fan-out mode, default is getFanoutRegions()
 
         Returns:
             list: a list of dicts with pool descriptions
         """
 
         logging.info(f"getPoolsByRegion {region}")
+        if fanout and region == "-":
+            return self._API_getAllFanout("Pools", regions)
         r = self._do_api_get(f"{self.baseurl}/locations/{region}/Pools")
         return r.json()
 
@@ -269,8 +802,7 @@ class gcpcvs():
         """     
 
         logging.info(f"getPoolsByName {region}, {name}")
-        r = self._do_api_get(f"{self.baseurl}/locations/{region}/Pools")
-        return [pool for pool in r.json() if pool["name"] == name]
+        return self._getFreshByName(region, "Pools", name, self.getPoolsByPoolID)
 
     def getPoolsByPoolID(self, region: str, poolID: str) -> dict:
         """ returns list with dicts of volumes with "poolID" in specified region
@@ -300,29 +832,44 @@ class gcpcvs():
         """
 
         logging.info(f"createPool {region}, {payload}")
-        r = self._do_api_post(f"{self.baseurl}/locations/{region}/Pools", payload, timeout)
-
-        poolID = r.json()['response']['AnyValue']['poolId']
-        if r.status_code == 200: 
-            # pool created
-            r = self._do_api_get(f"{self.baseurl}/locations/{region}/Pools/{poolID}")
-            logging.info(f"createVolume: {region}, {poolID} created")
-            return r.json() # return data of new volume
-        if r.status_code == 202: 
-            # pool still creating, wait for completion
-            volumeID = r.json()['response']['AnyValue']['poolId']
-            while True:
-                sleep(20)
+        with self._job_slot(region, None, f"createPool {region}"):
+            r = self._do_api_post(f"{self.baseurl}/locations/{region}/Pools", payload, timeout)
+
+            poolID = r.json()['response']['AnyValue']['poolId']
+            if r.status_code == 200: 
+                # pool created
+                r = self._do_api_get(f"{self.baseurl}/locations/{region}/Pools/{poolID}")
+                self._index_created(region, "Pools", r.json())
+                logging.info(f"createPool: {region}, {poolID} created")
+                return r.json() # return data of new pool
+            if r.status_code == 202: 
+                # pool still creating, wait for completion
+                self.watcher.watch_state(region, "Pools", poolID, timeout=timeout).result()
                 r = self._do_api_get(f"{self.baseurl}/locations/{region}/Pools/{poolID}")
-                state = r.json()['state']
-                if state != "creating":
-                    break
-            logging.info(f"createPool: {region}, {poolID} created")
-            return r.json() # return data of new pool. Might have failed to create. Caller needs to check lifeCycleState
+                self._index_created(region, "Pools", r.json())
+                logging.info(f"createPool: {region}, {poolID} created")
+                return r.json() # return data of new pool. Might have failed to create. Caller needs to check lifeCycleState
 
-        # We are not supposed to reach this code, since we either get 200 or 202 or raise an exception
-        logging.error(f"createPool: {region}, {poolID}: reached unexpected code path")
-        return {}
+            # We are not supposed to reach this code, since we either get 200 or 202 or raise an exception
+            logging.error(f"createPool: {region}, {poolID}: reached unexpected code path")
+            return {}
+
+    def createPools(self, region: str, payloads: list, max_concurrency: int = 10, timeout: int = 15*60, wait_timeout: int = None) -> list:
+        """ Creates multiple StoragePools concurrently and waits for all of them
+
+        Args:
+            region (str): Name of GCP region
+            payloads (list): list of dicts with parameters for createPool
+            max_concurrency (int): Maximum number of create calls sent in parallel, default = 10
+            timeout (int): timeout in seconds for each create call, default = 15*60
+            wait_timeout (int): Seconds to wait for each pool to leave "creating" state. Default None = timeout
+
+        Returns:
+            list: list of BulkResult, in order of payloads
+        """
+
+        logging.info(f"createPools {region}, {len(payloads)} pools")
+        return self._bulk_create(region, "Pools", "poolId", payloads, max_concurrency, timeout, wait_timeout)
 
     def _modifyPoolByPoolID(self, region: str, poolID: str, changes: dict) -> dict:
         """ Modifies a pool. Internal method
@@ -338,7 +885,7 @@ class gcpcvs():
 
         logging.info(f"_modifyPoolByPoolID {region}, {poolID}, {changes}")
         # Update pool
-        r = requests.put(f"{self.baseurl}/locations/{region}/Pools/{poolID}", headers=self.headers, auth=self.token, json=changes, hooks={'response': self._log_response})
+        r = self._request("PUT", f"{self.baseurl}/locations/{region}/Pools/{poolID}", json=changes)
         r.raise_for_status()
         # Add code to wait for completion?
         return r.json()
@@ -369,7 +916,7 @@ class gcpcvs():
         """     
 
         logging.info(f"deletePoolByPoolID {region}, {poolID}")
-        r = self._do_api_delete(f"{self.baseurl}/locations/{region}/Pools/{poolID}", 10*60)
+        r = self._do_job_delete(region, "Pools", poolID, 10*60)
         # Add code to wait for completion?
         return r.json()
 
@@ -377,20 +924,38 @@ class gcpcvs():
     # Volumes
     #
 
-    def getVolumesByRegion(self, region: str) -> list:
+    def getVolumesByRegion(self, region: str, fanout: bool = False, regions: list = None) -> list:
         """ returns list with dicts of all volumes in specified region
         
         Args:
             region (str): name of GCP region. "-" for all
+            fanout (bool): If True and region is "-", query each region in parallel instead of using the
+                API's all regions query. Failing regions don't raise, see FanoutResult
+            regions (list): regions to query in fan-out mode, default is getFanoutRegions()
 
         Returns:
             list: a list of dicts with volume descriptions
         """
 
         logging.info(f"getVolumesByRegion {region}")
+        if fanout and region == "-":
+            return self._API_getAllFanout("Volumes", regions)
         r = self._do_api_get(f"{self.baseurl}/locations/{region}/Volumes")
         return r.json()
 
+    def iterVolumesByRegion(self, region: str) -> Iterator[Volume]:
+        """ yields dicts of all volumes in specified region, one at a time while the list is downloaded
+
+        Args:
+            region (str): name of GCP region. "-" for all
+
+        Returns:
+            Iterator: dicts with volume descriptions. Same content as getVolumesByRegion
+        """
+
+        logging.info(f"iterVolumesByRegion {region}")
+        return self._API_iterAll(region, "Volumes")
+
     def getVolumesByName(self, region: str, name: str) -> list:
         """ returns list with dicts of volumes named "name" in specified region
         
@@ -403,14 +968,21 @@ class gcpcvs():
         """     
 
         logging.info(f"getVolumesByName {region}, {name}")
-        r = self._do_api_get(f"{self.baseurl}/locations/{region}/Volumes")
-        vols = [volume for volume in r.json() if volume["name"] == name]
+        vols = self.names.lookup(region, "Volumes", name)
         # Do a lookup of volumeId, since to generic query returns less details compared to volumeID query
         # We actuall expect only one or no volule to match the name
         if len(vols) == 1:
-            return [self.getVolumesByVolumeID(region, vols[0]['volumeId'])]
-        else:
-            return []
+            try:
+                return [self.getVolumesByVolumeID(vols[0].get('region', region), vols[0]['volumeId'])]
+            except requests.HTTPError as e:
+                if e.response.status_code != 404:
+                    raise
+                # Volume was deleted by someone else since the index was built
+                self.names.remove(region, "Volumes", vols[0]['volumeId'])
+                return []
+        if len(vols) > 1:
+            logging.warning(f"getVolumesByName {region}, {name}: name is used by {len(vols)} volumes")
+        return []
 
     def getVolumesByVolumeID(self, region: str, volumeID: str) -> dict:
         """ returns list with dicts of volumes with "volumeID" in specified region
@@ -441,7 +1013,7 @@ class gcpcvs():
 
         logging.info(f"_modifyVolumeByVolumeID {region}, {volumeID}, {changes}")
         # Update volume
-        r = requests.put(f"{self.baseurl}/locations/{region}/Volumes/{volumeID}", headers=self.headers, auth=self.token, json=changes, hooks={'response': self._log_response})
+        r = self._request("PUT", f"{self.baseurl}/locations/{region}/Volumes/{volumeID}", json=changes)
         r.raise_for_status()
         return r.json()
     
@@ -485,46 +1057,236 @@ class gcpcvs():
         """
 
         logging.info(f"createVolume {region}, {payload}")
-        if 'isDataProtection' in payload and payload['isDataProtection'] == True:
-            # Create a Data Protection volume
-            r = self._do_api_post(f"{self.baseurl}/locations/{region}/DataProtectionVolumes", payload, timeout)
-        else:
-            r = self._do_api_post(f"{self.baseurl}/locations/{region}/Volumes", payload, timeout)
-
-        volumeID = r.json()['response']['AnyValue']['volumeId']
-        if r.status_code == 200: 
-            # volume created
-            r = self._do_api_get(f"{self.baseurl}/locations/{region}/Volumes/{volumeID}")
-            logging.info(f"createVolume: {region}, {volumeID} created")
-            return r.json() # return data of new volume
-        if r.status_code == 202: 
-            # volume still creating, wait for completion
+        with self._job_slot(region, payload.get('poolId'), f"createVolume {region}"):
+            if 'isDataProtection' in payload and payload['isDataProtection'] == True:
+                # Create a Data Protection volume
+                r = self._do_api_post(f"{self.baseurl}/locations/{region}/DataProtectionVolumes", payload, timeout)
+            else:
+                r = self._do_api_post(f"{self.baseurl}/locations/{region}/Volumes", payload, timeout)
+
             volumeID = r.json()['response']['AnyValue']['volumeId']
-            while True:
-                sleep(20)
+            if r.status_code == 200: 
+                # volume created
+                r = self._do_api_get(f"{self.baseurl}/locations/{region}/Volumes/{volumeID}")
+                self._index_created(region, "Volumes", r.json())
+                logging.info(f"createVolume: {region}, {volumeID} created")
+                return r.json() # return data of new volume
+            if r.status_code == 202: 
+                # volume still creating, wait for completion
+                self.watcher.watch_state(region, "Volumes", volumeID, timeout=timeout).result()
                 r = self._do_api_get(f"{self.baseurl}/locations/{region}/Volumes/{volumeID}")
-                state = r.json()['lifeCycleState']
-                if state != "creating":
-                    break
-            logging.info(f"createVolume: {region}, {volumeID} created")
-            return r.json() # return data of new volume. Might have failed to create. Caller needs to check lifeCycleState
+                self._index_created(region, "Volumes", r.json())
+                logging.info(f"createVolume: {region}, {volumeID} created")
+                return r.json() # return data of new volume. Might have failed to create. Caller needs to check lifeCycleState
+
+            # We are not supposed to reach this code, since we either get 200 or 202 or raise an exception
+            logging.error(f"createVolume: {region}, {volumeID}: reached unexpected code path")
+            return {}
+
+    def createVolumes(self, region: str, payloads: list, max_concurrency: int = 10, timeout: int = 15*60, wait_timeout: int = None) -> list:
+        """ Creates multiple volumes concurrently and waits for all of them
+
+        Args:
+            region (str): Name of GCP region
+            payloads (list): list of dicts with parameters for createVolume
+            max_concurrency (int): Maximum number of create calls sent in parallel, default = 10
+            timeout (int): timeout in seconds for each create call, default = 15*60
+            wait_timeout (int): Seconds to wait for each volume to leave "creating" state. Default None = timeout
+
+        Returns:
+            list: list of BulkResult, in order of payloads. Check lifeCycleState and error of each result
+        """
+
+        logging.info(f"createVolumes {region}, {len(payloads)} volumes")
+        return self._bulk_create(region, "Volumes", "volumeId", payloads, max_concurrency, timeout, wait_timeout)
+
+    # Submits create calls for many objects concurrently, then waits for all of them with the StateWatcher
+    # With job scheduler, each job slot is held until the object left its "creating" state
+    def _bulk_create(self, region: str, resource: str, id_field: str, payloads: list, max_concurrency: int, timeout: int,
+                     wait_timeout: int = None) -> list:
+        start = time()
+        results = [BulkResult(payload.get('name')) for payload in payloads]
+
+        def submit(i):
+            payload = payloads[i]
+            result = results[i]
+            path = resource
+            if resource == "Volumes" and payload.get('isDataProtection') == True:
+                path = "DataProtectionVolumes"
+            pool = payload.get('poolId') if resource == "Volumes" else None
+            if self.job_scheduler != None:
+                self.job_scheduler.acquire(region, pool, f"create{resource} {region}")
+            try:
+                r = self._do_api_post(f"{self.baseurl}/locations/{region}/{path}", payload, timeout)
+                result.objectID = r.json()['response']['AnyValue'][id_field]
+                future = self.watcher.watch_state(region, resource, result.objectID,
+                                                  timeout=wait_timeout if wait_timeout != None else timeout)
+            except Exception as e:
+                logging.error(f"create{resource}: {region}, {result.name} failed: {e}")
+                result.error = e
+                result.elapsed = time() - start
+                if self.job_scheduler != None:
+                    self.job_scheduler.release(region, pool)
+                return None
+
+            # Runs in the StateWatcher thread when the wait is over
+            done = concurrent.futures.Future()
+            def finished(future):
+                result.elapsed = time() - start
+                if self.job_scheduler != None:
+                    self.job_scheduler.release(region, pool)
+                if future.exception() != None:
+                    result.error = future.exception()
+                else:
+                    result.object = future.result()
+                    result.lifeCycleState = result.object.get(WATCHED_RESOURCES[resource][1])
+                    self._index_created(region, resource, result.object)
+                done.set_result(result)
+            future.add_done_callback(finished)
+            return done
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(payloads)))) as executor:
+            futures = [f for f in executor.map(submit, range(len(payloads))) if f != None]
+        concurrent.futures.wait(futures)
+        logging.info(f"create{resource}: {region}, {sum(r.ok for r in results)}/{len(results)} available")
+        return results
+
+    def deleteObjects(self, objects: list, max_concurrency: int = 16, max_jobs_per_region: int = 8, timeout: int = 30*60) -> list:
+        """ Deletes many objects of different types, children before their parents
+
+        Replications are deleted before their volumes, backups and snapshots before their volume and
+        volumes before their pool. An object is deleted as soon as all of its children in objects are
+        gone, independent of other objects. Total time is close to the slowest chain, not the sum of
+        all deletes. Objects whose children failed to delete are not deleted.
+
+        Args:
+            objects (list): object dicts as returned by the API (pools, volumes, snapshots, backups,
+                replications), (resource, dict) tuples to skip the type detection of dicts, or
+                (region, resource, objectID) tuples. resource is one of DELETE_ORDER. Dependencies are
+                only known for dicts
+            max_concurrency (int): Maximum number of deletes in flight, default = 16
+            max_jobs_per_region (int): Maximum delete jobs in flight per region, default = 8. Ignored if this
+                object has a job_scheduler, which is used instead
+            timeout (int): Seconds to wait for each object to be gone, default = 30*60
 
-        # We are not supposed to reach this code, since we either get 200 or 202 or raise an exception
-        logging.error(f"createVolume: {region}, {volumeID}: reached unexpected code path")
-        return {}
+        Returns:
+            list: list of DeleteResult, in order of objects
+        """
 
-    def deleteVolumeByVolumeID(self, region: str, volumeID: str) -> dict:
+        start = time()
+        results = {}        # (resource, objectID) -> DeleteResult
+        parents = {}        # (resource, objectID) -> keys of objects waiting for it
+        pools = {}          # (resource, objectID) -> poolId, for per pool job limits
+        order = []
+        for obj in objects:
+            if isinstance(obj, dict) or len(obj) == 2:
+                resource, obj = (_object_resource(obj), obj) if isinstance(obj, dict) else obj
+                if resource == None:
+                    raise ValueError(f"deleteObjects: Unknown object type: {obj}")
+                if resource not in DELETE_ORDER:
+                    raise ValueError(f"deleteObjects: Cannot delete {resource}. Supported: {', '.join(DELETE_ORDER)}")
+                key = (resource, obj[DELETE_ORDER[resource]])
+                result = DeleteResult(obj["region"], resource, key[1], obj.get("name"))
+            else:
+                region, resource, objectID = obj
+                if resource not in DELETE_ORDER:
+                    raise ValueError(f"deleteObjects: Cannot delete {resource}. Supported: {', '.join(DELETE_ORDER)}")
+                key = (resource, objectID)
+                result = DeleteResult(region, resource, objectID)
+                obj = {}
+            order.append(key)
+            if key in results:
+                continue
+            results[key] = result
+            parents[key] = []
+            if resource == "VolumeReplications":
+                parents[key] = [("Volumes", obj.get("sourceVolumeUUID")), ("Volumes", obj.get("destinationVolumeUUID"))]
+            elif resource == "Backups":
+                parents[key] = [("Volumes", obj.get("volumeId"))]
+            elif resource == "Snapshots":
+                parents[key] = [("Volumes", obj.get("ownerId", obj.get("volumeId")))]
+            elif resource == "Volumes":
+                parents[key] = [("Pools", obj.get("poolId"))]
+                pools[key] = obj.get("poolId")
+
+        # Only dependencies between the given objects count
+        waiting = {key: 0 for key in results}
+        for key in results:
+            parents[key] = [p for p in set(parents[key]) if p in results and p != key]
+            for p in parents[key]:
+                waiting[p] += 1
+        logging.info(f"deleteObjects: {len(results)} objects")
+
+        # Without job scheduler, limit jobs in flight per region for this call only
+        limiter = None if self.job_scheduler != None else JobScheduler(max_jobs_per_region, max_jobs_per_pool=max_jobs_per_region)
+        lock = threading.Lock()
+        remaining = [len(results)]
+        done = threading.Event()
+        failed = {}         # key -> key of the child which wasn't deleted
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(results))), thread_name_prefix="gcpcvs-delete")
+
+        def finished(key):
+            ready = []
+            with lock:
+                for p in parents[key]:
+                    if results[key].error != None:
+                        failed.setdefault(p, key)
+                    waiting[p] -= 1
+                    if waiting[p] == 0:
+                        ready.append(p)
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    done.set()
+            for p in ready:
+                schedule(p)
+
+        def schedule(key):
+            if key in failed:
+                result = results[key]
+                result.error = f"not deleted, {failed[key][0]} {failed[key][1]} wasn't deleted"
+                result.elapsed = time() - start
+                finished(key)
+            else:
+                executor.submit(delete, key)
+
+        def delete(key):
+            result = results[key]
+            result.started = time() - start
+            try:
+                self._delete_and_wait(result.region, result.resource, result.objectID, limiter, pools.get(key),
+                                      wait_timeout=timeout)
+            except Exception as e:
+                logging.error(f"deleteObjects: deleting {result.resource} {result.objectID} in {result.region} failed: {e}")
+                result.error = str(e) or type(e).__name__
+            result.elapsed = time() - start
+            finished(key)
+
+        try:
+            if len(results) > 0:
+                for key in [key for key in results if waiting[key] == 0]:
+                    schedule(key)
+                done.wait()
+        finally:
+            executor.shutdown()
+        logging.info(f"deleteObjects: {sum(r.ok for r in results.values())}/{len(results)} deleted in {time() - start:.0f}s")
+        return [results[key] for key in order]
+
+    def deleteVolumeByVolumeID(self, region: str, volumeID: str, poolID: str = None) -> dict:
         """ delete volumes with "volumeID" in specified region
         
         Args:
             region (str): Name of GCP region
             volumeID (str): volumeID of volume
+            poolID (str): poolId of the volume, for the per pool job limit of job_scheduler. Default None =
+                looked up if this object has a job_scheduler
         Returns:
             dict: Returns API response as dict            
         """     
 
         logging.info(f"deleteVolumeByVolumeID {region}, {volumeID}")
-        r = self._do_api_delete(f"{self.baseurl}/locations/{region}/Volumes/{volumeID}", 10*60)
+        if poolID == None and self.job_scheduler != None:
+            poolID = self.getVolumesByVolumeID(region, volumeID).get('poolId')
+        r = self._do_job_delete(region, "Volumes", volumeID, 10*60, poolID)
         return r.json()
 
     # CVS API uses serviceLevel = (basic, standard, extreme)
@@ -580,20 +1342,38 @@ class gcpcvs():
     # Snapshots
     #
 
-    def getSnapshotsByRegion(self, region: str) -> list:
+    def getSnapshotsByRegion(self, region: str, fanout: bool = False, regions: list = None) -> list:
         """ returns list with dicts of all snapshots in specified region
         
         Args:
             region (str): name of GCP region. "-" for all
+            fanout (bool): If True and region is "-", query each region in parallel instead of using the
+                API's all regions query. Failing regions don't raise, see FanoutResult
+            regions (list): regions to query in fan-out mode, default is getFanoutRegions()
 
         Returns:
             list: a list of dicts with snapshot descriptions
         """
 
         logging.info(f"getSnapshotsByRegion {region}")
+        if fanout and region == "-":
+            return self._API_getAllFanout("Snapshots", regions)
         r = self._do_api_get(f"{self.baseurl}/locations/{region}/Snapshots")
         return r.json()
 
+    def iterSnapshotsByRegion(self, region: str) -> Iterator[dict]:
+        """ yields dicts of all snapshots in specified region, one at a time while the list is downloaded
+
+        Args:
+            region (str): name of GCP region. "-" for all
+
+        Returns:
+            Iterator: dicts with snapshot descriptions. Same content as getSnapshotsByRegion
+        """
+
+        logging.info(f"iterSnapshotsByRegion {region}")
+        return self._API_iterAll(region, "Snapshots")
+
     def deleteSnapshotBySnapshotID(self, region: str, snaphotID: str) -> dict:
         """ delete snapshot with snapshotID in specified region
         
@@ -605,24 +1385,29 @@ class gcpcvs():
         """     
 
         logging.info(f"deleteSnapshotBySnapshotID {region}, {snaphotID}")
-        r = self._do_api_delete(f"{self.baseurl}/locations/{region}/Snapshots/{snaphotID}", 2*60)
+        r = self._do_job_delete(region, "Snapshots", snaphotID, 2*60)
         return r.json()
 
     #
     # Replication
     #
 
-    def getVolumeReplicationByRegion(self, region: str) -> list:
+    def getVolumeReplicationByRegion(self, region: str, fanout: bool = False, regions: list = None) -> list:
         """ returns list with dicts of all relationships in specified region
         
         Args:
             region (str): name of GCP region. "-" for all
+            fanout (bool): If True and region is "-", query each region in parallel instead of using the
+                API's all regions query. Failing regions don't raise, see FanoutResult
+            regions (list): regions to query in fan-out mode, default is getFanoutRegions()
 
         Returns:
             list: a list of dicts with relationship descriptions
         """
 
         logging.info(f"getVolumeReplicationByRegion {region}")
+        if fanout and region == "-":
+            return self._API_getAllFanout("VolumeReplications", regions)
         r = self._do_api_get(f"{self.baseurl}/locations/{region}/VolumeReplications")
         return r.json()
 
@@ -653,8 +1438,7 @@ class gcpcvs():
         """
 
         logging.info(f"getVolumeReplicationByName {region} {name}")
-        relationships = self.getVolumeReplicationByRegion(region)
-        return [r for r in relationships if r['name'] == name]
+        return self._getFreshByName(region, "VolumeReplications", name, self.getVolumeReplicationByID)
 
     def createVolumeReplication(self, relationship_name: str, source_volume: Volume, destination_volume: Volume, schedule: str) -> dict:
         """ Creates a Volume Replication Relationship.
@@ -694,7 +1478,10 @@ class gcpcvs():
         }
         print(f"{self.baseurl}/locations/{region}/VolumeReplications")
         logging.info(f"createVolumeReplication {relationship_name} {payload}")
-        r = self._do_api_post(f"{self.baseurl}/locations/{region}/VolumeReplications", payload)
+        with self._job_slot(region, None, f"createVolumeReplication {relationship_name}"):
+            r = self._do_api_post(f"{self.baseurl}/locations/{region}/VolumeReplications", payload)
+            if self.job_scheduler != None:
+                self._wait_replication(region, r.json()['response']['AnyValue']['relationshipId'], "createVolumeReplication")
         # TODO: Should we wait until it is available in mirrored state? And return a full CRR json?
         return r
 
@@ -710,26 +1497,27 @@ class gcpcvs():
         """     
 
         logging.info(f"breakVolumeReplicationByID {destination_region}, {relationshipID}, {force}")
-        payload = {
-            "force": force
-        }
-        r = self._do_api_post(f"{self.baseurl}/locations/{destination_region}/VolumeReplications/{relationshipID}/Break", payload)
+        with self._job_slot(destination_region, None, f"breakVolumeReplicationByID {relationshipID}"):
+            payload = {
+                "force": force
+            }
+            r = self._do_api_post(f"{self.baseurl}/locations/{destination_region}/VolumeReplications/{relationshipID}/Break", payload)
+
+            # Wait for connection to be broken
+            def is_broken(relationship):
+                if relationship == None:
+                    return False
+                if relationship['lifeCycleState'] == 'error':
+                    logging.error(f"breakVolumeReplicationByID {destination_region}, {relationshipID}: {relationship['lifeCycleStateDetails']}")
+                    raise RuntimeError(relationship['lifeCycleStateDetails'])
+                return relationship['lifeCycleState'] == 'available'
 
-        # Wait for connection to be broken
-        start = time()
-        while True:
-            sleep(15)
-            res = self._do_api_get(f"{self.baseurl}/locations/{destination_region}/VolumeReplications/{relationshipID}")
-            if res.json()['lifeCycleState'] == 'available':
-                break
-            if res.json()['lifeCycleState'] == 'error':
-                logging.error(f"breakVolumeReplicationByID {destination_region}, {relationshipID}: {res.json()['lifeCycleStateDetails']}")
-                raise RuntimeError(res.json()['lifeCycleStateDetails'])
-            # Add timeout in case relationship never becomes available
-            if time() > start + 5*60:
-                raise TimeoutError(f"breakVolumeReplicationByID {destination_region}, {relationshipID} Waiting for break to finish timed out")
             logging.info(f"breakVolumeReplicationByID {destination_region}, {relationshipID} Waiting for break to complete")
-        return res.json()
+            try:
+                self.watcher.watch(destination_region, "VolumeReplications", relationshipID, is_broken, timeout=5*60).result()
+            except TimeoutError:
+                raise TimeoutError(f"breakVolumeReplicationByID {destination_region}, {relationshipID} Waiting for break to finish timed out")
+            return self.getVolumeReplicationByID(destination_region, relationshipID)
 
     def resyncVolumeReplicationByID(self, destination_region: str, relationshipID: str) -> dict:
         """ resyncs a replication relationship with "relationshipID" in specified region
@@ -744,7 +1532,10 @@ class gcpcvs():
         logging.info(f"resyncVolumeReplicationByID {destination_region}, {relationshipID}")
         payload = {
         }
-        r = self._do_api_post(f"{self.baseurl}/locations/{destination_region}/VolumeReplications/{relationshipID}/Resync", payload)
+        with self._job_slot(destination_region, None, f"resyncVolumeReplicationByID {relationshipID}"):
+            r = self._do_api_post(f"{self.baseurl}/locations/{destination_region}/VolumeReplications/{relationshipID}/Resync", payload)
+            if self.job_scheduler != None:
+                self._wait_replication(destination_region, relationshipID, "resyncVolumeReplicationByID")
         # TODO: Should we wait until it is available in mirrored state? And return a full CRR json?
         return r.json()
 
@@ -783,7 +1574,11 @@ class gcpcvs():
             "replicationPolicy": relationship['replicationPolicy'],
             "replicationSchedule": relationship['replicationSchedule'],
         }
-        reverse_relationship = self._do_api_post(f"{self.baseurl}/locations/{relationship['remoteRegion']}/VolumeReplications", payload)
+        with self._job_slot(relationship['remoteRegion'], None, f"createReverseVolumeReplicationByID {relationshipID}"):
+            reverse_relationship = self._do_api_post(f"{self.baseurl}/locations/{relationship['remoteRegion']}/VolumeReplications", payload)
+            if self.job_scheduler != None:
+                self._wait_replication(relationship['remoteRegion'], reverse_relationship.json()['response']['AnyValue']['relationshipId'],
+                                       "createReverseVolumeReplicationByID")
 
         # TODO: Should we wait until it is available in mirrored state? And return a full CRR json?
         return reverse_relationship.json()
@@ -799,7 +1594,7 @@ class gcpcvs():
         """     
 
         logging.info(f"deleteVolumeReplicationByID {region}, {relationshipID}")
-        r = self._do_api_delete(f"{self.baseurl}/locations/{region}/VolumeReplications/{relationshipID}", 10*60)
+        r = self._do_job_delete(region, "VolumeReplications", relationshipID, 10*60)
         # TODO: Should we wait until the delete is complete?
         return r.json()
 
@@ -807,20 +1602,38 @@ class gcpcvs():
     # Backups
     #
 
-    def getBackups(self, region: str) -> list:
+    def getBackups(self, region: str, fanout: bool = False, regions: list = None) -> list:
         """ returns list with dicts of all backups in specified region
         
         Args:
             region (str): name of GCP region. "-" for all
+            fanout (bool): If True and region is "-", query each region in parallel instead of using the
+                API's all regions query. Failing regions don't raise, see FanoutResult
+            regions (list): regions to query in fan-out mode, default is getFanoutRegions()
 
         Returns:
             list: a list of dicts with backup descriptions
         """
 
         logging.info(f"getBackups {region}")        
+        if fanout and region == "-":
+            return self._API_getAllFanout("Backups", regions)
         r = self._do_api_get(f"{self.baseurl}/locations/{region}/Backups")
         return r.json()
 
+    def iterBackups(self, region: str) -> Iterator[dict]:
+        """ yields dicts of all backups in specified region, one at a time while the list is downloaded
+
+        Args:
+            region (str): name of GCP region. "-" for all
+
+        Returns:
+            Iterator: dicts with backup descriptions. Same content as getBackups
+        """
+
+        logging.info(f"iterBackups {region}")
+        return self._API_iterAll(region, "Backups")
+
     def getBackupsByVolumeID(self, region: str, volumeID: str) -> list:
         """ returns list with dicts of backups with "volumeID" in specified region
         
@@ -837,40 +1650,43 @@ class gcpcvs():
         return r.json()
 
     # creates a CVS backup of specified volume with specified name
-    def createBackup(self, region: str, volumeID: str, name: str) -> bool:
+    def createBackup(self, region: str, volumeID: str, name: str, timeout: int = 60*60) -> bool:
         """ Create volume backups 
         
         Args:
             region (str): Name of GCP region. "-" for all
             volumeID (str): volumeID of volume
             name (str): Name of backup
+            timeout (int): Seconds to wait for the backup to complete, default = 60*60
 
         Returns:
             bool: True if creation succeeded
         """  
 
         logging.info(f"createBackup {region}, {volumeID}, {name} begin")
-        body = {
-            "name": name,
-            "volumeId": volumeID
-        }
-        r = self._do_api_post(f"{self.baseurl}/locations/{region}/Backups", body, 10*60)
-        if r.status_code == 201 or r.status_code == 202:
-            # Wait until backup is complete
-            backupID = r.json()["response"]["AnyValue"]["backupId"]
-            while True:
-                sleep(5)
-                r = self._do_api_get(f"{self.baseurl}/locations/{region}/Backups/{backupID}")
-                status = r.json()["lifeCycleState"]
-                if status == "available":
-                    break
-                # TODO: Implement timeout if state=available is never reached
-                logging.warning(f"createBackup: Backup {name} of volume {volumeID} still in status {status}. Waiting ...")
-            logging.info(f"createBackup: Backup {name} of volume {volumeID} completed.")
-            return True
-        else:
-            logging.error(f"createBackup: Backup {name} of volume {volumeID} failed.")
-            return False
+        with self._job_slot(region, None, f"createBackup {volumeID}"):
+            body = {
+                "name": name,
+                "volumeId": volumeID
+            }
+            r = self._do_api_post(f"{self.baseurl}/locations/{region}/Backups", body, 10*60)
+            if r.status_code == 201 or r.status_code == 202:
+                # Wait until backup is complete
+                backupID = r.json()["response"]["AnyValue"]["backupId"]
+                try:
+                    backup = self.watcher.watch(region, "Backups", backupID, lambda b: b["lifeCycleState"] in ["available", "error"],
+                                                timeout, self.watcher.missing_grace).result()
+                except (TimeoutError, LookupError) as e:
+                    logging.error(f"createBackup: Backup {name} of volume {volumeID} failed: {e}")
+                    return False
+                if backup["lifeCycleState"] != "available":
+                    logging.error(f"createBackup: Backup {name} of volume {volumeID} failed: {backup.get('lifeCycleStateDetails')}")
+                    return False
+                logging.info(f"createBackup: Backup {name} of volume {volumeID} completed.")
+                return True
+            else:
+                logging.error(f"createBackup: Backup {name} of volume {volumeID} failed.")
+                return False
 
     # create new backup according to name schema and delete oldest one
     def rotateBackup(self, region: str, volumeID:str , count: int) -> bool:
@@ -892,11 +1708,7 @@ class gcpcvs():
         logging.info(f"rotateBackup: Region: {region}, Volume: {volumeID}, Volume got {len(backups)}/{max_backups} backups")
 
         # Find volume name for volumeID
-        vols = self.getVolumesByVolumeID(region, volumeID)
-        # if len(vols) != 1:
-        #     logging.error(f"rotateBackup: Region: {region}, Cannot find VolumeID: {volumeID}")
-        #     return False
-        volumename = vols[0]["name"]
+        volumename = self.getVolumesByVolumeID(region, volumeID)["name"]
         volumehash = volumeID[0:6]
 
         # Create new backup. Will fail if name already exits, e.g if ran multiple times in the same minute
@@ -905,7 +1717,7 @@ class gcpcvs():
             logging.error(f"rotateBackup: Region: {region}, Volume: {volumename}, VolumeID: {volumeID}: Creating Backup {backupname} failed.")  
             return False
         # Count existing number of backups
-        p = re.compile(f"{volumename}-......-\d\d\d\d-\d\d-\d\dT\d\d:\d\d")
+        p = re.compile(rf"{re.escape(volumename)}-......-\d\d\d\d-\d\d-\d\dT\d\d:\d\d")
         backups = [backup for backup in self.getBackupsByVolumeID(region, volumeID) if p.match(backup["name"])]
         # Sort by time
         sortedbackups = sorted(backups, key=lambda b: datetime.fromisoformat(b['created'].strip("Z")), reverse=True)
@@ -915,15 +1727,139 @@ class gcpcvs():
         i = count
         while i < len(sortedbackups):
             backupToDelete = sortedbackups[i]
-            self.deleteBackupbyBackupID(region, backupToDelete["backupId"])
+            self.deleteBackupByBackupID(region, backupToDelete["backupId"])
             i = i + 1
         return True
 
+    def rotateBackups(self, volumes: list, count: int, max_concurrency: int = 16, max_jobs_per_region: int = 8,
+                      timeout: int = 60*60) -> list:
+        """ Rotates backups of many volumes: creates a new backup of each volume and prunes the oldest ones
+
+        Same naming and pruning as rotateBackup, but planned from one backup listing per region. Creates
+        and prunes of different volumes run concurrently, waiting for completion with the StateWatcher.
+
+        Args:
+            volumes (list): volume dicts (e.g. from getVolumesByRegion) or (region, volumeID) tuples
+            count (int): number of backups to keep per volume, including the new one. 1-30
+            max_concurrency (int): Maximum number of volumes rotated in parallel, default = 16
+            max_jobs_per_region (int): Maximum backup jobs in flight per region, default = 8. Ignored if this
+                object has a job_scheduler, which is used instead
+            timeout (int): Seconds to wait for each new backup to become available, default = 60*60
+
+        Returns:
+            list: list of RotationResult, in order of volumes
+        """
+
+        # Currently max 32 backups per volume allowed. We need one more for the new one before pruning
+        max_backups = 32
+        if not 1 <= count <= max_backups - 2:
+            raise ValueError(f"rotateBackups: Number of backups {count} to keep must be between 1-{max_backups - 2}.")
+
+        start = time()
+        results = []
+        for v in volumes:
+            if isinstance(v, dict):
+                result = RotationResult(v["region"], v["volumeId"])
+                result.volumeName = v.get("name")
+            else:
+                result = RotationResult(*v)
+            results.append(result)
+        logging.info(f"rotateBackups: {len(results)} volumes, backups to keep: {count}")
+
+        # Plan: one backup listing per region, plus one volume listing if volume names are missing
+        regions = sorted(set(r.region for r in results))
+        def list_region(region):
+            try:
+                backups = {}
+                for backup in self.getBackups(region):
+                    backups.setdefault(backup.get("volumeId"), []).append(backup)
+                names = None
+                if any(r.volumeName == None for r in results if r.region == region):
+                    names = {v["volumeId"]: v["name"] for v in self.getVolumesByRegion(region)}
+                return backups, names, None
+            except Exception as e:
+                logging.error(f"rotateBackups: listing {region} failed: {e}")
+                return None, None, e
+        with ThreadPoolExecutor(max_workers=max(1, min(self.fanout_workers, len(regions)))) as executor:
+            plans = dict(zip(regions, executor.map(list_region, regions)))
+
+        # Without job scheduler, limit jobs in flight per region for this call only
+        limiter = None if self.job_scheduler != None else JobScheduler(max_jobs_per_region, max_jobs_per_pool=max_jobs_per_region)
+        def slot(region, name):
+            if limiter != None:
+                return limiter.slot(region, None, name)
+            return self._job_slot(region, None, name)
+
+        def delete(region, backupID):
+            self._delete_and_wait(region, "Backups", backupID, limiter, wait_timeout=timeout)
+
+        timestamp = datetime.now().isoformat(timespec='minutes')
+        prune_executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gcpcvs-prune")
+
+        def rotate(result):
+            backups, names, error = plans[result.region]
+            try:
+                if error != None:
+                    raise error
+                if result.volumeName == None:
+                    result.volumeName = names.get(result.volumeID)
+                    if result.volumeName == None:
+                        raise ValueError(f"Volume {result.volumeID} not found in {result.region}")
+                existing = backups.get(result.volumeID, [])
+                if len(existing) >= max_backups:
+                    raise ValueError(f"Cannot create new backup, since max number ({max_backups}) of backups exist")
+
+                # Create new backup. Will fail if name already exits, e.g if ran multiple times in the same minute
+                result.backupName = f"{result.volumeName}-{result.volumeID[0:6]}-{timestamp}"
+                if any(b["name"] == result.backupName for b in existing):
+                    raise ValueError(f"Backup {result.backupName} already exists")
+                create_start = time()
+                with slot(result.region, f"createBackup {result.volumeID}"):
+                    r = self._do_api_post(f"{self.baseurl}/locations/{result.region}/Backups",
+                                          {"name": result.backupName, "volumeId": result.volumeID}, 10*60)
+                    result.backupID = r.json()["response"]["AnyValue"]["backupId"]
+                    backup = self.watcher.watch(result.region, "Backups", result.backupID,
+                                                lambda b: b["lifeCycleState"] in ["available", "error"], timeout,
+                                                self.watcher.missing_grace).result()
+                result.create_seconds = time() - create_start
+                if backup["lifeCycleState"] != "available":
+                    raise RuntimeError(f"Backup {result.backupName} failed: {backup.get('lifeCycleStateDetails')}")
+
+                # Prune oldest backups of the naming schema. The new one counts as one to keep
+                p = re.compile(rf"{re.escape(result.volumeName)}-......-\d\d\d\d-\d\d-\d\dT\d\d:\d\d")
+                rotated = sorted([b for b in existing if p.match(b["name"])],
+                                 key=lambda b: datetime.fromisoformat(b['created'].strip("Z")), reverse=True)
+                prune_start = time()
+                futures = [(b["backupId"], prune_executor.submit(delete, result.region, b["backupId"])) for b in rotated[count - 1:]]
+                failed = []
+                for backupID, future in futures:
+                    try:
+                        future.result()
+                        result.deleted.append(backupID)
+                    except Exception as e:
+                        logging.error(f"rotateBackups: {result.region}, deleting backup {backupID} failed: {e}")
+                        failed.append(backupID)
+                result.prune_seconds = time() - prune_start
+                if failed:
+                    raise RuntimeError(f"Pruning backups {', '.join(failed)} failed")
+            except Exception as e:
+                logging.error(f"rotateBackups: Region: {result.region}, Volume: {result.volumeName}, VolumeID: {result.volumeID}: {e}")
+                result.error = str(e)
+            result.elapsed = time() - start
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(results)))) as executor:
+                list(executor.map(rotate, results))
+        finally:
+            prune_executor.shutdown()
+        logging.info(f"rotateBackups: {sum(r.ok for r in results)}/{len(results)} volumes rotated in {time() - start:.0f}s")
+        return results
+
     # Deletes a CVS backup specified by region and backupID            
     def deleteBackupByBackupID(self, region: str, backupID: str) -> bool:
         logging.info(f"deleteBackupByBackupID: {region}, {backupID} begin")
 
-        r = self._do_api_delete(f"{self.baseurl}/locations/{region}/Backups/{backupID}", 10*60)
+        r = self._do_job_delete(region, "Backups", backupID, 10*60)
         if r.status_code in [200, 202]:
             logging.info(f"deleteBackupByBackupID: {region}, {backupID} done.")
             return True
@@ -935,11 +1871,11 @@ class gcpcvs():
     def deleteBackupByName(self, region: str, volumeID: str, name: str) -> bool:
         logging.info(f"deleteBackupByName {region}, {volumeID}, {name} begin")
         # Query all backups in region to find backupID
-        backups = self.getBackupsByVolume( region, volumeID)
+        backups = self.getBackupsByVolumeID(region, volumeID)
         backupID = [backup for backup in backups if backup["name"] == name]
         # If we found one backup with correct name, delete it
         if len(backupID) == 1:
-            return self.deleteBackupbyBackupID(region, backupID[0]["backupId"])
+            return self.deleteBackupByBackupID(region, backupID[0]["backupId"])
         return False
 
     # deletes all backups for given volumeID. Not meant for production, but as helper for development
@@ -948,7 +1884,7 @@ class gcpcvs():
         logging.info(f"test_deleteAllBackupsByVolumeID: Region: {region}, Volume: {volumeID}")
 
         for backup in self.getBackupsByVolumeID(region, volumeID):
-            self.deleteBackupbyBackupID(region, backup["backupId"])            
+            self.deleteBackupByBackupID(region, backup["backupId"])
 
     #
     # KMS config
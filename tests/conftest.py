@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+#
+# Fixtures running the client against an in-process FakeCVSServer
+
+import pytest
+from gcpcvs.FakeCVSServer import FakeCVSServer
+
+REGIONS = ["us-east4", "europe-west3"]
+
+@pytest.fixture
+def server():
+    """ FakeCVSServer with 2 regions, 1 pool and 3 volumes per region. Jobs take 0.2s """
+    with FakeCVSServer(create_seconds=0.2, delete_seconds=0.2) as server:
+        server.seed(regions=REGIONS, pools_per_region=1, volumes_per_pool=3, snapshots_per_volume=1, backups_per_volume=1)
+        yield server
+
+@pytest.fixture
+def cvs(server):
+    """ gcpcvs client of server, polling job states every 0.1s """
+    cvs = server.client()
+    cvs.watcher.intervals.update({resource: 0.1 for resource in cvs.watcher.intervals})
+    return cvs
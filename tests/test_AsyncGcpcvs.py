@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from gcpcvs import AsyncGcpcvs
+
+@pytest.fixture
+def fast_sleep(monkeypatch):
+    """ Shortens the waits of AsyncGcpcvs job polling. Calls hooks before each wait """
+    hooks = []
+    sleep = asyncio.sleep
+    async def fast(seconds, *args, **kwargs):
+        for hook in hooks:
+            hook()
+        await sleep(min(seconds, 0.05), *args, **kwargs)
+    monkeypatch.setattr(asyncio, "sleep", fast)
+    return hooks
+
+def run(server, test):
+    async def main():
+        async with server.client(AsyncGcpcvs) as cvs:
+            return await test(cvs)
+    return asyncio.run(main())
+
+def test_create_backup(server, fast_sleep):
+    volume = server.objects("us-east4", "Volumes")[0]
+    assert run(server, lambda cvs: cvs.createBackup("us-east4", volume["volumeId"], "async-backup"))
+    assert [b["lifeCycleState"] for b in server.objects("us-east4", "Backups") if b["name"] == "async-backup"] == ["available"]
+
+def test_create_backup_in_error_state(server, fast_sleep):
+    volume = server.objects("us-east4", "Volumes")[0]
+    server.create_seconds = 3600
+    def fail_backup():
+        with server._lock:
+            for backup in server._objects["Backups"]["us-east4"].values():
+                if backup["name"] == "failing-backup":
+                    backup["lifeCycleState"] = "error"
+    fast_sleep.append(fail_backup)
+    assert run(server, lambda cvs: cvs.createBackup("us-east4", volume["volumeId"], "failing-backup")) == False
+
+def test_errors_carry_request_info(server):
+    async def test(cvs):
+        with pytest.raises(aiohttp.ClientResponseError) as e:
+            await cvs.getVolumesByVolumeID("us-east4", "unknown")
+        return e.value
+    error = run(server, test)
+    assert error.status == 404
+    assert error.request_info.method == "GET"
+    assert str(error.request_info.url).endswith("/locations/us-east4/Volumes/unknown")
+
+def test_concurrent_reads(server):
+    async def test(cvs):
+        return await asyncio.gather(*[cvs.getVolumesByRegion(region) for region in ["us-east4", "europe-west3"] * 5])
+    assert [len(volumes) for volumes in run(server, test)] == [3] * 10
@@ -0,0 +1,61 @@
+import pytest
+import time
+from gcpcvs.BearerAuth import BearerAuth, _Creds
+
+class ShortLivedCreds(_Creds):
+    """ Tokens valid for lifetime seconds, minted locally """
+    min_valid = 0.1
+
+    def __init__(self, lifetime: float):
+        super().__init__()
+        self.lifetime = lifetime
+        self.expiry = 0
+
+    def expires_in(self) -> float:
+        return self.expiry - time.monotonic()
+
+    def _mint(self):
+        self.token = f"token-{self.refreshes + 1}"
+        self.expiry = time.monotonic() + self.lifetime
+
+    def _set_token(self, token: str, expiry: float):
+        self.token = token
+
+def test_creds_have_to_implement_token_handling():
+    class Incomplete(_Creds):
+        def expires_in(self) -> float:
+            return 0
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_fixed_tokens_need_no_refresh_thread():
+    auth = BearerAuth.from_token("fixed")
+    auth.start_refresh_ahead(refresh_margin=1)
+    assert auth._refresher == None
+    assert str(auth) == "fixed"
+    assert auth.get_stats()["refreshes"] == 0
+
+def test_refresh_ahead_renews_before_expiry():
+    auth = BearerAuth.from_token("unused")
+    auth.credentials = ShortLivedCreds(lifetime=2)
+    auth.credentials.refresh()
+    auth.start_refresh_ahead(refresh_margin=1.7)
+    try:
+        time.sleep(1)
+        stats = auth.get_stats()
+        assert stats["refreshes"] >= 2
+        assert str(auth) != "token-1"
+        # Requests never had to wait for a token
+        assert auth.get_stats()["blocked"] == 0
+    finally:
+        auth.close()
+
+def test_refresh_ahead_stops_with_close():
+    auth = BearerAuth.from_token("unused")
+    auth.credentials = ShortLivedCreds(lifetime=2)
+    auth.credentials.refresh()
+    auth.start_refresh_ahead(refresh_margin=1.7)
+    refresher = auth._refresher
+    auth.close()
+    refresher.join(5)
+    assert not refresher.is_alive()
@@ -0,0 +1,52 @@
+import pytest
+import time
+from gcpcvs import ResponseCache
+
+@pytest.fixture
+def cached(server):
+    cvs = server.client(cache=ResponseCache())
+    cvs.watcher.intervals.update({resource: 0.1 for resource in cvs.watcher.intervals})
+    return cvs
+
+def list_calls(server, resource):
+    return server.get_stats()["requests"].get(f"GET {resource}", 0)
+
+def test_reads_are_cached(server, cached):
+    server.reset_stats()
+    assert cached.getVolumesByRegion("us-east4") == cached.getVolumesByRegion("us-east4")
+    assert list_calls(server, "Volumes") == 1
+    assert cached.cache.get_stats()["hits"] == 1
+
+def test_writes_invalidate_region_and_related_types(server, cached):
+    volume = server.objects("us-east4", "Volumes")[0]
+    before = {region: len(cached.getBackups(region)) for region in ["us-east4", "europe-west3", "-"]}
+    cached.getVolumesByRegion("us-east4")
+    cached.getPoolsByRegion("us-east4")
+    server.reset_stats()
+
+    assert cached.createBackup("us-east4", volume["volumeId"], "new-backup")
+    assert len(cached.getBackups("us-east4")) == before["us-east4"] + 1
+    assert len(cached.getBackups("-")) == before["-"] + 1
+    assert len(cached.getBackups("europe-west3")) == before["europe-west3"]
+    cached.getVolumesByRegion("us-east4")
+    cached.getPoolsByRegion("us-east4")
+    stats = server.get_stats()["requests"]
+    # Other regions and unrelated types stay cached. Backups change volumes, not pools
+    assert stats.get("GET Volumes", 0) == 1
+    assert stats.get("GET Pools", 0) == 0
+
+def test_entries_expire(server):
+    cvs = server.client(cache=ResponseCache(ttls={"Volumes": 0.2}))
+    cvs.getVolumesByRegion("us-east4")
+    server.add("us-east4", "Volumes", {"name": "added-behind-the-back", "poolId": server.objects("us-east4", "Pools")[0]["poolId"]})
+    assert len(cvs.getVolumesByRegion("us-east4")) == 3
+    time.sleep(0.3)
+    assert len(cvs.getVolumesByRegion("us-east4")) == 4
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    for region in ["a", "b", "c"]:
+        cache.put(f"https://api/v2/projects/1/locations/{region}/Volumes", region)
+    assert cache.get("https://api/v2/projects/1/locations/a/Volumes") == None
+    assert cache.get("https://api/v2/projects/1/locations/c/Volumes") == "c"
+    assert cache.get_stats()["evictions"] == 1
@@ -0,0 +1,91 @@
+import pytest
+import threading
+from gcpcvs import ChangeFeed
+from gcpcvs.ChangeFeed import ADDED, MODIFIED, REMOVED, diff_fields
+from gcpcvs.FakeCVSServer import Fault
+
+def update(server, region, resource, objectID, **fields):
+    with server._lock:
+        server._objects[resource][region][objectID].update(fields)
+
+def by_kind(changes):
+    return {kind: sorted(c.objectID for c in changes if c.kind == kind) for kind in [ADDED, MODIFIED, REMOVED]}
+
+def test_diff_fields():
+    assert diff_fields({"a": 1, "b": 2, "c": 3}, {"a": 1, "b": 5, "d": None}) == {"b": (2, 5), "c": (3, None), "d": (None, None)}
+    assert diff_fields({"a": 1, "used": 1}, {"a": 1, "used": 2}, frozenset(["used"])) == {}
+
+def test_first_poll_adds_everything(server, cvs):
+    feed = ChangeFeed(cvs)
+    changes = feed.poll("us-east4", "Volumes")
+    assert by_kind(changes)[ADDED] == sorted(v["volumeId"] for v in server.objects("us-east4", "Volumes"))
+    assert ChangeFeed(cvs, publish_initial=False).poll("us-east4", "Volumes") == []
+
+def test_changes_between_polls(server, cvs):
+    feed = ChangeFeed(cvs, ignore_fields=["usedBytes"])
+    received = []
+    feed.subscribe(received.append, resources=["Volumes"])
+    feed.poll("us-east4", "Volumes")
+    first, second, third = server.objects("us-east4", "Volumes")
+    update(server, "us-east4", "Volumes", first["volumeId"], lifeCycleState="updating", usedBytes=1)
+    update(server, "us-east4", "Volumes", second["volumeId"], usedBytes=second["usedBytes"] + 1)
+    with server._lock:
+        del server._objects["Volumes"]["us-east4"][third["volumeId"]]
+    added = server.add("us-east4", "Volumes", {"name": "new", "lifeCycleState": "available"})
+
+    changes = feed.poll("us-east4", "Volumes")
+    assert by_kind(changes) == {ADDED: [added["volumeId"]], MODIFIED: [first["volumeId"]], REMOVED: [third["volumeId"]]}
+    modified = next(c for c in changes if c.kind == MODIFIED)
+    assert modified.fields == {"lifeCycleState": ("available", "updating")}
+    assert modified.previous["lifeCycleState"] == "available"
+    removed = next(c for c in changes if c.kind == REMOVED)
+    assert removed.object == None and removed.previous["volumeId"] == third["volumeId"]
+    assert len(received) == 2 and received[1] == changes
+    # Nothing changed since
+    assert feed.poll("us-east4", "Volumes") == []
+
+def test_subscribers(server, cvs):
+    feed = ChangeFeed(cvs)
+    volumes, everything = [], []
+    def broken(changes):
+        raise RuntimeError("subscriber failed")
+    feed.subscribe(broken)
+    feed.subscribe(volumes.append, resources=["Volumes"])
+    feed.subscribe(everything.append)
+    feed.poll("us-east4", "Pools")
+    feed.poll("us-east4", "Volumes")
+    assert len(volumes) == 1 and len(everything) == 2
+    feed.unsubscribe(everything.append)
+    server.add("us-east4", "Volumes", {"name": "new", "lifeCycleState": "available"})
+    feed.poll("us-east4", "Volumes")
+    assert len(volumes) == 2 and len(everything) == 2
+
+def test_load_continues_from_stored_state(server, cvs):
+    feed = ChangeFeed(cvs)
+    feed.poll("us-east4", "Volumes")
+    stored = list(feed.snapshot("us-east4", "Volumes").values())
+    restarted = ChangeFeed(cvs)
+    restarted.load("us-east4", "Volumes", stored)
+    assert restarted.poll("us-east4", "Volumes") == []
+
+def test_poll_all_skips_failed_lists(server, cvs):
+    server.faults.append(Fault(403, resources=["Snapshots"]))
+    feed = ChangeFeed(cvs)
+    changes = feed.poll_all(resources=["Pools", "Snapshots", "Volumes"])
+    assert {c.resource for c in changes} == {"Pools", "Volumes"}
+    assert feed.snapshot("-", "Snapshots") == {}
+
+def test_background_polling(server, cvs):
+    feed = ChangeFeed(cvs)
+    polled = threading.Event()
+    feed.subscribe(lambda changes: polled.set())
+    feed.start(resources=["Volumes"], interval=0.1)
+    try:
+        assert polled.wait(5)
+    finally:
+        feed.stop()
+    assert feed.polls >= 1
+
+def test_unknown_resource(cvs):
+    with pytest.raises(ValueError):
+        ChangeFeed(cvs).update("us-east4", "Networks", [])
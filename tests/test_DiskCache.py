@@ -0,0 +1,55 @@
+import os
+import pytest
+import time
+from gcpcvs import DiskCache, gcpcvs
+from gcpcvs.BearerAuth import BearerAuth
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(str(tmp_path / "gcpcvs"))
+
+def test_tokens_are_used_while_valid(cache):
+    cache.put_token("sa@project", "token-1", time.time() + 3600)
+    token, expiry = cache.get_token("sa@project")
+    assert token == "token-1"
+    assert cache.get_token("other@project") == None
+    # Tokens expiring within min_valid seconds aren't returned
+    cache.put_token("sa@project", "token-2", time.time() + cache.min_valid / 2)
+    assert cache.get_token("sa@project") == None
+
+def test_project_numbers(cache):
+    assert cache.get_project_number("my-project") == None
+    cache.put_project_number("my-project", 123456789)
+    cache.put_project_number("other-project", 987654321)
+    assert cache.get_project_number("my-project") == "123456789"
+    assert DiskCache(cache.path).get_project_number("other-project") == "987654321"
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX file modes only")
+def test_files_are_private(cache):
+    cache.put_token("sa@project", "secret", time.time() + 3600)
+    assert os.stat(cache.path).st_mode & 0o777 == 0o700
+    token_file = os.path.join(cache.path, os.listdir(cache.path)[0])
+    assert os.stat(token_file).st_mode & 0o777 == 0o600
+    # Files others could have read or written are ignored
+    os.chmod(token_file, 0o644)
+    assert cache.get_token("sa@project") == None
+
+def test_clear(cache):
+    cache.put_token("sa@project", "token", time.time() + 3600)
+    cache.put_project_number("my-project", "123")
+    cache.clear()
+    assert cache.get_token("sa@project") == None
+    assert cache.get_project_number("my-project") == None
+    cache.clear()
+
+def test_warm_lazy_client_does_one_call(server, cache):
+    # Like a cvs.py call with a warm cache: project number comes from disk, token is fixed
+    cache.put_project_number("my-project", server.project)
+    cvs = gcpcvs(BearerAuth.from_token("fake-token"), project="my-project", endpoint=server.url, disk_cache=cache, lazy_init=True)
+    warm_ups = []
+    cvs._warm_up = lambda: warm_ups.append(1)
+    server.reset_stats()
+    assert len(cvs.getVolumesByRegion("us-east4")) == 3
+    assert server.get_stats()["requests"] == {"GET Volumes": 1}
+    assert warm_ups == []
+    assert "warmup" not in cvs.metrics.get_stats()["init_seconds"]
@@ -0,0 +1,40 @@
+import pytest
+import requests
+import subprocess
+import sys
+from gcpcvs.FakeCVSServer import FakeCVSServer, Fault
+
+def test_seeded_fleet_is_listed(server, cvs):
+    volumes = cvs.getVolumesByRegion("-")
+    assert len(volumes) == 6
+    assert {v["region"] for v in volumes} == {"us-east4", "europe-west3"}
+    assert len(cvs.getVolumesByRegion("us-east4")) == 3
+
+def test_created_objects_become_available(server, cvs):
+    pool = server.objects("us-east4", "Pools")[0]
+    created = cvs.createVolume("us-east4", {"name": "new-volume", "poolId": pool["poolId"], "quotaInBytes": 1024**4,
+                                            "protocolTypes": ["NFSv3"], "network": pool["network"]})
+    assert created["lifeCycleState"] == "available"
+    assert [v["name"] for v in server.objects("us-east4", "Volumes") if v["name"] == "new-volume"] == ["new-volume"]
+
+def test_faults_are_injected():
+    with FakeCVSServer(faults=[Fault(403, resources=["Volumes"], count=1)]) as server:
+        cvs = server.client()
+        with pytest.raises(requests.HTTPError) as e:
+            cvs.getVolumesByRegion("us-east4")
+        assert e.value.response.status_code == 403
+        assert cvs.getVolumesByRegion("us-east4") == []
+        assert server.get_stats()["errors"] == {403: 1}
+
+@pytest.mark.parametrize("first", ["import gcpcvs", "import gcpcvs.FakeCVSServer, gcpcvs.Inventory"])
+def test_submodules_are_not_shadowed(first):
+    # gcpcvs.FakeCVSServer and gcpcvs.Inventory are modules, whichever import comes first
+    code = f"""{first}
+import types
+import gcpcvs.FakeCVSServer, gcpcvs.Inventory
+from gcpcvs.FakeCVSServer import FakeCVSServer, Fault
+from gcpcvs.Inventory import Inventory
+assert isinstance(gcpcvs.FakeCVSServer, types.ModuleType) and isinstance(gcpcvs.Inventory, types.ModuleType)
+assert gcpcvs.FakeCVSServer.FakeCVSServer is FakeCVSServer and gcpcvs.Inventory.Inventory is Inventory
+"""
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,84 @@
+import pytest
+import requests
+import threading
+from gcpcvs import DiskCache, GoogleHelpers
+
+class Request():
+    # Stub of a googleapiclient request
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self, http=None):
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+@pytest.fixture
+def registry(monkeypatch):
+    """ Empty client registry with fake credentials. Returns list of (api, version) built """
+    built = []
+    def build(api, version, credentials=None, **kwargs):
+        built.append((api, version))
+        return object()
+    import googleapiclient.discovery, google_auth_httplib2
+    monkeypatch.setattr(googleapiclient.discovery, "build", build)
+    monkeypatch.setattr(google_auth_httplib2, "AuthorizedHttp", lambda credentials, http=None: object())
+    monkeypatch.setattr(GoogleHelpers, "_services", {})
+    monkeypatch.setattr(GoogleHelpers, "_credentials", (object(), "my-project"))
+    monkeypatch.setattr(GoogleHelpers, "_local", threading.local())
+    return built
+
+def test_services_are_built_once(registry):
+    threads = [threading.Thread(target=GoogleHelpers.get_service, args=("compute",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert GoogleHelpers.get_service("compute") is GoogleHelpers.get_service("compute")
+    GoogleHelpers.get_service("cloudresourcemanager")
+    GoogleHelpers.get_service("compute", "beta")
+    assert registry == [("compute", "v1"), ("cloudresourcemanager", "v1"), ("compute", "beta")]
+
+def test_http_transport_per_thread(registry):
+    http = GoogleHelpers.get_http()
+    assert GoogleHelpers.get_http() is http
+    other = []
+    t = threading.Thread(target=lambda: other.append(GoogleHelpers.get_http()))
+    t.start()
+    t.join()
+    assert other[0] is not http
+
+@pytest.fixture
+def no_metadata(monkeypatch):
+    def fail(path):
+        raise requests.ConnectionError("no metadata server")
+    monkeypatch.setattr(GoogleHelpers, "_get_metadata", fail)
+
+@pytest.fixture
+def resource_manager(registry, monkeypatch):
+    """ Stub of cloudresourcemanager answering projects.get. Returns list of requested project IDs """
+    requested = []
+    class Projects():
+        def get(self, projectId):
+            requested.append(projectId)
+            return Request({"projectNumber": "42"})
+    class Service():
+        def projects(self):
+            return Projects()
+    monkeypatch.setattr(GoogleHelpers, "get_service", lambda api, version="v1": Service())
+    return requested
+
+def test_project_number_from_metadata(monkeypatch, resource_manager):
+    monkeypatch.setattr(GoogleHelpers, "_get_metadata", {"project-id": "my-project", "numeric-project-id": "7"}.get)
+    assert GoogleHelpers.getGoogleProjectNumber("my-project") == "7"
+    assert resource_manager == []
+    # Other projects than the one of the VM are resolved by the resource manager
+    assert GoogleHelpers.getGoogleProjectNumber("other-project") == "42"
+    assert resource_manager == ["other-project"]
+
+def test_project_number_is_cached(no_metadata, resource_manager, tmp_path):
+    cache = DiskCache(str(tmp_path))
+    assert GoogleHelpers.getGoogleProjectNumber("my-project", cache) == "42"
+    assert GoogleHelpers.getGoogleProjectNumber("my-project", cache) == "42"
+    assert resource_manager == ["my-project"]
+    assert cache.get_project_number("my-project") == "42"
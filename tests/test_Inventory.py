@@ -0,0 +1,66 @@
+import pytest
+from gcpcvs.FakeCVSServer import Fault
+from gcpcvs.Inventory import INVENTORY_RESOURCES, Inventory
+
+@pytest.fixture
+def inventory(cvs, tmp_path):
+    with Inventory(cvs, str(tmp_path / "inventory.sqlite")) as inventory:
+        yield inventory
+
+def test_refresh_stores_all_objects(server, inventory):
+    assert inventory.freshness()["Volumes"] == None
+    result = inventory.refresh()
+    assert result.complete
+    assert set(result) == set(INVENTORY_RESOURCES)
+    assert result["Volumes"] == 6 and result["Pools"] == 2
+    assert sorted(v["volumeId"] for v in inventory.query("Volumes")) == sorted(
+        v["volumeId"] for region in ["us-east4", "europe-west3"] for v in server.objects(region, "Volumes"))
+    assert all(seconds < 10 for seconds in inventory.freshness().values())
+
+def test_refresh_writes_changes_only(server, cvs, inventory):
+    inventory.refresh()
+    assert sum(inventory.refresh().values()) == 0
+    volume = server.objects("us-east4", "Volumes")[0]
+    with server._lock:
+        server._objects["Volumes"]["us-east4"][volume["volumeId"]]["usedBytes"] = 0
+    assert inventory.refresh(["Volumes"]) == {"Volumes": 1}
+    # Other processes continue from the stored state
+    with Inventory(cvs, inventory.path) as other:
+        assert other.refresh(["Volumes"]) == {"Volumes": 0}
+        assert len(other.query("Volumes")) == 6
+
+def test_queries(server, inventory):
+    inventory.refresh()
+    pool = server.objects("us-east4", "Pools")[0]
+    by_name = inventory.query("Volumes", pool=pool["name"])
+    assert len(by_name) == 3
+    assert inventory.query("Volumes", pool=pool["poolId"]) == by_name
+    assert [v["name"] for v in inventory.query("Volumes", region="us-east4", limit=2)] == sorted(v["name"] for v in by_name)[:2]
+    full = inventory.query("Volumes", min_used_percent=50)
+    assert all(v["usedBytes"] * 2 >= v["quotaInBytes"] for v in full)
+    assert len(full) == sum(1 for region in ["us-east4", "europe-west3"] for v in server.objects(region, "Volumes")
+                            if v["usedBytes"] * 2 >= v["quotaInBytes"])
+    assert inventory.query("Volumes", name="does-not-exist") == []
+
+def test_aggregate(server, inventory):
+    inventory.refresh()
+    groups = inventory.aggregate("Volumes", group_by="region")
+    assert [(g["region"], g["count"]) for g in groups] == [("europe-west3", 3), ("us-east4", 3)]
+    us = server.objects("us-east4", "Volumes")
+    assert groups[1]["used_bytes"] == sum(v["usedBytes"] for v in us)
+    assert groups[1]["size_bytes"] == sum(v["quotaInBytes"] for v in us)
+
+def test_unknown_columns(inventory):
+    with pytest.raises(ValueError):
+        inventory.query("Volumes", owner="me")
+    with pytest.raises(ValueError):
+        inventory.query("Volumes", order_by="data; DROP TABLE objects")
+    with pytest.raises(ValueError):
+        inventory.aggregate("Volumes", group_by="data")
+
+def test_failed_lists_are_reported(server, inventory):
+    server.faults.append(Fault(403, resources=["Snapshots"]))
+    result = inventory.refresh(["Volumes", "Snapshots"])
+    assert not result.complete
+    assert list(result) == ["Volumes"] and list(result.errors) == ["Snapshots"]
+    assert inventory.freshness()["Snapshots"] == None
@@ -0,0 +1,61 @@
+import json
+import pytest
+import requests
+from gcpcvs import Metrics
+from gcpcvs.FakeCVSServer import Fault
+from gcpcvs.JSONStream import iter_json_array
+
+DOCUMENT = [
+    {"name": "vol-1", "quotaInBytes": 1099511627776, "labels": ["a", "b"], "usedRatio": 0.25},
+    {"name": "quote \" and ] [ } {", "nested": {"list": [1, 2.5e3, -7], "none": None, "ok": True}},
+    "ünïcødé ✓",
+    12345.678,
+    [],
+    {},
+]
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_any_chunking_parses_like_json_loads(size):
+    data = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode()
+    assert list(iter_json_array(chunked(data, size))) == DOCUMENT
+
+@pytest.mark.parametrize("data", [b"[]", b"  [ ]\n"])
+def test_empty_arrays(data):
+    assert list(iter_json_array(chunked(data, 1))) == []
+
+@pytest.mark.parametrize("data", [b"", b'{"a": 1}', b'[{"a": 1}, ', b'[1, 2', b'[1 2]', b'[1], [2]', b'[{"a": }]'])
+def test_invalid_documents(data):
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunked(data, 3)))
+
+def test_elements_are_yielded_while_downloading():
+    consumed = []
+    def chunks():
+        for chunk in chunked(json.dumps([{"i": i} for i in range(100)]).encode(), 16):
+            consumed.append(chunk)
+            yield chunk
+    elements = iter_json_array(chunks())
+    assert next(elements) == {"i": 0}
+    assert len(consumed) < 5
+
+def test_iter_matches_get(server):
+    server.seed(regions=["asia-east1"], pools_per_region=2, volumes_per_pool=200, snapshots_per_volume=1, backups_per_volume=0)
+    metrics = Metrics()
+    cvs = server.client(metrics=metrics)
+    def response_bytes():
+        return metrics.get_stats()["requests"]["GET locations/{region}/Volumes"]["response_bytes"]
+    streamed = list(cvs.iterVolumesByRegion("asia-east1"))
+    assert len(streamed) == 400
+    # Bytes of streamed responses are counted too
+    streamed_bytes = response_bytes()
+    assert streamed == cvs.getVolumesByRegion("asia-east1")
+    assert response_bytes() == 2 * streamed_bytes
+    assert list(cvs.iterSnapshotsByRegion("asia-east1")) == cvs.getSnapshotsByRegion("asia-east1")
+
+def test_iter_raises_api_errors(server, cvs):
+    server.faults.append(Fault(404, resources=["Volumes"]))
+    with pytest.raises(requests.HTTPError):
+        list(cvs.iterVolumesByRegion("us-east4"))
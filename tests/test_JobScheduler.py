@@ -0,0 +1,68 @@
+import pytest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from gcpcvs import JobScheduler
+from gcpcvs.FakeCVSServer import FakeCVSServer
+
+def test_slots_are_limited_per_region_and_pool():
+    scheduler = JobScheduler(max_jobs_per_region=2, max_jobs_per_pool=1)
+    scheduler.acquire("us-east4", "pool-1")
+    scheduler.acquire("us-east4", "pool-2")
+    started = threading.Event()
+    def third():
+        scheduler.acquire("us-east4", "pool-3")
+        started.set()
+    threading.Thread(target=third, daemon=True).start()
+    time.sleep(0.1)
+    assert not started.is_set()
+    assert scheduler.get_stats()["queued"] == {"us-east4": 1}
+    # Other regions aren't affected
+    assert scheduler.acquire("europe-west3", "pool-4") < 0.1
+    scheduler.release("us-east4", "pool-1")
+    assert started.wait(5)
+    stats = scheduler.get_stats()
+    assert stats["running"] == {"us-east4": 2, "europe-west3": 1}
+    assert stats["jobs_started"] == 4
+    assert stats["max_wait_seconds"] >= 0.1
+
+def test_slot_is_released_on_errors():
+    scheduler = JobScheduler(max_jobs_per_region=1)
+    with pytest.raises(RuntimeError):
+        with scheduler.slot("us-east4"):
+            raise RuntimeError("job failed")
+    assert scheduler.get_stats()["running"] == {}
+
+@pytest.fixture
+def busy_server():
+    """ FakeCVSServer running only one job per region at a time """
+    with FakeCVSServer(create_seconds=0.3, delete_seconds=0.3, max_jobs_per_region=1) as server:
+        server.seed(regions=["us-east4", "europe-west3"], pools_per_region=1, volumes_per_pool=2,
+                    snapshots_per_volume=0, backups_per_volume=0, replications_per_region=2)
+        yield server
+
+def scheduled_client(server):
+    cvs = server.client(job_scheduler=JobScheduler(max_jobs_per_region=1))
+    cvs.watcher.intervals.update({resource: 0.1 for resource in cvs.watcher.intervals})
+    return cvs
+
+def test_creates_queue_instead_of_failing(busy_server):
+    cvs = scheduled_client(busy_server)
+    pool = busy_server.objects("us-east4", "Pools")[0]
+    with ThreadPoolExecutor(3) as executor:
+        volumes = list(executor.map(lambda i: cvs.createVolume("us-east4", {"name": f"queued-{i}", "poolId": pool["poolId"]}),
+                                    range(3)))
+    assert all(v["lifeCycleState"] == "available" for v in volumes)
+    assert busy_server.get_stats()["errors"] == {}
+    assert cvs.job_scheduler.get_stats()["max_wait_seconds"] >= 0.3
+
+def test_replication_changes_hold_slot_until_done(busy_server):
+    cvs = scheduled_client(busy_server)
+    relationships = busy_server.objects("europe-west3", "VolumeReplications")
+    assert len(relationships) == 2
+    with ThreadPoolExecutor(2) as executor:
+        list(executor.map(lambda r: cvs.resyncVolumeReplicationByID("europe-west3", r["relationshipId"]), relationships))
+    # The second resync was only sent after the first one finished
+    assert busy_server.get_stats()["errors"] == {}
+    assert busy_server.get_stats()["jobs"] == {}
+    assert cvs.job_scheduler.get_stats()["running"] == {}
@@ -0,0 +1,71 @@
+import pytest
+import re
+from gcpcvs import Metrics, RetryPolicy
+from gcpcvs.FakeCVSServer import Fault
+from gcpcvs.Metrics import endpoint_template
+
+SAMPLE = re.compile(r'^[a-z_]+(\{[a-z]+="[^"]*"(,[a-z]+="[^"]*")*\})? [0-9.e+-]+$')
+
+@pytest.mark.parametrize("url, template", [
+    ("https://api/v2/projects/123/locations/us-east4/Volumes", "locations/{region}/Volumes"),
+    ("https://api/v2/projects/123/locations/-/Volumes/abc", "locations/{region}/Volumes/{id}"),
+    ("https://api/v2/projects/123/locations/us-east4/Volumes/abc/Backups", "locations/{region}/Volumes/{id}/Backups"),
+    ("https://api/v2/projects/123/locations/us-east4/VolumeReplications/abc/Break", "locations/{region}/VolumeReplications/{id}/Break"),
+    ("https://api/v2/projects/123/locations/us-east4/Storage/ActiveDirectory/abc", "locations/{region}/Storage/ActiveDirectory/{id}"),
+    ("https://api/", ""),
+])
+def test_endpoint_template(url, template):
+    assert endpoint_template(url) == template
+
+def test_histogram_buckets():
+    metrics = Metrics(buckets=(0.1, 1))
+    for seconds in [0.05, 0.1, 0.5, 5]:
+        metrics.observe_request("GET", "https://api/v2/projects/1/locations/us-east4/Volumes", 200, seconds, 10)
+    text = metrics.to_prometheus()
+    template = 'gcpcvs_request_duration_seconds_bucket{method="GET",endpoint="locations/{region}/Volumes",le="%s"} %d'
+    assert template % ("0.1", 2) in text
+    assert template % ("1", 3) in text
+    assert template % ("+Inf", 4) in text
+    stats = metrics.get_stats()["requests"]["GET locations/{region}/Volumes"]
+    assert stats["calls"] == 4 and stats["response_bytes"] == 40
+    assert stats["latency_seconds_sum"] == pytest.approx(5.65)
+
+def test_api_calls_are_recorded(server):
+    server.faults.append(Fault(503, methods=["GET"], resources=["Pools"], count=1))
+    metrics = Metrics()
+    cvs = server.client(metrics=metrics)
+    cvs.getVolumesByRegion("us-east4")
+    with cvs.retrying(RetryPolicy(base_delay=0.01)):
+        cvs.getPoolsByRegion("us-east4")
+    # Shared between clients
+    server.client(metrics=metrics).getVolumesByRegion("europe-west3")
+
+    requests = metrics.get_stats()["requests"]
+    volumes = requests["GET locations/{region}/Volumes"]
+    assert volumes["calls"] == 2 and volumes["status"] == {"200": 2}
+    assert volumes["response_bytes"] > 0
+    pools = requests["GET locations/{region}/Pools"]
+    assert pools["status"] == {"503": 1, "200": 1}
+    assert pools["retries"] == 1
+    assert "total" in metrics.get_stats()["init_seconds"]
+
+def test_prometheus_format(server):
+    metrics = Metrics(prefix="cvs")
+    cvs = server.client(metrics=metrics)
+    cvs.getVolumesByRegion("-")
+    cvs.getPoolsByRegion("us-east4")
+    names = set()
+    for line in metrics.to_prometheus().splitlines():
+        if line.startswith("# TYPE"):
+            names.add(line.split()[2])
+        elif not line.startswith("# HELP"):
+            assert SAMPLE.match(line), line
+            assert line.startswith("cvs_")
+    assert {"cvs_request_duration_seconds", "cvs_requests_total", "cvs_retries_total", "cvs_init_seconds"} <= names
+    assert 'cvs_requests_total{method="GET",endpoint="locations/{region}/Volumes",status="200"} 1' in metrics.to_prometheus()
+
+def test_reset(server):
+    metrics = Metrics()
+    server.client(metrics=metrics).getVolumesByRegion("us-east4")
+    metrics.reset()
+    assert metrics.get_stats()["requests"] == {}
@@ -0,0 +1,52 @@
+import pytest
+import sys
+from gcpcvs.Models import MODELS, Pool, Volume
+
+@pytest.fixture
+def volumes(server, cvs):
+    return cvs.getVolumesByRegion("-")
+
+def test_round_trip(server, cvs):
+    for resource, cls in MODELS.items():
+        objects = cvs._API_getAll("-", resource).json()
+        models = cls.from_list(objects)
+        assert [m.to_dict() for m in models] == objects, resource
+
+def test_fields_as_attributes_and_items(volumes):
+    data = volumes[0]
+    volume = Volume(data)
+    assert volume.name == volume["name"] == volume.get("name") == data["name"]
+    # Fields outside __slots__ are decoded on access
+    assert "protocolTypes" not in Volume.__slots__
+    assert volume.protocolTypes == volume["protocolTypes"] == data["protocolTypes"]
+    assert "name" in volume and "protocolTypes" in volume and "missing" not in volume
+    assert volume.get("missing", 1) == 1
+    with pytest.raises(AttributeError):
+        volume.missing
+    with pytest.raises(KeyError):
+        volume["missing"]
+    assert not hasattr(volume, "__dict__")
+
+def test_projection(volumes):
+    volume = Volume(volumes[0], fields=["volumeId", "usedBytes", "protocolTypes"])
+    assert volume.to_dict() == {k: volumes[0][k] for k in ["volumeId", "usedBytes", "protocolTypes"]}
+    assert "name" not in volume
+
+def test_interned_fields(volumes):
+    a, b = Volume.from_list(volumes[:2])
+    assert a.region is b.region
+
+def test_equality(volumes):
+    assert Volume(volumes[0]) == Volume(dict(volumes[0]))
+    assert Volume(volumes[0]) != Volume(volumes[1])
+    assert Volume(volumes[0]) != Pool(volumes[0])
+
+def test_from_iter_converts_lazily(server, cvs):
+    models = Volume.from_iter(cvs.iterVolumesByRegion("us-east4"))
+    first = next(models)
+    assert isinstance(first, Volume)
+    assert len(list(models)) == 2
+
+def test_smaller_than_dicts(volumes):
+    volume = Volume(volumes[0])
+    assert sys.getsizeof(volume) + sys.getsizeof(volume._rest) < sys.getsizeof(volumes[0])
@@ -0,0 +1,70 @@
+from gcpcvs.FakeCVSServer import FakeCVSServer
+
+def update(server, region, resource, objectID, **fields):
+    with server._lock:
+        server._objects[resource][region][objectID].update(fields)
+
+def remove(server, region, resource, objectID):
+    with server._lock:
+        del server._objects[resource][region][objectID]
+
+def test_by_name_returns_current_state(server, cvs):
+    pool = server.objects("us-east4", "Pools")[0]
+    volume = server.objects("us-east4", "Volumes")[0]
+    assert cvs.getPoolsByName("us-east4", pool["name"])[0]["state"] == "available"
+    assert cvs.getVolumesByName("us-east4", volume["name"])[0]["lifeCycleState"] == "available"
+
+    # Changed by someone else after the index was built
+    update(server, "us-east4", "Pools", pool["poolId"], state="updating")
+    update(server, "us-east4", "Volumes", volume["volumeId"], lifeCycleState="updating")
+    assert cvs.getPoolsByName("us-east4", pool["name"])[0]["state"] == "updating"
+    assert cvs.getVolumesByName("us-east4", volume["name"])[0]["lifeCycleState"] == "updating"
+
+def test_objects_deleted_behind_the_index_are_dropped(server, cvs):
+    pool = server.objects("us-east4", "Pools")[0]
+    assert len(cvs.getPoolsByName("us-east4", pool["name"])) == 1
+    remove(server, "us-east4", "Pools", pool["poolId"])
+    assert cvs.getPoolsByName("us-east4", pool["name"]) == []
+    assert all(p["poolId"] != pool["poolId"] for p in cvs.names.lookup("us-east4", "Pools", pool["name"]))
+
+def test_replications_by_name_are_fresh():
+    with FakeCVSServer() as server:
+        server.seed(regions=["us-east4", "europe-west3"], pools_per_region=1, volumes_per_pool=2, snapshots_per_volume=0,
+                    backups_per_volume=0, replications_per_region=1)
+        cvs = server.client()
+        relationship = server.objects("europe-west3", "VolumeReplications")[0]
+        assert cvs.getVolumeReplicationByName("europe-west3", relationship["name"])[0]["mirrorState"] == relationship["mirrorState"]
+        update(server, "europe-west3", "VolumeReplications", relationship["relationshipId"], mirrorState="broken")
+        assert cvs.getVolumeReplicationByName("europe-west3", relationship["name"])[0]["mirrorState"] == "broken"
+        remove(server, "europe-west3", "VolumeReplications", relationship["relationshipId"])
+        assert cvs.getVolumeReplicationByName("europe-west3", relationship["name"]) == []
+
+def test_lookups_use_the_index(server, cvs):
+    pool = server.objects("us-east4", "Pools")[0]
+    cvs.getPoolsByName("us-east4", pool["name"])
+    server.reset_stats()
+    for _ in range(5):
+        cvs.getPoolsByName("us-east4", pool["name"])
+    # One GET by ID per lookup, no list calls
+    assert server.get_stats()["requests"] == {"GET Pools": 5}
+
+def test_new_objects_are_found(server, cvs):
+    pool = server.objects("us-east4", "Pools")[0]
+    cvs.getPoolsByName("us-east4", pool["name"])
+    # Unknown names rebuild the index right away
+    cvs.names.miss_refresh = 0
+    server.add("us-east4", "Pools", {"name": "created-elsewhere"})
+    assert [p["name"] for p in cvs.getPoolsByName("us-east4", "created-elsewhere")] == ["created-elsewhere"]
+
+def test_created_objects_are_indexed(server, cvs, monkeypatch):
+    pool = server.objects("us-east4", "Pools")[0]
+    cvs.getPoolsByName("us-east4", pool["name"])
+    cvs.getVolumesByName("us-east4", "unknown")
+    # Creates answered with 200 (done) and with 202 (still creating)
+    for immediate in [False, True]:
+        if immediate:
+            monkeypatch.setattr(server, "_accepted", lambda obj: (200, {"response": {"AnyValue": dict(obj)}}))
+        new_pool = cvs.createPool("us-east4", {"name": f"new-pool-{immediate}", "sizeInBytes": 1024**4})
+        new_volume = cvs.createVolume("us-east4", {"name": f"new-volume-{immediate}", "poolId": pool["poolId"]})
+        assert [p["poolId"] for p in cvs.names.lookup("us-east4", "Pools", new_pool["name"])] == [new_pool["poolId"]]
+        assert [v["volumeId"] for v in cvs.names.lookup("us-east4", "Volumes", new_volume["name"])] == [new_volume["volumeId"]]
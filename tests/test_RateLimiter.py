@@ -0,0 +1,68 @@
+import importlib
+import pytest
+from gcpcvs import RateLimiter, RetryPolicy
+from gcpcvs.FakeCVSServer import FakeCVSServer, Fault
+
+class Clock():
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(importlib.import_module("gcpcvs.RateLimiter"), "monotonic", clock)
+    return clock
+
+def test_throttling_halves_rate_once_per_interval(clock):
+    limiter = RateLimiter(read_rate=10)
+    for _ in range(5):
+        limiter.on_response("GET", 429)
+    assert limiter.read.rate == 5
+    assert limiter.read.throttled == 5
+    clock.now += 1 / 5
+    limiter.on_response("GET", 429)
+    assert limiter.read.rate == 2.5
+
+def test_throttling_under_mixed_traffic(clock):
+    # Successes between the 429s must not hold back the decrease
+    limiter = RateLimiter(read_rate=10)
+    for _ in range(10):
+        clock.now += 0.05
+        limiter.on_response("GET", 200)
+        limiter.on_response("GET", 429)
+        clock.now += 1 / limiter.read.rate
+        limiter.on_response("GET", 200)
+    assert limiter.read.rate < 2
+
+def test_successes_recover_rate(clock):
+    limiter = RateLimiter(read_rate=10)
+    limiter.on_response("GET", 429)
+    assert limiter.read.rate == 5
+    clock.now += 10
+    limiter.on_response("GET", 200)
+    assert limiter.read.rate == 10
+
+def test_read_and_write_budgets_are_separate(clock):
+    limiter = RateLimiter(read_rate=10, write_rate=2)
+    limiter.on_response("POST", 429)
+    assert limiter.write.rate == 1
+    assert limiter.read.rate == 10
+    assert limiter.bucket("DELETE") is limiter.write
+
+def test_bucket_queues_callers_beyond_burst(clock):
+    limiter = RateLimiter(read_rate=10, read_burst=2)
+    waits = [limiter.reserve("GET") for _ in range(4)]
+    assert waits == pytest.approx([0, 0, 0.1, 0.2])
+
+def test_client_adapts_to_429():
+    limiter = RateLimiter(read_rate=50)
+    with FakeCVSServer(faults=[Fault(429, count=3)]) as server:
+        cvs = server.client(rate_limiter=limiter)
+        with cvs.retrying(RetryPolicy(base_delay=0.01, max_delay=0.05)) as stats:
+            cvs.getVolumesByRegion("us-east4")
+    assert stats.retries == 3
+    assert limiter.get_stats()["read"]["throttled"] == 3
+    assert limiter.read.rate < 50
@@ -0,0 +1,52 @@
+import pytest
+from gcpcvs import DiskCache, RegionMap
+from gcpcvs.FakeCVSServer import FakeCVSServer, Fault
+from gcpcvs.RegionMap import CVS, CVS_PERFORMANCE
+
+REGIONS = ["us-east4", "us-east1", "new-region1"]
+
+def version_calls(server):
+    return server.get_stats()["requests"].get("GET version", 0)
+
+def test_service_types_of_known_and_new_regions(server, cvs):
+    regions = RegionMap(cvs, regions=REGIONS)
+    assert regions.is_type_cvs_performance("us-east4") and not regions.is_type_cvs("us-east4")
+    assert regions.is_type_cvs("us-east1") and not regions.is_type_cvs_performance("us-east1")
+    # Not in the static lists: reports an sdeVersion, so it is taken as CVS
+    assert regions.is_type_cvs("new-region1")
+    assert sorted(regions.get_regions()) == sorted(REGIONS)
+    assert regions.get_regions(CVS_PERFORMANCE) == ["us-east4"]
+    assert regions.probes == 1
+
+def test_regions_not_serving_the_project_are_unavailable():
+    with FakeCVSServer(faults=[Fault(404, resources=["version"])]) as server:
+        regions = RegionMap(server.client(), regions=REGIONS)
+        assert regions.get_map()["us-east4"]["available"] == False
+        assert regions.has_type("us-east4", CVS_PERFORMANCE) == False
+        assert not regions.is_type_cvs_performance("us-east4")
+        assert regions.get_regions() == []
+
+@pytest.mark.parametrize("status", [401, 403, 503])
+def test_regions_which_cannot_be_probed_fall_back_to_static_lists(status, tmp_path):
+    with FakeCVSServer(faults=[Fault(status, resources=["version"])]) as server:
+        cache = DiskCache(str(tmp_path))
+        regions = RegionMap(server.client(), disk_cache=cache, regions=REGIONS)
+        assert regions.has_type("us-east4", CVS_PERFORMANCE) == None
+        assert regions.is_type_cvs_performance("us-east4")
+        assert regions.is_type_cvs("us-east1")
+        assert not regions.is_type_cvs("new-region1")
+        assert sorted(regions.get_regions()) == ["us-east1", "us-east4"]
+        # A map without any answer isn't kept for later processes
+        assert cache.get_region_map(server.project) == None
+
+def test_map_is_shared_through_disk_cache(server, cvs, tmp_path):
+    cache = DiskCache(str(tmp_path))
+    RegionMap(cvs, disk_cache=cache, regions=REGIONS).get_map()
+    server.reset_stats()
+    regions = RegionMap(cvs, disk_cache=cache, regions=REGIONS)
+    assert regions.is_type_cvs("us-east1")
+    assert version_calls(server) == 0
+    # Expired maps are probed again
+    regions = RegionMap(cvs, ttl=0, disk_cache=cache, regions=REGIONS)
+    regions.get_map()
+    assert version_calls(server) == len(REGIONS)
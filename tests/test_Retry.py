@@ -0,0 +1,95 @@
+import pytest
+import requests
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from gcpcvs import RetryPolicy
+from gcpcvs.Retry import JOB_SLOT_MESSAGE, parse_retry_after
+from gcpcvs.FakeCVSServer import FakeCVSServer, Fault
+
+FAST = RetryPolicy(base_delay=0.01, max_delay=0.05, timeout=10)
+
+@pytest.mark.parametrize("method, status, message, sent, retryable", [
+    ("GET", 503, None, True, True),
+    ("POST", 503, None, True, False),               # might have been processed
+    ("POST", 500, JOB_SLOT_MESSAGE, True, True),    # wasn't processed
+    ("POST", 500, "Internal error", True, False),
+    ("POST", 429, None, True, True),
+    ("DELETE", 409, None, True, True),
+    ("GET", 404, None, True, False),
+    ("GET", None, None, True, True),                # connection error
+    ("POST", None, None, True, False),
+    ("POST", None, None, False, True),              # never sent
+])
+def test_is_retryable(method, status, message, sent, retryable):
+    assert RetryPolicy().is_retryable(method, status, message, sent) == retryable
+
+def test_backoff_is_capped_and_jittered():
+    policy = RetryPolicy(base_delay=1, max_delay=10)
+    for attempt in range(8):
+        delays = [policy.backoff(attempt) for _ in range(50)]
+        assert all(0 <= d <= min(10, 2 ** attempt) for d in delays)
+        assert len(set(delays)) > 1
+
+def test_get_delay_limits():
+    policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=2, timeout=30)
+    assert policy.get_delay("GET", 0, 0, 503) != None
+    assert policy.get_delay("GET", 2, 0, 503) == None           # max_attempts reached
+    assert policy.get_delay("GET", 0, 29, 503, retry_after="5") == None     # would end after timeout
+    assert policy.get_delay("GET", 0, 0, 503, retry_after="5") == 5
+    assert RetryPolicy(respect_retry_after=False, max_delay=2).get_delay("GET", 0, 0, 503, retry_after="5") <= 2
+    assert RetryPolicy.never().get_delay("GET", 0, 0, 503) == None
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) == None
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0
+    assert parse_retry_after("soon") == None
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert 55 <= parse_retry_after(later) <= 60
+    earlier = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=60), usegmt=True)
+    assert parse_retry_after(earlier) == 0
+
+def test_retryable_errors_are_repeated():
+    with FakeCVSServer(faults=[Fault(503, methods=["GET"], count=2)]) as server:
+        cvs = server.client()
+        with cvs.retrying(FAST) as stats:
+            assert cvs.getVolumesByRegion("us-east4") == []
+        assert stats.retries == 2
+        assert server.get_stats()["errors"] == {503: 2}
+
+def test_client_errors_are_not_repeated():
+    with FakeCVSServer(faults=[Fault(400, count=1)]) as server:
+        cvs = server.client()
+        with cvs.retrying(FAST) as stats:
+            with pytest.raises(requests.HTTPError):
+                cvs.getVolumesByRegion("us-east4")
+        assert stats.retries == 0
+
+def test_max_attempts():
+    with FakeCVSServer(faults=[Fault(503)]) as server:
+        cvs = server.client()
+        with cvs.retrying(RetryPolicy(max_attempts=3, base_delay=0.01)) as stats:
+            with pytest.raises(requests.HTTPError):
+                cvs.getVolumesByRegion("us-east4")
+        assert stats.retries == 2
+        assert server.get_stats()["errors"] == {503: 3}
+
+def test_retry_after_is_respected():
+    with FakeCVSServer(faults=[Fault(429, count=1, retry_after=0.3)]) as server:
+        cvs = server.client()
+        with cvs.retrying(FAST) as stats:
+            cvs.getVolumesByRegion("us-east4")
+        assert stats.retries == 1
+        assert stats.wait_seconds >= 0.3
+
+def test_job_slot_errors_of_writes_are_repeated():
+    with FakeCVSServer(create_seconds=0.1, max_jobs_per_region=1) as server:
+        server.seed(regions=["us-east4"], pools_per_region=1, volumes_per_pool=2, snapshots_per_volume=0, backups_per_volume=0)
+        cvs = server.client()
+        volumes = server.objects("us-east4", "Volumes")
+        with cvs.retrying(FAST):
+            cvs._do_api_post(f"{cvs.baseurl}/locations/us-east4/Snapshots", {"name": "s1", "volumeId": volumes[0]["volumeId"]})
+            with cvs.retrying(RetryPolicy(base_delay=0.05, max_delay=0.1)) as stats:
+                r = cvs._do_api_post(f"{cvs.baseurl}/locations/us-east4/Snapshots", {"name": "s2", "volumeId": volumes[1]["volumeId"]})
+        assert r.status_code == 202
+        assert stats.retries >= 1
@@ -0,0 +1,88 @@
+import pytest
+import requests
+import time
+from gcpcvs import RetryPolicy, StateWatcher
+from gcpcvs.FakeCVSServer import FakeCVSServer, Fault
+
+def create_snapshots(cvs, server, region, count):
+    volumes = server.objects(region, "Volumes")
+    snapshotIDs = []
+    for i in range(count):
+        r = cvs._do_api_post(f"{cvs.baseurl}/locations/{region}/Snapshots", {"name": f"watched-{i}", "volumeId": volumes[i % len(volumes)]["volumeId"]})
+        snapshotIDs.append(r.json()["response"]["AnyValue"]["snapshotId"])
+    return snapshotIDs
+
+def test_waits_are_resolved_by_shared_list_calls(server, cvs):
+    snapshotIDs = create_snapshots(cvs, server, "us-east4", 6)
+    server.reset_stats()
+    futures = [cvs.watcher.watch_state("us-east4", "Snapshots", snapshotID) for snapshotID in snapshotIDs]
+    snapshots = StateWatcher.wait(futures, timeout=10)
+    assert [s["lifeCycleState"] for s in snapshots] == ["available"] * 6
+    # All waits are served by the same list calls, not one GET per snapshot
+    assert cvs.watcher.polls <= 5
+    assert sum(server.get_stats()["requests"].values()) == cvs.watcher.polls
+
+def test_watch_deleted(server, cvs):
+    snapshot = server.objects("us-east4", "Snapshots")[0]
+    cvs._do_api_delete(f"{cvs.baseurl}/locations/us-east4/Snapshots/{snapshot['snapshotId']}", 60)
+    assert cvs.watcher.watch_deleted("us-east4", "Snapshots", snapshot["snapshotId"]).result(10) == None
+
+def test_timeout(server, cvs):
+    volume = server.objects("us-east4", "Volumes")[0]
+    future = cvs.watcher.watch("us-east4", "Volumes", volume["volumeId"], lambda v: False, timeout=0.3)
+    with pytest.raises(TimeoutError):
+        future.result(10)
+    assert cvs.watcher.get_stats()["pending"] == {}
+
+def test_exceptions_of_until_fail_the_wait(server, cvs):
+    volume = server.objects("us-east4", "Volumes")[0]
+    future = cvs.watcher.watch("us-east4", "Volumes", volume["volumeId"], lambda v: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        future.result(10)
+
+def test_failed_list_calls_keep_waits_pending():
+    with FakeCVSServer(create_seconds=0.1, faults=[Fault(500, methods=["GET"], resources=["Snapshots"], count=2)]) as server:
+        server.seed(regions=["us-east4"], pools_per_region=1, volumes_per_pool=1, snapshots_per_volume=0, backups_per_volume=0)
+        cvs = server.client()
+        # The polling thread doesn't repeat failed list calls itself
+        cvs.read_retry_policy = RetryPolicy.never()
+        cvs.watcher.intervals["Snapshots"] = 0.1
+        snapshotID, = create_snapshots(cvs, server, "us-east4", 1)
+        snapshot = cvs.watcher.watch_state("us-east4", "Snapshots", snapshotID).result(10)
+        assert snapshot["lifeCycleState"] == "available"
+        assert server.get_stats()["errors"] == {500: 2}
+        assert cvs.watcher.polls >= 3
+
+def test_persistent_list_errors_fail_waits():
+    with FakeCVSServer(create_seconds=0.1, faults=[Fault(403, methods=["GET"], resources=["Snapshots"])]) as server:
+        server.seed(regions=["us-east4"], pools_per_region=1, volumes_per_pool=1, snapshots_per_volume=0, backups_per_volume=0)
+        cvs = server.client()
+        cvs.watcher.intervals["Snapshots"] = 0.1
+        snapshotID, = create_snapshots(cvs, server, "us-east4", 1)
+        with pytest.raises(requests.HTTPError):
+            cvs.watcher.watch_state("us-east4", "Snapshots", snapshotID).result(10)
+        assert cvs.watcher.polls == cvs.watcher.max_failures
+        assert cvs.watcher.get_stats()["pending"] == {}
+
+def test_objects_which_never_show_up_fail_waits(server, cvs):
+    cvs.watcher.missing_grace = 0.3
+    with pytest.raises(LookupError):
+        cvs.watcher.watch_state("us-east4", "Volumes", "never-created").result(10)
+
+def test_rolled_back_creates_fail_waits(server, cvs):
+    server.create_seconds = 3600
+    snapshotID, = create_snapshots(cvs, server, "us-east4", 1)
+    future = cvs.watcher.watch_state("us-east4", "Snapshots", snapshotID)
+    while cvs.watcher.polls == 0:
+        time.sleep(0.05)
+    # The service removes the object instead of finishing it
+    with server._lock:
+        del server._objects["Snapshots"]["us-east4"][snapshotID]
+    with pytest.raises(LookupError):
+        future.result(10)
+
+def test_creates_wait_bounded(server, cvs):
+    server.create_seconds = 3600
+    pool = server.objects("us-east4", "Pools")[0]
+    with pytest.raises(TimeoutError):
+        cvs.createVolume("us-east4", {"name": "slow", "poolId": pool["poolId"]}, timeout=0.3)
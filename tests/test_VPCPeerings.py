@@ -0,0 +1,57 @@
+import pytest
+from gcpcvs import GoogleHelpers
+from gcpcvs.GoogleHelpers import VPCPeerings
+
+def peering(tenant: str, sds: bool, state: str = "ACTIVE") -> dict:
+    vpc = "netapp-sds-tenant-vpc" if sds else "netapp-tenant-vpc"
+    return {"name": f"peer-{tenant}", "network": f"https://www.googleapis.com/compute/v1/projects/{tenant}/global/networks/{vpc}",
+            "state": state, "exportCustomRoutes": True}
+
+OTHER = {"name": "other", "network": "https://www.googleapis.com/compute/v1/projects/x/global/networks/shared", "state": "ACTIVE"}
+
+@pytest.fixture
+def networks(monkeypatch):
+    """ project -> vpc -> peerings served to VPCPeerings. "service" is a service project of "host" """
+    networks = {
+        "service": {"default": [peering("tp-sw", True), OTHER]},
+        "host": {"shared": [peering("tp-hw", False, "INACTIVE")], "empty": []},
+    }
+    monkeypatch.setattr(GoogleHelpers, "get_host_project", lambda project: "host" if project == "service" else None)
+    monkeypatch.setattr(VPCPeerings, "_list_networks", lambda self, project: {vpc: list(p) for vpc, p in networks[project].items()})
+    return networks
+
+def test_peerings_of_service_and_host_project(networks):
+    peerings = VPCPeerings("service")
+    assert peerings.host_project == "host"
+    assert len(peerings.cvs_peerings) == 2
+    assert peerings.get_networks(is_hw=False) == {"default"}
+    assert peerings.get_networks(is_hw=True) == {"shared"}
+    assert peerings.get_tenant_project(False, "default") == "tp-sw"
+    assert peerings.get_tenant_project(True, "default") == None
+    assert peerings.is_active(False, "default") == True
+    assert peerings.is_active(True, "shared") == False
+    hw, = peerings.get_peerings_by_tenant_project("tp-hw")
+    assert (hw["vpc"], hw["project"], hw["hardware"], hw["exportCustomRoutes"]) == ("shared", "host", True, True)
+
+def test_refresh_updates_changed_vpcs_only(networks):
+    peerings = VPCPeerings("service")
+    assert peerings.refresh() == set()
+    networks["host"]["shared"] = [peering("tp-hw", False, "ACTIVE")]
+    networks["service"]["new"] = [peering("tp-sw2", True)]
+    assert peerings.refresh() == {("host", "shared"), ("service", "new")}
+    assert peerings.is_active(True, "shared") == True
+    assert peerings.get_networks(is_hw=False) == {"default", "new"}
+    assert len(peerings.cvs_peerings) == 3
+
+def test_deleted_vpcs_are_removed(networks):
+    peerings = VPCPeerings("service")
+    del networks["service"]["default"]
+    assert peerings.update_peerings("service") == {"default"}
+    assert peerings.get_networks(is_hw=False) == set()
+    assert peerings.get_peerings_by_tenant_project("tp-sw") == []
+    assert [p["tp"] for p in peerings.cvs_peerings] == ["tp-hw"]
+
+def test_project_without_host(networks):
+    peerings = VPCPeerings("host")
+    assert peerings.host_project == None
+    assert peerings.get_networks(is_hw=True) == {"shared"}
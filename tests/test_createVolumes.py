@@ -0,0 +1,53 @@
+import pytest
+import requests
+import time
+from gcpcvs import JobScheduler
+
+def payloads(pool, n, prefix="bulk"):
+    return [{"name": f"{prefix}-{i}", "poolId": pool["poolId"], "quotaInBytes": 1024**4} for i in range(n)]
+
+def test_volumes_are_created_concurrently(server, cvs):
+    pool = server.objects("us-east4", "Pools")[0]
+    server.reset_stats()
+    start = time.monotonic()
+    results = cvs.createVolumes("us-east4", payloads(pool, 20))
+    assert time.monotonic() - start < 20 * server.create_seconds / 2
+    assert [r.name for r in results] == [f"bulk-{i}" for i in range(20)]
+    assert all(r.ok for r in results)
+    assert all(r.object["volumeId"] == r.objectID for r in results)
+    stats = server.get_stats()["requests"]
+    assert stats["POST Volumes"] == 20
+    # Waits are resolved by shared list calls, not by polling each volume
+    assert stats.get("GET Volumes", 0) < 20
+    # New volumes are in the name index
+    assert cvs.getVolumesByName("us-east4", "bulk-7")[0]["volumeId"] == results[7].objectID
+
+def test_failed_creates_dont_stop_others(server, cvs):
+    pool = server.objects("us-east4", "Pools")[0]
+    bad = {"name": "no-pool", "poolId": "does-not-exist"}
+    results = cvs.createVolumes("us-east4", payloads(pool, 2) + [bad])
+    assert [r.ok for r in results] == [True, True, False]
+    assert results[2].objectID == None
+    assert isinstance(results[2].error, requests.HTTPError)
+
+def test_wait_timeout(server, cvs):
+    server.create_seconds = 3600
+    pool = server.objects("us-east4", "Pools")[0]
+    results = cvs.createVolumes("us-east4", payloads(pool, 3), wait_timeout=0.3)
+    assert all(isinstance(r.error, TimeoutError) and r.objectID != None for r in results)
+
+def test_job_scheduler_limits_creates_in_flight(server):
+    server.max_jobs_per_region = 2
+    cvs = server.client(job_scheduler=JobScheduler(max_jobs_per_region=2, max_jobs_per_pool=2))
+    cvs.watcher.intervals.update({resource: 0.1 for resource in cvs.watcher.intervals})
+    pool = server.objects("us-east4", "Pools")[0]
+    results = cvs.createVolumes("us-east4", payloads(pool, 6))
+    assert all(r.ok for r in results)
+    # The server never had to reject a job
+    assert server.get_stats()["errors"] == {}
+    assert cvs.job_scheduler.get_stats()["running"] == {}
+
+def test_pools(server, cvs):
+    results = cvs.createPools("europe-west3", [{"name": f"pool-{i}", "sizeInBytes": 1024**4} for i in range(3)])
+    assert all(r.ok for r in results)
+    assert {p["name"] for p in server.objects("europe-west3", "Pools")} >= {"pool-0", "pool-1", "pool-2"}
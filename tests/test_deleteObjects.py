@@ -0,0 +1,64 @@
+import pytest
+from gcpcvs.FakeCVSServer import FakeCVSServer
+
+RESOURCES = ["VolumeReplications", "Backups", "Snapshots", "Volumes", "Pools"]
+
+def fleet(server, region):
+    return [o for resource in RESOURCES for o in server.objects(region, resource)]
+
+def test_teardown_deletes_children_first(server, cvs):
+    objects = fleet(server, "us-east4")
+    results = cvs.deleteObjects(objects)
+
+    assert [r.ok for r in results] == [True] * len(objects)
+    assert fleet(server, "us-east4") == []
+    assert len(fleet(server, "europe-west3")) > 0
+    by_id = {r.objectID: r for r in results}
+    # Results are in order of objects
+    parents = {"Backups": "volumeId", "Snapshots": "ownerId", "Volumes": "poolId"}
+    for obj, result in zip(objects, results):
+        if result.resource in parents:
+            assert result.elapsed <= by_id[obj[parents[result.resource]]].started
+
+def test_restored_volumes_are_volumes(server, cvs):
+    # Volumes created from a backup or snapshot carry their backupId/snapshotId
+    backup = server.objects("us-east4", "Backups")[0]
+    snapshot = server.objects("us-east4", "Snapshots")[0]
+    pool = server.objects("us-east4", "Pools")[0]
+    restored = server.add("us-east4", "Volumes", {"name": "restored", "poolId": pool["poolId"], "lifeCycleState": "available",
+                                                  "quotaInBytes": 1024**4, "creationToken": "restored",
+                                                  "backupId": backup["backupId"], "snapshotId": snapshot["snapshotId"]})
+    result, = cvs.deleteObjects([restored])
+    assert (result.resource, result.objectID, result.ok) == ("Volumes", restored["volumeId"], True)
+    assert len(server.objects("us-east4", "Backups")) == 3
+
+def test_explicit_types(server, cvs):
+    volume = server.objects("us-east4", "Volumes")[0]
+    snapshot = server.objects("us-east4", "Snapshots")[0]
+    results = cvs.deleteObjects([("Volumes", volume), ("us-east4", "Snapshots", snapshot["snapshotId"])])
+    assert [(r.resource, r.ok) for r in results] == [("Volumes", True), ("Snapshots", True)]
+    with pytest.raises(ValueError):
+        cvs.deleteObjects([("Disks", volume)])
+    with pytest.raises(ValueError):
+        cvs.deleteObjects([{"name": "unknown"}])
+
+def test_gone_objects_count_as_deleted(server, cvs):
+    results = cvs.deleteObjects([("us-east4", "Volumes", "unknown")])
+    assert results[0].ok
+
+def test_parents_of_failed_children_are_kept():
+    with FakeCVSServer(create_seconds=0.1, delete_seconds=0.1) as server:
+        server.seed(regions=["us-east4", "europe-west3"], pools_per_region=1, volumes_per_pool=2, snapshots_per_volume=0,
+                    backups_per_volume=0, replications_per_region=1)
+        cvs = server.client()
+        cvs.watcher.intervals.update({resource: 0.1 for resource in cvs.watcher.intervals})
+        # The replications aren't deleted, so their volumes can't be deleted, and neither can the pool
+        volumes = server.objects("us-east4", "Volumes")
+        pool = server.objects("us-east4", "Pools")[0]
+        replicated = sorted(v["volumeId"] for v in volumes if v["inReplication"])
+        assert 0 < len(replicated) < len(volumes)
+        results = {r.objectID: r for r in cvs.deleteObjects(volumes + [pool])}
+        assert all(not results[volumeID].ok for volumeID in replicated)
+        assert not results[pool["poolId"]].ok and "wasn't deleted" in results[pool["poolId"]].error
+        assert sum(r.ok for r in results.values()) == len(volumes) - len(replicated)
+        assert sorted(v["volumeId"] for v in server.objects("us-east4", "Volumes")) == replicated
@@ -0,0 +1,34 @@
+import pytest
+from gcpcvs.FakeCVSServer import Fault
+
+REGIONS = ["us-east4", "europe-west3"]
+
+def ids(objects, id_field):
+    return sorted(o[id_field] for o in objects)
+
+@pytest.mark.parametrize("method, id_field", [("getPoolsByRegion", "poolId"), ("getVolumesByRegion", "volumeId"),
+                                              ("getSnapshotsByRegion", "snapshotId"), ("getBackups", "backupId")])
+def test_fanout_matches_all_regions_call(server, cvs, method, id_field):
+    merged = getattr(cvs, method)("-", fanout=True, regions=REGIONS)
+    assert merged.complete
+    assert set(merged.latencies) == set(REGIONS)
+    assert ids(merged, id_field) == ids(getattr(cvs, method)("-"), id_field)
+
+def test_failing_regions_are_reported(server, cvs):
+    server.faults.append(Fault(403, resources=["Volumes"], regions=["europe-west3"]))
+    volumes = cvs.getVolumesByRegion("-", fanout=True, regions=REGIONS)
+    assert not volumes.complete
+    assert list(volumes.errors) == ["europe-west3"]
+    assert volumes.errors["europe-west3"].response.status_code == 403
+    assert set(volumes.latencies) == set(REGIONS)
+    # Results of the other regions are still returned
+    assert ids(volumes, "volumeId") == ids(cvs.getVolumesByRegion("us-east4"), "volumeId")
+
+def test_all_regions_failing(server, cvs):
+    server.faults.append(Fault(403, resources=["Volumes"]))
+    volumes = cvs.getVolumesByRegion("-", fanout=True, regions=REGIONS)
+    assert volumes == []
+    assert set(volumes.errors) == set(REGIONS)
+
+def test_no_regions(server, cvs):
+    assert cvs.getVolumesByRegion("-", fanout=True, regions=[]).complete
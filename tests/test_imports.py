@@ -0,0 +1,39 @@
+import importlib.util
+import os
+import pytest
+import subprocess
+import sys
+
+def load_benchmark():
+    path = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "import_time.py")
+    spec = importlib.util.spec_from_file_location("import_time", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+import_time = load_benchmark()
+
+def imported_after(code: str) -> set:
+    # Lazy modules loaded by code in a fresh interpreter
+    check = f"{code}\nimport sys\nprint(sorted(m for m in {set(import_time.LAZY_MODULES)!r} if m in sys.modules))"
+    return set(eval(subprocess.run([sys.executable, "-c", check], check=True, capture_output=True, text=True).stdout))
+
+def test_import_gcpcvs_is_lazy():
+    seconds, imported = import_time.measure(sys.executable)
+    assert imported == []
+
+@pytest.mark.parametrize("code, expected", [
+    ("from gcpcvs.FakeCVSServer import FakeCVSServer", {"http.server"}),
+    ("from gcpcvs.Inventory import Inventory", {"sqlite3"}),
+    ("import gcpcvs\ngcpcvs.gcpcvs(gcpcvs.BearerAuth.BearerAuth.from_token('t'), project='1', lazy_init=True)", set()),
+])
+def test_modules_are_imported_on_use(code, expected):
+    assert imported_after(code) & set(import_time.LAZY_MODULES) == expected
+
+def test_async_client_imports_aiohttp_on_use():
+    pytest.importorskip("aiohttp")
+    code = """import asyncio, gcpcvs
+async def main():
+    gcpcvs.AsyncGcpcvs(gcpcvs.BearerAuth.BearerAuth.from_token('t'), project='1')
+asyncio.run(main())"""
+    assert "aiohttp" in imported_after(code)
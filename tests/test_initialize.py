@@ -0,0 +1,70 @@
+import pytest
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from gcpcvs import gcpcvs
+from gcpcvs.BearerAuth import BearerAuth, _Creds
+
+DELAY = 0.3
+
+class SlowCreds(_Creds):
+    """ Fixed token which takes DELAY seconds to fetch """
+    def __init__(self):
+        super().__init__()
+        self.expiry = 0
+
+    def expires_in(self) -> float:
+        return self.expiry - time.monotonic()
+
+    def _mint(self):
+        time.sleep(DELAY)
+        self.token = "fake-token"
+        self.expiry = time.monotonic() + 3600
+
+    def _set_token(self, token: str, expiry: float):
+        self.token = token
+
+@pytest.fixture
+def resolver(server, monkeypatch):
+    """ Replaces the project number lookup by one taking DELAY seconds. Returns list of looked up project IDs """
+    lookups = []
+    def getGoogleProjectNumber(project_id, cache=None):
+        lookups.append(project_id)
+        time.sleep(DELAY)
+        return server.project if project_id == "my-project" else None
+    monkeypatch.setattr(sys.modules["gcpcvs.gcpcvs"], "getGoogleProjectNumber", getGoogleProjectNumber)
+    return lookups
+
+def slow_auth():
+    auth = BearerAuth.from_token("unused")
+    auth.credentials = SlowCreds()
+    return auth
+
+def test_token_and_project_are_fetched_in_parallel(server, resolver):
+    start = time.monotonic()
+    cvs = gcpcvs(slow_auth(), project="my-project", endpoint=server.url)
+    assert time.monotonic() - start < 1.8 * DELAY
+    assert cvs.project == server.project
+    assert len(cvs.getVolumesByRegion("us-east4")) == 3
+    init = cvs.metrics.get_stats()["init_seconds"]
+    assert init["token"] >= DELAY and init["project"] >= DELAY
+    assert init["total"] < 1.8 * DELAY
+
+def test_lazy_init_waits_for_first_call(server, resolver):
+    auth = slow_auth()
+    cvs = gcpcvs(auth, project="my-project", endpoint=server.url, lazy_init=True)
+    assert resolver == [] and auth.credentials.refreshes == 0
+    # Concurrent first calls initialize once
+    with ThreadPoolExecutor(4) as executor:
+        assert all(len(v) == 3 for v in executor.map(lambda i: cvs.getVolumesByRegion("us-east4"), range(4)))
+    assert resolver == ["my-project"]
+    assert auth.credentials.refreshes == 1
+
+def test_project_numbers_are_not_resolved(server, resolver):
+    cvs = gcpcvs(BearerAuth.from_token("fake-token"), project=server.project, endpoint=server.url)
+    assert resolver == []
+    assert "project" not in cvs.metrics.get_stats()["init_seconds"]
+
+def test_unknown_project(server, resolver):
+    with pytest.raises(ValueError):
+        gcpcvs(BearerAuth.from_token("fake-token"), project="unknown-project", endpoint=server.url)
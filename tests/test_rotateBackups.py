@@ -0,0 +1,47 @@
+import pytest
+from datetime import datetime, timedelta
+from gcpcvs.FakeCVSServer import Fault
+
+def add_rotated_backups(server, volumes, days):
+    # Backups as created by earlier rotations, one per day from 2024-01-01
+    for volume in volumes:
+        for day in range(days):
+            created = datetime(2024, 1, 1) + timedelta(days=day)
+            server.add(volume["region"], "Backups", {"name": f"{volume['name']}-{volume['volumeId'][:6]}-{created.isoformat(timespec='minutes')}",
+                                                     "volumeId": volume["volumeId"], "lifeCycleState": "available", "created": created.isoformat() + "Z"})
+
+def backup_names(server, volume):
+    return sorted(b["name"] for b in server.objects(volume["region"], "Backups") if b["volumeId"] == volume["volumeId"])
+
+def test_rotate_backups(server, cvs):
+    volumes = server.objects("-", "Volumes")
+    add_rotated_backups(server, volumes, 3)
+    results = cvs.rotateBackups(volumes, count=2)
+
+    assert [r.ok for r in results] == [True] * len(volumes)
+    for volume, result in zip(volumes, results):
+        assert result.volumeID == volume["volumeId"]
+        assert len(result.deleted) == 2
+        names = backup_names(server, volume)
+        # The seeded manual backup doesn't match the naming schema and is kept
+        assert names == sorted(["backup-0", f"{volume['name']}-{volume['volumeId'][:6]}-2024-01-03T00:00", result.backupName])
+
+def test_volumes_by_id(server, cvs):
+    volume = server.objects("us-east4", "Volumes")[0]
+    result, missing = cvs.rotateBackups([("us-east4", volume["volumeId"]), ("us-east4", "unknown")], count=1)
+    assert result.ok and result.volumeName == volume["name"]
+    assert result.backupName.startswith(f"{volume['name']}-{volume['volumeId'][:6]}-")
+    assert not missing.ok and "not found" in missing.error
+
+def test_failed_creates_dont_prune(server, cvs):
+    volume = server.objects("us-east4", "Volumes")[0]
+    add_rotated_backups(server, [volume], 3)
+    before = backup_names(server, volume)
+    server.faults.append(Fault(400, methods=["POST"], resources=["Backups"]))
+    result, = cvs.rotateBackups([volume], count=1)
+    assert not result.ok and result.deleted == []
+    assert backup_names(server, volume) == before
+
+def test_count_is_checked(cvs):
+    with pytest.raises(ValueError):
+        cvs.rotateBackups([], count=31)
@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+
+def test_connections_are_reused(server, cvs):
+    cvs.getVolumesByRegion("us-east4")
+    server.reset_stats()
+    for _ in range(20):
+        cvs.getVolumesByRegion("us-east4")
+    assert server.get_stats()["connections"] == 0
+
+def test_threads_share_the_pool(server):
+    cvs = server.client(pool_size=4)
+    cvs.getVolumesByRegion("us-east4")
+    server.reset_stats()
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(lambda i: cvs.getVolumesByRegion("us-east4"), range(40)))
+    assert server.get_stats()["connections"] <= 4
+
+def test_without_keep_alive_connections_are_closed(server):
+    cvs = server.client(keep_alive=False)
+    for _ in range(3):
+        cvs.getVolumesByRegion("us-east4")
+    assert server.get_stats()["connections"] == 3
+
+def test_close(server):
+    with server.client() as cvs:
+        cvs.getVolumesByRegion("us-east4")
+    assert len(cvs._adapter.poolmanager.pools) == 0